@@ -1,34 +1,70 @@
 import os
+import json
 import time
-from flask import Flask, render_template, request, session, flash
-import markdown
+from flask import Flask, render_template, request, session, flash, jsonify, Response, stream_with_context, url_for, redirect, g
+from flask import before_render_template, template_rendered
 from dotenv import load_dotenv
-from pypdf import PdfReader
+
+# Load environment variables from .env file
+# (before the local imports, since the services read their tuning knobs at import time)
+load_dotenv()
 
 # --- Local Project Imports ---
 # Notice we removed database imports completely!
 # Note: We will need to update seeker.py and ai_manager.py in the next steps 
 # to return data instead of saving to a DB.
-from services.seeker import fetch_jobs_in_memory
-from services.ai_manager import evaluate_jobs_in_memory
-from services.term_expander import get_expanded_terms
-
-# Load environment variables from .env file
-load_dotenv()
+from services.pipeline import parse_search_params, serialize_job, paginate_jobs
+from services.search_jobs import start_search_job, get_search_job, search_queue, QueueFullError
+from services.cv_store import cv_store
+from services.cv_ingest import ingest_cv_files
+from services.llm_client import llm_clients
+from services.vector_index import vector_index
+from services.telemetry import metrics, span, Trace, start_trace, end_trace, HTTP_SECONDS, SERVER_TIMING
 
 # Initialize Flask Application
 app = Flask(__name__)
-# Secret key is required to use Flask 'session' (to keep the CV in memory temporarily)
+# Secret key is required to use Flask 'session' (to keep the CV token between requests)
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "super-secret-bioinfo-key")
 
+# ==============================================================================
+# REQUEST TRACING (LATENCY METRICS, TEMPLATE RENDER SPANS, SERVER-TIMING)
+# ==============================================================================
+
+@app.before_request
+def start_request_trace():
+    g.trace = Trace(request.endpoint or "unknown")
+    g.trace_token = start_trace(g.trace)
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def finish_request_trace(response):
+    trace = g.pop('trace', None)
+    if trace is None:
+        return response
+    HTTP_SECONDS.observe(time.perf_counter() - g.request_started, endpoint=request.endpoint or "unknown", status=response.status_code)
+    if SERVER_TIMING and "Server-Timing" not in response.headers and trace.totals:
+        response.headers["Server-Timing"] = trace.server_timing()
+    end_trace(g.pop('trace_token'))
+    return response
+
+@before_render_template.connect_via(app)
+def start_render_span(sender, template, context, **extra):
+    g.render_span = span("render", template=template.name or "inline").__enter__()
+
+@template_rendered.connect_via(app)
+def finish_render_span(sender, template, context, **extra):
+    render_span = g.pop('render_span', None)
+    if render_span is not None:
+        render_span.__exit__(None, None, None)
+
 @app.route('/')
 def index():
     """
     Main route. Renders the initial dashboard.
     Since there's no database, it loads an empty state until the user performs a search.
     """
-    # Check if the user already has a CV stored in their active session
-    has_cv_in_memory = 'cv_text' in session
+    # Check if the user already has a CV stored for their active session
+    has_cv_in_memory = current_cv() is not None
     
     return render_template(
         'index.html', 
@@ -36,135 +72,215 @@ def index():
         has_cv_in_memory=has_cv_in_memory
     )
 
-@app.route('/search', methods=['POST'])
-def search_and_evaluate():
+def current_cv():
+    """Returns the CVRecord referenced by the session token, or None."""
+    # Sessions from before the server-side store carried the whole text in the cookie
+    legacy_text = session.pop('cv_text', None)
+    if legacy_text:
+        session['cv_token'] = cv_store.put(legacy_text).token
+
+    return cv_store.get(session.get('cv_token'))
+
+def resolve_cv():
     """
-    Handles the stateless flow:
-    1. Receives uploaded CV(s) and extracts text (saving to temporary session).
-    2. Expands search terms using AI (max 5).
-    3. Scrapes jobs across platforms into memory.
-    4. Evaluates jobs against the CV text using AI.
-    5. Returns the filtered results directly to the frontend.
+    Receives uploaded CV(s) and extracts their text into the server-side CV store,
+    keeping only its short token in the session.
+    Falls back to the CV already stored for this session when no new files were sent.
     """
-    # --------------------------------------------------------------------------
-    # 1. HANDLE CV UPLOADS & TEXT EXTRACTION
-    # --------------------------------------------------------------------------
     cv_files = request.files.getlist('cv_files')
-    extracted_cv_text = ""
     
-    # If the user uploaded new files, parse them
+    # If the user uploaded new files, parse them (hash-cached, page-parallel extraction)
     if cv_files and cv_files[0].filename != '':
-        for file in cv_files:
-            if file.filename.lower().endswith('.pdf'):
-                try:
-                    reader = PdfReader(file)
-                    for page in reader.pages:
-                        extracted_cv_text += page.extract_text() + "\n\n"
-                except Exception as e:
-                    print(f"❌ Error reading PDF {file.filename}: {e}")
+        extracted_cv_text = ingest_cv_files(cv_files)
         
-        # Save the combined text to the user's temporary browser session
         if extracted_cv_text.strip():
-            session['cv_text'] = extracted_cv_text
+            cv_store.delete(session.get('cv_token'))
+            record = cv_store.put(extracted_cv_text)
+            session['cv_token'] = record.token
+            return record
+        return None
             
-    # If no new files were uploaded, try to use the one already in the session
-    else:
-        extracted_cv_text = session.get('cv_text', '')
+    # If no new files were uploaded, try to use the one already stored
+    return current_cv()
+
+@app.route('/search', methods=['POST'])
+def search_and_evaluate():
+    """
+    No-JavaScript fallback of the streaming search:
+    1. Receives uploaded CV(s) and extracts text (saving to temporary session).
+    2. Queues the expand -> scrape -> score pipeline on the background workers.
+    3. Redirects to the search page, which refreshes itself until the results are ready.
+    """
+    cv = resolve_cv()
 
     # Guard clause: We cannot run the AI without a CV
-    if not extracted_cv_text.strip():
+    if cv is None:
         flash("Please upload at least one PDF resume to proceed.", "error")
         return render_template('index.html', jobs=[], has_cv_in_memory=False)
 
-    # --------------------------------------------------------------------------
-    # 2. GET FORM PARAMETERS
-    # --------------------------------------------------------------------------
-    base_term = request.form.get('term', 'Engenheiro')
-    min_score = int(request.form.get('min_score', 80)) # User defined threshold
-    filter_words = request.form.get('filter_words', '')
-    location = request.form.get('location', 'Brazil')
-    results_wanted = int(request.form.get('results_wanted', 30))
-    hours_old = int(request.form.get('hours_old', 24))
-
-    # --------------------------------------------------------------------------
-    # 3. EXPAND TERMS (LIMITED TO 5)
-    # --------------------------------------------------------------------------
-    expanded_terms = get_expanded_terms(base_term)
-    
-    # FORCE CAP AT 5 TERMS to prevent taking too long or hitting rate limits
-    expanded_terms = expanded_terms[:5] 
-    
-    results_per_term = max(10, results_wanted // len(expanded_terms))
-    
-    print(f"\n🚀 Stateless Search Started for: {base_term}")
-    print(f"🎯 Threshold: {min_score} | Target results: {results_wanted}")
+    try:
+        job = start_search_job(cv, parse_search_params(request.form))
+    except QueueFullError as e:
+        flash(f"🚦 {e}", "warning")
+        return render_template('index.html', jobs=[], has_cv_in_memory=True)
 
-    # --------------------------------------------------------------------------
-    # 4. SCRAPE JOBS INTO MEMORY
-    # --------------------------------------------------------------------------
-    all_scraped_jobs = []
-    
-    for index, current_term in enumerate(expanded_terms):
-        print(f"\n[{index + 1}/{len(expanded_terms)}] 👉 Scraping: '{current_term}'")
-        
-        # We will modify seeker.py to return a list of dictionaries/objects, not save to DB
-        jobs_found = fetch_jobs_in_memory(
-            term=current_term, 
-            location=location,
-            results_wanted=results_per_term,
-            hours_old=hours_old,
-            filter_words=filter_words
-        )
-        all_scraped_jobs.extend(jobs_found)
-        
-        if index < len(expanded_terms) - 1:
-            time.sleep(10) # Reduced sleep a bit for better web UX
+    return redirect(url_for('show_search', job_id=job.id))
 
-    if not all_scraped_jobs:
-        flash("No jobs found with these parameters. Try expanding your search.", "warning")
-        return render_template('index.html', jobs=[], has_cv_in_memory=True)
+@app.route('/search/<job_id>')
+def show_search(job_id):
+    """Renders a queued search: a self-refreshing status page while it runs, the results once done."""
+    job = get_search_job(job_id)
+    if job is None:
+        flash("Search not found or expired. Please run it again.", "warning")
+        return render_template('index.html', jobs=[], has_cv_in_memory=current_cv() is not None)
+
+    if not job.finished:
+        return render_template('index.html', jobs=[], has_cv_in_memory=True, pending_search=job)
+
+    result = job.result or {"jobs": [], "messages": []}
+    page = paginate_jobs(result["jobs"], request.args.get('page', 1, type=int))
+    # Notices belong to the search, not to every page of its results
+    if page["page"] == 1:
+        for category, message in result["messages"]:
+            flash(message, category)
+
+    return render_template('index.html', jobs=page["jobs"], has_cv_in_memory=True, pagination=page, search_id=job.id)
+
+# ==============================================================================
+# BACKGROUND SEARCH API (QUEUE, POLLING & SERVER-SENT EVENTS)
+# ==============================================================================
+
+@app.route('/search/start', methods=['POST'])
+def start_streaming_search():
+    """
+    Queues a background search job and returns its id right away.
+    The browser then follows the job's progress through /search/stream/<job_id>
+    (or polls /search/<job_id>/results).
+    """
+    cv = resolve_cv()
+
+    if cv is None:
+        return jsonify({"error": "Please upload at least one PDF resume to proceed."}), 400
 
-    # --------------------------------------------------------------------------
-    # 5. AI EVALUATION & ERROR HANDLING (RATE LIMITS)
-    # --------------------------------------------------------------------------
-    all_scraped_jobs = all_scraped_jobs[:results_wanted]
-    
-    evaluated_jobs = []
-    print(f"\n🧠 Evaluating {len(all_scraped_jobs)} jobs against uploaded CV...")
-    
     try:
-        # We will modify ai_manager.py to accept a list of jobs and the CV text directly
-        evaluated_jobs = evaluate_jobs_in_memory(all_scraped_jobs, extracted_cv_text)
-    
-    except Exception as e:
-        error_msg = str(e)
-        if "429" in error_msg or "rate limit" in error_msg.lower():
-            flash("🤖 AI Rate Limit Reached! The Groq API is overwhelmed. Please wait a few minutes and try again.", "error")
-        else:
-            flash(f"🤖 AI Evaluation Error: {error_msg}", "error")
-        print(f"❌ AI Error: {error_msg}")
-        return render_template('index.html', jobs=[], has_cv_in_memory=True)
+        job = start_search_job(cv, parse_search_params(request.form))
+    except QueueFullError as e:
+        return jsonify({"error": str(e)}), 503
 
-    # --------------------------------------------------------------------------
-    # 6. APPLY THRESHOLD & FORMATTING
-    # --------------------------------------------------------------------------
-    final_jobs = []
-    for job in evaluated_jobs:
-        if job.match_score and job.match_score >= min_score:
-            # Process markdown for the web
-            job.formatted_description = markdown.markdown(job.description or "")
-            final_jobs.append(job)
-            
-    # Sort highest scores first
-    final_jobs.sort(key=lambda x: x.match_score, reverse=True)
+    return jsonify({
+        "job_id": job.id,
+        "stream_url": url_for('stream_search', job_id=job.id),
+        "results_url": url_for('search_results', job_id=job.id)
+    }), 202
+
+@app.route('/search/<job_id>/results')
+def search_results(job_id):
+    """
+    Polling endpoint: status of a search and, once finished, one page of its matching jobs
+    (query args: page, per_page).
+    """
+    job = get_search_job(job_id)
+    if job is None:
+        return jsonify({"error": "Search not found or expired."}), 404
+
+    result = job.result or {"jobs": [], "messages": []}
+    page = paginate_jobs(result["jobs"], request.args.get('page', 1, type=int), request.args.get('per_page', type=int))
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "finished": job.finished,
+        "messages": [{"category": c, "message": m} for c, m in result["messages"]],
+        **page,
+        "jobs": [serialize_job(j) for j in page["jobs"]],
+    })
 
-    print(f"✅ Finished! {len(final_jobs)} jobs passed the >= {min_score} threshold.")
+@app.route('/search/queue')
+def search_queue_stats():
+    """Queue depth, wait time and worker utilization of the background search workers."""
+    return jsonify(search_queue.stats())
 
-    return render_template('index.html', jobs=final_jobs, has_cv_in_memory=True)
+@app.route('/llm/pool')
+def llm_pool_stats():
+    """Requests, new connections, TLS handshakes and reuse rate of the shared LLM connection pool."""
+    return jsonify(llm_clients.stats())
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Stage latencies, LLM calls/tokens/retries, scrape outcomes and queue/pool/cache gauges (Prometheus text format)."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/search/<job_id>/timings')
+def search_timings(job_id):
+    """Per-stage timing breakdown of a search: totals per span name plus the individual spans."""
+    job = get_search_job(job_id)
+    if job is None:
+        return jsonify({"error": "Search not found or expired."}), 404
+
+    response = jsonify({"status": job.status, "finished": job.finished, **job.trace.breakdown()})
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = job.trace.server_timing()
+    return response
+
+@app.route('/search/similar')
+def similar_stored_jobs():
+    """
+    Stored postings closest to the session's CV, straight from the local vector index
+    (no scraping, no LLM). Optional query args: top_n (max 100) and hours_old.
+    """
+    cv = current_cv()
+    if cv is None:
+        return jsonify({"error": "Please upload at least one PDF resume to proceed."}), 400
+
+    top_n = min(max(request.args.get('top_n', 20, type=int), 1), 100)
+    hours_old = request.args.get('hours_old', type=int)
+    jobs = vector_index.retrieve_jobs(cv.text, top_n=top_n, hours_old=hours_old)
+    return jsonify({
+        "indexed": len(vector_index),
+        "jobs": [serialize_job(job) for job in jobs],
+    })
+
+def format_sse(event_id: int, event: str, data: dict) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/search/stream/<job_id>')
+def stream_search(job_id):
+    """
+    Streams the stage, progress, scored-job and notice events of a search as SSE.
+    Reconnecting browsers resume from their Last-Event-ID instead of starting over.
+    """
+    job = get_search_job(job_id)
+    if job is None:
+        return jsonify({"error": "Search not found or expired."}), 404
+
+    try:
+        cursor = int(request.headers.get('Last-Event-ID', -1)) + 1
+    except ValueError:
+        cursor = 0
+
+    def event_stream():
+        nonlocal cursor
+        while True:
+            events, finished = job.wait_for_events(cursor)
+            for event, data in events:
+                yield format_sse(cursor, event, data)
+                cursor += 1
+            if finished and not events:
+                yield format_sse(cursor, "close", {})
+                return
+            if not events:
+                # Comment line keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+
+    return Response(
+        stream_with_context(event_stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @app.route('/clear_cv', methods=['POST'])
 def clear_cv():
-    """Route to let the user flush their CV from the active session."""
+    """Route to let the user flush their CV from the server-side store and the session."""
+    cv_store.delete(session.pop('cv_token', None))
     session.pop('cv_text', None)
     flash("CV removed from memory.", "info")
     return render_template('index.html', jobs=[], has_cv_in_memory=False)
@@ -0,0 +1,272 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+# Load environment variables from .env file (before the services read their tuning knobs)
+load_dotenv()
+
+import pandas as pd
+
+from services.seeker import JobInMemory
+from services.pipeline import collect_jobs
+from services.compactor import compact_jobs
+from services.pre_ranker import pre_rank_jobs
+from services.search_cache import clone_jobs
+from services.cv_ingest import ingest_pdf_bytes
+from services.cache import sha256_text
+from services.ai_manager import evaluate_jobs_in_memory, ScoringCascade, LLM_CASCADE
+
+# How many CVs are scored at the same time (each one also runs LLM_MAX_CONCURRENCY workers,
+# all sharing the process-wide rate limiter and score cache)
+BATCH_PARALLEL_CVS = int(os.getenv("BATCH_PARALLEL_CVS", 2))
+
+CV_EXTENSIONS = (".pdf", ".txt", ".md")
+CORPUS_FIELDS = ("title", "company", "location", "link", "description", "source", "published_at")
+
+# ==============================================================================
+# SECTION 1: INPUTS (CVS & STORED CORPUS)
+# ==============================================================================
+
+def load_cvs(paths: list) -> list:
+    """
+    Reads every CV file (PDF, or plain text/markdown) from the given files and directories.
+    Returns [(cv_id, file name, text)], where cv_id changes whenever the CV's text changes.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(CV_EXTENSIONS)))
+        else:
+            files.append(path)
+
+    cvs = []
+    for path in files:
+        try:
+            if path.lower().endswith(".pdf"):
+                with open(path, "rb") as f:
+                    text = ingest_pdf_bytes(f.read(), os.path.basename(path))
+            else:
+                with open(path, encoding="utf-8") as f:
+                    text = f.read().strip()
+        except Exception as e:
+            print(f"❌ Could not read CV {path}: {e}")
+            continue
+        if not text:
+            print(f"⚠️ CV {path} skipped: no text extracted.")
+            continue
+        name = os.path.basename(path)
+        cvs.append((f"{os.path.splitext(name)[0]}-{sha256_text(text)[:8]}", name, text))
+    return cvs
+
+def load_corpus(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        rows = json.load(f)
+    jobs = []
+    for row in rows:
+        job = JobInMemory(**{field: row.get(field) for field in CORPUS_FIELDS})
+        job.merged_from = row.get("merged_from") or []
+        jobs.append(job)
+    return jobs
+
+def save_corpus(jobs: list, path: str):
+    rows = [{**{field: getattr(job, field) for field in CORPUS_FIELDS}, "merged_from": job.merged_from} for job in jobs]
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(rows, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def build_corpus(args) -> list:
+    """
+    The week's postings for the cohort: read from `--corpus` when it exists, otherwise scraped
+    once (expansion + concurrent scrape, exactly like a /search) and stored there for reruns.
+    """
+    if os.path.exists(args.corpus) and not args.refresh_corpus:
+        jobs = load_corpus(args.corpus)
+        print(f"📚 Loaded {len(jobs)} stored jobs from {args.corpus}")
+        return jobs
+
+    params = {
+        "term": args.term,
+        "location": args.location,
+        "hours_old": args.hours_old,
+        "results_wanted": args.results_wanted,
+        "filter_words": args.filter_words,
+        "incremental": False,
+    }
+    jobs = collect_jobs(params)
+    save_corpus(jobs, args.corpus)
+    print(f"💾 Scraped {len(jobs)} jobs once for the whole cohort, stored in {args.corpus}")
+    return jobs
+
+# ==============================================================================
+# SECTION 2: CHECKPOINT (APPEND-ONLY JSONL)
+# ==============================================================================
+
+class Checkpoint:
+    """
+    One JSON line per scored (CV, job) pair, flushed as each score arrives, so an interrupted
+    run resumes where it stopped. Jobs that could not be scored are not written and are retried.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = []
+        self.done = set()
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Last line of a run killed mid-write
+                        continue
+                    self.rows.append(row)
+                    self.done.add((row["cv_id"], row["job_link"]))
+        self._file = open(path, "a", encoding="utf-8")
+
+    def is_done(self, cv_id: str, link: str) -> bool:
+        return (cv_id, link) in self.done
+
+    def add(self, row: dict):
+        with self._lock:
+            self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+            self._file.flush()
+            self.rows.append(row)
+            self.done.add((row["cv_id"], row["job_link"]))
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+# ==============================================================================
+# SECTION 3: CV x JOB SCORING MATRIX
+# ==============================================================================
+
+def score_cv(cv: tuple, corpus: list, checkpoint: Checkpoint, args) -> int:
+    """Scores one CV against every corpus job it has no checkpointed score for. Returns the jobs scored."""
+    cv_id, cv_file, cv_text = cv
+    # Per-CV copies: scoring writes match_score/rationale/pre_rank_score on the job objects
+    # Pre-rank before dropping checkpointed jobs, so a resumed run keeps the same top K
+    ranked = pre_rank_jobs(clone_jobs(corpus), cv_text, top_k=args.top_k or None, min_score=0)
+    jobs = [job for job in ranked if not checkpoint.is_done(cv_id, job.link)]
+    if not jobs:
+        print(f"⏭️  {cv_file}: already scored against its {len(ranked)} jobs.")
+        return 0
+
+    def on_result(job, done, total):
+        # LLM failures and rate limits leave the job unscored: never checkpointed, retried on resume
+        if job.match_score is None:
+            return
+        checkpoint.add({
+            "cv_id": cv_id,
+            "cv_file": cv_file,
+            "job_link": job.link,
+            "title": job.title,
+            "company": job.company,
+            "location": job.location,
+            "source": job.source,
+            "published_at": job.published_at,
+            "match_score": job.match_score,
+            "score_tier": job.score_tier,
+            "pre_rank_score": job.pre_rank_score,
+            "rationale": job.rationale,
+        })
+
+    started = time.monotonic()
+    cascade = ScoringCascade(args.min_score) if args.cascade else None
+    evaluate_jobs_in_memory(jobs, cv_text, on_result=on_result, cascade=cascade)
+    scored = sum(1 for job in jobs if job.match_score is not None)
+    print(f"✅ {cv_file}: {scored}/{len(jobs)} jobs scored in {time.monotonic() - started:.0f}s")
+    return scored
+
+def write_results(rows: list, path: str, min_score: int) -> str:
+    """
+    Writes the matrix as Parquet (when the path ends in .parquet and pyarrow/fastparquet
+    is installed) or CSV, one row per (CV, job), best scores of each CV first.
+    """
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return None
+    df = df.drop_duplicates(["cv_id", "job_link"], keep="last")
+    df["meets_min_score"] = df["match_score"] >= min_score
+    df = df.sort_values(["cv_id", "match_score"], ascending=[True, False]).reset_index(drop=True)
+    for column in ("cv_id", "cv_file", "source", "score_tier"):
+        df[column] = df[column].astype("category")
+
+    if path.endswith(".parquet"):
+        try:
+            df.to_parquet(path, index=False)
+            return path
+        except ImportError as e:
+            path = path[:-len(".parquet")] + ".csv"
+            print(f"⚠️ Parquet engine not installed ({e}). Writing CSV instead.")
+    df.to_csv(path, index=False)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Scores a cohort of CVs against one stored job corpus (scraped once), with checkpoint/resume."
+    )
+    parser.add_argument("cvs", nargs="+", help="CV files (.pdf, .txt, .md) or directories containing them")
+    parser.add_argument("--term", help="Search term used to scrape the corpus (not needed when --corpus exists)")
+    parser.add_argument("--location", default="Brazil")
+    parser.add_argument("--hours-old", type=int, default=168, help="Posting window of the corpus (default: one week)")
+    parser.add_argument("--results-wanted", type=int, default=100)
+    parser.add_argument("--filter-words", default="")
+    parser.add_argument("--corpus", default="batch_corpus.json", help="Stored corpus, read if it exists, else scraped into it")
+    parser.add_argument("--refresh-corpus", action="store_true", help="Scrape again even if --corpus exists")
+    parser.add_argument("--out", default="batch_scores.parquet", help="Results file (.parquet or .csv)")
+    parser.add_argument("--checkpoint", help="Resume file (default: <out>.checkpoint.jsonl)")
+    parser.add_argument("--min-score", type=int, default=80)
+    parser.add_argument("--top-k", type=int, default=0, help="Only score each CV's top K pre-ranked jobs (0 = all)")
+    parser.add_argument("--parallel-cvs", type=int, default=BATCH_PARALLEL_CVS)
+    parser.add_argument("--cascade", action="store_true", default=LLM_CASCADE, help="Fast/strong model cascade")
+    args = parser.parse_args()
+
+    if not (os.path.exists(args.corpus) and not args.refresh_corpus) and not args.term:
+        parser.error("--term is required to scrape a new corpus")
+
+    cvs = load_cvs(args.cvs)
+    if not cvs:
+        sys.exit("No readable CV found.")
+
+    corpus = build_corpus(args)
+    if not corpus:
+        sys.exit("The corpus is empty: nothing to score.")
+    # Compacted descriptions are computed once and shared by every CV
+    compact_jobs(corpus)
+
+    checkpoint = Checkpoint(args.checkpoint or f"{args.out}.checkpoint.jsonl")
+    if checkpoint.rows:
+        print(f"♻️  Resuming from {checkpoint.path}: {len(checkpoint.rows)} scores already done.")
+    print(f"🧮 Scoring {len(cvs)} CVs x {len(corpus)} jobs ({args.parallel_cvs} CVs at a time)...")
+
+    started = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=max(1, args.parallel_cvs))
+    try:
+        futures = [pool.submit(score_cv, cv, corpus, checkpoint, args) for cv in cvs]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"❌ CV scoring failed: {e}")
+    finally:
+        # On Ctrl+C, don't wait for the CVs in progress: every finished score is already checkpointed
+        pool.shutdown(wait=False, cancel_futures=True)
+        checkpoint.close()
+
+    path = write_results(checkpoint.rows, args.out, args.min_score)
+    print(f"\n📊 {len(checkpoint.rows)} scores written to {path} in {time.monotonic() - started:.0f}s")
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n👋 Batch interrupted. Run the same command again to resume from the checkpoint.")
+        # Skip joining the scoring threads still in flight
+        os._exit(130)
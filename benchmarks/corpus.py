@@ -0,0 +1,164 @@
+import os
+import glob
+import zlib
+import threading
+import datetime
+import numpy as np
+import pandas as pd
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+
+# ==============================================================================
+# SECTION 1: SYNTHETIC CORPUS (REALISTIC jobspy-SHAPED POSTINGS)
+# ==============================================================================
+
+SITES = ["linkedin", "indeed", "glassdoor"]
+
+SKILLS = [
+    "Python", "SQL", "Pandas", "Spark", "AWS", "GCP", "Azure", "Docker", "Kubernetes", "Airflow", "dbt",
+    "TensorFlow", "PyTorch", "scikit-learn", "R", "Power BI", "Tableau", "Git", "Linux", "FastAPI",
+    "Bioconductor", "Nextflow", "Snakemake", "genomics", "statistics", "NLP", "LLMs", "MLOps",
+]
+SENIORITY = ["Júnior", "Pleno", "Sênior", "Jr", "Senior", "Lead", ""]
+COMPANIES = [f"Empresa {name}" for name in (
+    "Alfa", "Beta", "Gama", "Delta", "Ômega", "Sigma", "Lambda", "Kappa", "Zeta", "Theta", "Iota", "Épsilon",
+)]
+CITIES = ["São Paulo, SP", "Rio de Janeiro, RJ", "Belo Horizonte, MG", "Campinas, SP", "Curitiba, PR", "Remote"]
+OFF_TOPIC_TITLES = ["Enfermeiro", "Vendedor Externo", "Motorista", "Recepcionista", "Auxiliar Administrativo"]
+
+BOILERPLATE = [
+    "We are an equal opportunity employer and all qualified applicants will receive consideration for employment.",
+    "Valorizamos a diversidade e incentivamos pessoas de todos os grupos sub-representados a se candidatarem.",
+    "Ao se candidatar você concorda com a nossa política de privacidade e tratamento de dados pessoais.",
+]
+
+def _description(rng: np.random.Generator, title: str, company: str) -> str:
+    skills = rng.choice(SKILLS, size=rng.integers(4, 9), replace=False)
+    duties = rng.choice(SKILLS, size=3, replace=False)
+    filler = " ".join(rng.choice(["dados", "produto", "clientes", "time", "qualidade", "escala", "impacto",
+                                  "inovação", "processos", "resultados"], size=rng.integers(40, 160)))
+    lines = [
+        f"**Sobre a {company}:**",
+        f"A {company} é uma empresa de tecnologia com foco em {filler}.",
+        "",
+        "## Responsabilidades",
+        *(f"- Desenvolver soluções com **{skill}** para o time de {title}" for skill in duties),
+        "",
+        "## Requisitos",
+        *(f"- Experiência com {skill}" for skill in skills),
+        f"- {rng.integers(1, 8)}+ anos de experiência",
+        "",
+        "## Benefícios",
+        "- Vale refeição", "- Plano de saúde", "- Gympass",
+        "",
+        *rng.choice(BOILERPLATE, size=rng.integers(1, 3), replace=False),
+    ]
+    return "\n".join(lines)
+
+def synthetic_corpus(size: int, terms: list, seed: int = 42, repost_rate: float = 0.1,
+                     off_topic_rate: float = 0.15) -> pd.DataFrame:
+    """
+    `size` postings shaped like jobspy's output, spread over `terms` (column `term_slot`) and SITES.
+    Includes off-topic titles (rejected by the relevance filter) and cross-site reposts
+    (same description on another site, caught by the near-duplicate index).
+    """
+    rng = np.random.default_rng(seed)
+    today = datetime.date.today()
+    rows = []
+    for i in range(size):
+        slot = i % len(terms)
+        site = SITES[int(rng.integers(len(SITES)))]
+        if rows and rng.random() < repost_rate:
+            original = rows[int(rng.integers(len(rows)))]
+            rows.append({**original, "site": site, "job_url": f"https://{site}.example/jobs/{i}",
+                         "company": original["company"] + " Ltda"})
+            continue
+
+        company = COMPANIES[int(rng.integers(len(COMPANIES)))]
+        if rng.random() < off_topic_rate:
+            title = OFF_TOPIC_TITLES[int(rng.integers(len(OFF_TOPIC_TITLES)))]
+        else:
+            title = f"{terms[slot]} {SENIORITY[int(rng.integers(len(SENIORITY)))]}".strip()
+        rows.append({
+            "term_slot": slot,
+            "site": site,
+            "title": title,
+            "company": company,
+            "location": CITIES[int(rng.integers(len(CITIES)))],
+            "job_url": f"https://{site}.example/jobs/{i}",
+            "description": _description(rng, title, company),
+            "is_remote": bool(rng.random() < 0.2),
+            "date_posted": (today - datetime.timedelta(days=int(rng.integers(0, 3)))).isoformat(),
+        })
+    return pd.DataFrame(rows)
+
+# ==============================================================================
+# SECTION 2: RECORDING REAL SCRAPES
+# ==============================================================================
+
+def recording_scraper(real_scrape_jobs, name: str, directory: str = RECORDINGS_DIR):
+    """
+    Wraps jobspy's scrape_jobs so every DataFrame it returns is saved (pickled, with its
+    search term) under recordings/<name>/, ready to be replayed by ReplayScraper.
+    """
+    target = os.path.join(directory, name)
+    os.makedirs(target, exist_ok=True)
+    counter = iter(range(10**9))
+    lock = threading.Lock()
+
+    def scrape_jobs(*args, **kwargs):
+        df = real_scrape_jobs(*args, **kwargs)
+        if df is not None and not df.empty:
+            with lock:
+                idx = next(counter)
+            recorded = df.copy()
+            recorded["search_term"] = kwargs.get("search_term")
+            recorded.to_pickle(os.path.join(target, f"{idx:05d}.pkl"))
+        return df
+
+    return scrape_jobs
+
+def load_recording(name: str, directory: str = RECORDINGS_DIR) -> pd.DataFrame:
+    files = sorted(glob.glob(os.path.join(directory, name, "*.pkl")))
+    if not files:
+        raise FileNotFoundError(f"No recorded DataFrames under {os.path.join(directory, name)}")
+    return pd.concat([pd.read_pickle(f) for f in files], ignore_index=True)
+
+# ==============================================================================
+# SECTION 3: REPLAY
+# ==============================================================================
+
+class ReplayScraper:
+    """
+    Drop-in replacement of jobspy's scrape_jobs that serves a recorded or synthetic corpus.
+    Recorded rows are matched by (search_term, site); synthetic rows by term slot (the n-th
+    distinct term asked for) and site, so any expanded term list gets its share of the corpus.
+    """
+    def __init__(self, corpus: pd.DataFrame):
+        self.corpus = corpus
+        self.by_term = "search_term" in corpus.columns
+        self._slots = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _slot(self, term: str) -> int:
+        with self._lock:
+            if term not in self._slots:
+                n_slots = int(self.corpus["term_slot"].max()) + 1 if len(self.corpus) else 1
+                self._slots[term] = len(self._slots) % n_slots
+            return self._slots[term]
+
+    def __call__(self, site_name=None, search_term=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        sites = site_name if isinstance(site_name, list) else [site_name]
+        if self.by_term:
+            mask = self.corpus["search_term"] == search_term
+        else:
+            mask = self.corpus["term_slot"] == self._slot(search_term)
+        rows = self.corpus[mask & self.corpus["site"].isin(sites)]
+        # Fresh copy with jobspy's columns only, as a real scrape would return
+        return rows.drop(columns=["term_slot", "search_term"], errors="ignore").reset_index(drop=True).copy()
+
+def corpus_fingerprint(corpus: pd.DataFrame) -> str:
+    return f"{zlib.crc32(pd.util.hash_pandas_object(corpus[['job_url']], index=False).values.tobytes()):08x}"
@@ -0,0 +1,172 @@
+import re
+import json
+import time
+import random
+import zlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# ==============================================================================
+# SECTION 1: STUB CONFIGURATION & ACCOUNTING
+# ==============================================================================
+
+class StubConfig:
+    """Behaviour of the local OpenAI-compatible stub."""
+    def __init__(self, latency_ms: float = 300, jitter_ms: float = 100, rate_limit_prob: float = 0.0,
+                 retry_after: float = 0.2, seed: int = 7):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit_prob = rate_limit_prob
+        self.retry_after = retry_after
+        self.seed = seed
+
+class StubStats:
+    """Calls, injected 429s and token usage served by the stub (thread-safe)."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.rate_limited = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def add(self, **deltas):
+        with self._lock:
+            for name, value in deltas.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "rate_limited": self.rate_limited,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+            }
+
+def count_tokens(text: str) -> int:
+    """Same ~4 characters per token heuristic the app uses for its own estimates."""
+    return len(text or "") // 4 + 1
+
+# ==============================================================================
+# SECTION 2: DETERMINISTIC ANSWERS
+# ==============================================================================
+
+_JOB_HEADER_PATTERN = re.compile(r'--- JOB (\S+) ---')
+
+def _stable_score(text: str) -> int:
+    # Same job text always gets the same score, spread over 30-99
+    return 30 + zlib.crc32(text.encode("utf-8")) % 70
+
+def answer_for(system_prompt: str, user_prompt: str) -> str:
+    """Builds a plausible answer for each kind of prompt the app sends."""
+    if "compact, factual profile" in system_prompt:
+        return json.dumps({
+            "skills": ["python", "sql", "pandas", "machine learning", "docker", "aws"],
+            "years_experience": 4, "seniority": "mid", "domains": ["bioinformatics"],
+            "languages": ["Portuguese (native)", "English (fluent)"], "education": "MSc Bioinformatics",
+            "highlights": ["Built genomics pipelines"],
+        })
+    if "comma-separated list" in system_prompt:
+        term = user_prompt.replace("Term:", "").strip()
+        return ", ".join(f"{term} {suffix}" for suffix in ("Pleno", "Senior", "Jr", "II"))
+    if "'results'" in system_prompt:
+        parts = _JOB_HEADER_PATTERN.split(user_prompt)
+        results = [
+            {"id": job_id, "score": _stable_score(body), "rationale": "Avaliação simulada pelo benchmark."}
+            for job_id, body in zip(parts[1::2], parts[2::2])
+        ]
+        return json.dumps({"results": results})
+    return json.dumps({"score": _stable_score(user_prompt), "rationale": "Avaliação simulada pelo benchmark."})
+
+# ==============================================================================
+# SECTION 3: HTTP SERVER
+# ==============================================================================
+
+class LLMStubServer:
+    """
+    Local OpenAI-compatible /v1/chat/completions endpoint with configurable latency,
+    probabilistic 429 injection (with Retry-After) and token accounting.
+    Runs on a background thread; point LLM_BASE_URL at `base_url`.
+    """
+    def __init__(self, config: StubConfig = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or StubConfig()
+        self.stats = StubStats()
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _random(self) -> float:
+        with self._rng_lock:
+            return self._rng.random()
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status: int, payload: dict, headers: dict = None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("content-length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                config = stub.config
+
+                delay = max(0.0, config.latency_ms + (stub._random() * 2 - 1) * config.jitter_ms) / 1000
+                time.sleep(delay)
+
+                if stub._random() < config.rate_limit_prob:
+                    stub.stats.add(calls=1, rate_limited=1)
+                    self._send_json(429, {"error": {"message": "Rate limit reached (injected by benchmark stub)",
+                                                    "type": "rate_limit_error", "code": "rate_limit_exceeded"}},
+                                    headers={"retry-after": str(config.retry_after)})
+                    return
+
+                messages = request.get("messages", [])
+                system_prompt = next((m["content"] for m in messages if m.get("role") == "system"), "")
+                user_prompt = next((m["content"] for m in messages if m.get("role") == "user"), "")
+                content = answer_for(system_prompt, user_prompt)
+
+                prompt_tokens = sum(count_tokens(m.get("content", "")) for m in messages)
+                completion_tokens = count_tokens(content)
+                stub.stats.add(calls=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+                self._send_json(200, {
+                    "id": "chatcmpl-benchmark",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "benchmark-stub"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content}}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                              "total_tokens": prompt_tokens + completion_tokens},
+                })
+
+        return Handler
+
+    def start(self) -> "LLMStubServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
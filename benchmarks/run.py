@@ -0,0 +1,322 @@
+"""
+Offline benchmark of the expand -> scrape -> filter -> score -> render pipeline.
+Scraping is replayed from recorded (or synthetic) jobspy DataFrames and the LLM is a local
+OpenAI-compatible stub, so runs never touch LinkedIn/Indeed/Glassdoor or Groq.
+
+Usage:
+    python -m benchmarks.run                                   # synthetic corpora of 100, 1000 and 10000 postings
+    python -m benchmarks.run --sizes 500 --searches 10 --latency-ms 800 --rate-limit-prob 0.05
+    python -m benchmarks.run --recording brazil_ds             # replay benchmarks/recordings/brazil_ds/
+    python -m benchmarks.run --record brazil_ds --term "Data Scientist" --location Brazil   # live scrape, recorded
+    python -m benchmarks.run --compare benchmarks/results/OLD.json benchmarks/results/NEW.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import resource
+import functools
+import threading
+import subprocess
+import contextlib
+import multiprocessing
+from collections import defaultdict
+
+import numpy as np
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Prewarmed in data/term_expansions.json, so expansion itself is served without the LLM
+DEFAULT_TERM = "Data Scientist"
+STAGES = ["expand", "scrape", "filter", "pre_rank", "compact", "score", "render"]
+
+BENCHMARK_CV = (
+    "Bioinformata e Cientista de Dados com 4 anos de experiência. Python, SQL, Pandas, scikit-learn, "
+    "PyTorch, Docker, AWS, Airflow, Nextflow e Snakemake. Pipelines de genômica, estatística e MLOps. "
+) * 40
+
+# ==============================================================================
+# SECTION 1: ISOLATED ENVIRONMENT
+# ==============================================================================
+
+def benchmark_environment(args) -> dict:
+    """Env vars that keep a benchmark run offline, stateless and free of politeness sleeps."""
+    return {
+        "USE_DB": "False",
+        "SCORE_CACHE_PERSIST": "False",
+        "CV_PROFILE_PERSIST": "False",
+        "CRAWL_INDEX_PERSIST": "False",
+        "VECTOR_INDEX_ENABLED": "False",
+        "SEARCH_USE_CORPUS": "False",
+        # Every search must run its own scrape, or later searches would only measure cache hits
+        "SEARCH_CACHE_ENABLED": "False",
+        "TELEMETRY_LOG_LEVEL": "ERROR",
+        "SCRAPE_INTERVAL_LINKEDIN": "0",
+        "SCRAPE_INTERVAL_INDEED": "0",
+        "SCRAPE_INTERVAL_GLASSDOOR": "0",
+        "GROQ_API_KEY": "benchmark",
+        "LLM_RPM": str(args.rpm),
+        "LLM_TPM": str(args.tpm),
+        "LLM_BATCH_MODE": "True" if args.batch_mode else "False",
+    }
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(RESULTS_DIR)).stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+# ==============================================================================
+# SECTION 2: ONE CORPUS SIZE (RUNS IN ITS OWN PROCESS FOR A CLEAN PEAK RSS)
+# ==============================================================================
+
+class StageTimer:
+    """Accumulates wall time per stage for the search currently running."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.current = defaultdict(float)
+
+    def wrap(self, stage: str, func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.current[stage] += time.perf_counter() - started
+        return timed
+
+    def take(self) -> dict:
+        with self._lock:
+            values, self.current = dict(self.current), defaultdict(float)
+        return values
+
+def run_size(settings: dict) -> dict:
+    """Benchmarks `searches` searches over one corpus; returns raw per-search measurements."""
+    os.environ.update(settings["env"])
+    sys.path.insert(0, settings["repo_root"])
+
+    from benchmarks.llm_stub import LLMStubServer, StubConfig
+    from benchmarks.corpus import synthetic_corpus, load_recording, ReplayScraper, corpus_fingerprint
+
+    stub = LLMStubServer(StubConfig(
+        latency_ms=settings["latency_ms"], jitter_ms=settings["jitter_ms"],
+        rate_limit_prob=settings["rate_limit_prob"],
+    )).start()
+    os.environ["LLM_BASE_URL"] = stub.base_url
+
+    from flask import render_template
+    import app as web_app
+    import services.seeker as seeker
+    import services.pipeline as pipeline
+    import services.scrape_scheduler as scheduler
+    from services.term_expander import get_expanded_terms
+
+    terms = get_expanded_terms(settings["term"])[:5]
+    if settings["recording"]:
+        corpus = load_recording(settings["recording"])
+    else:
+        corpus = synthetic_corpus(settings["size"], terms, seed=settings["seed"])
+    replay = ReplayScraper(corpus)
+    seeker.scrape_jobs = replay
+
+    timer = StageTimer()
+    pipeline.get_expanded_terms = timer.wrap("expand", pipeline.get_expanded_terms)
+    pipeline.scrape_terms_concurrently = timer.wrap("scrape", pipeline.scrape_terms_concurrently)
+    scheduler.filter_scraped_jobs = timer.wrap("filter", scheduler.filter_scraped_jobs)
+    pipeline.pre_rank_jobs = timer.wrap("pre_rank", pipeline.pre_rank_jobs)
+    pipeline.compact_jobs = timer.wrap("compact", pipeline.compact_jobs)
+    pipeline.evaluate_jobs_in_memory = timer.wrap("score", pipeline.evaluate_jobs_in_memory)
+
+    params = {
+        "term": settings["term"], "min_score": settings["min_score"], "filter_words": "",
+        "location": settings["location"], "results_wanted": settings["results_wanted"], "hours_old": settings["hours_old"],
+        "incremental": False, "target_matches": settings["target_matches"],
+    }
+
+    searches = []
+    sink = open(os.devnull, "w") if not settings["verbose"] else contextlib.nullcontext(sys.stdout)
+    with sink as out, contextlib.redirect_stdout(out):
+        for i in range(settings["searches"]):
+            # A different CV per search keeps the score cache cold, like distinct users
+            cv_text = BENCHMARK_CV + f" Candidato #{i}."
+            before = stub.stats.snapshot()
+            started = time.perf_counter()
+            result = pipeline.run_search_pipeline(cv_text, params)
+
+            with web_app.app.test_request_context("/"):
+                render_started = time.perf_counter()
+                # First results page, as served by /search/<id>
+                page = pipeline.paginate_jobs(result["jobs"])
+                render_template("index.html", jobs=page["jobs"], has_cv_in_memory=True, pagination=page, search_id="benchmark")
+                timer.current["render"] += time.perf_counter() - render_started
+
+            total = time.perf_counter() - started
+            after = stub.stats.snapshot()
+            searches.append({
+                "total": total,
+                "stages": timer.take(),
+                "matches": len(result["jobs"]),
+                "llm": {name: after[name] - before[name] for name in after},
+            })
+
+    stub.stop()
+    return {
+        "size": len(corpus),
+        "corpus": corpus_fingerprint(corpus),
+        "scrape_calls": replay.calls,
+        # Linux reports ru_maxrss in KiB
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "searches": searches,
+    }
+
+# ==============================================================================
+# SECTION 3: SUMMARY, STORAGE & COMPARISON
+# ==============================================================================
+
+def percentiles(values: list) -> dict:
+    values = np.asarray(values, dtype=np.float64) * 1000
+    return {"p50_ms": round(float(np.percentile(values, 50)), 1), "p95_ms": round(float(np.percentile(values, 95)), 1)}
+
+def summarize(raw: dict) -> dict:
+    searches = raw["searches"]
+    totals = [s["total"] for s in searches]
+    per_search = lambda name: round(float(np.mean([s["llm"][name] for s in searches])), 1)
+    return {
+        "size": raw["size"],
+        "corpus": raw["corpus"],
+        "searches": len(searches),
+        "total": percentiles(totals),
+        "stages": {stage: percentiles([s["stages"].get(stage, 0.0) for s in searches]) for stage in STAGES},
+        "jobs_per_second": round(raw["size"] / float(np.mean(totals)), 1),
+        "matches_per_search": round(float(np.mean([s["matches"] for s in searches])), 1),
+        "llm_calls_per_search": per_search("calls"),
+        "rate_limited_per_search": per_search("rate_limited"),
+        "prompt_tokens_per_search": per_search("prompt_tokens"),
+        "completion_tokens_per_search": per_search("completion_tokens"),
+        "peak_rss_mb": raw["peak_rss_mb"],
+    }
+
+def print_summary(summary: dict):
+    print(f"\n📦 {summary['size']} postings ({summary['searches']} searches, corpus {summary['corpus']})")
+    print(f"   total     p50 {summary['total']['p50_ms']:>9.1f} ms | p95 {summary['total']['p95_ms']:>9.1f} ms")
+    for stage, value in summary["stages"].items():
+        print(f"   {stage:<9} p50 {value['p50_ms']:>9.1f} ms | p95 {value['p95_ms']:>9.1f} ms")
+    print(f"   jobs/s {summary['jobs_per_second']} | matches/search {summary['matches_per_search']} | "
+          f"LLM calls/search {summary['llm_calls_per_search']} (429s {summary['rate_limited_per_search']}) | "
+          f"tokens/search {summary['prompt_tokens_per_search']} in + {summary['completion_tokens_per_search']} out | "
+          f"peak RSS {summary['peak_rss_mb']} MB")
+
+def save_results(payload: dict, directory: str = RESULTS_DIR) -> str:
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(directory, f"{stamp}_{payload['meta']['git']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    return path
+
+def compare(old_path: str, new_path: str):
+    """Prints the relative change of every latency/throughput metric between two stored runs."""
+    with open(old_path, encoding="utf-8") as f:
+        old = {r["size"]: r for r in json.load(f)["results"]}
+    with open(new_path, encoding="utf-8") as f:
+        new = {r["size"]: r for r in json.load(f)["results"]}
+
+    def delta(a, b):
+        return f"{a:>10.1f} -> {b:>10.1f} ({(b - a) / a * 100:+.1f}%)" if a else f"{a:>10.1f} -> {b:>10.1f}"
+
+    for size in sorted(set(old) & set(new)):
+        o, n = old[size], new[size]
+        print(f"\n📊 {size} postings")
+        print(f"   total p50     {delta(o['total']['p50_ms'], n['total']['p50_ms'])}")
+        print(f"   total p95     {delta(o['total']['p95_ms'], n['total']['p95_ms'])}")
+        for stage in STAGES:
+            if stage in o["stages"] and stage in n["stages"]:
+                print(f"   {stage:<9} p95 {delta(o['stages'][stage]['p95_ms'], n['stages'][stage]['p95_ms'])}")
+        for metric in ("jobs_per_second", "llm_calls_per_search", "prompt_tokens_per_search", "peak_rss_mb"):
+            print(f"   {metric:<13} {delta(o[metric], n[metric])}")
+
+# ==============================================================================
+# SECTION 4: RECORDING & CLI
+# ==============================================================================
+
+def record(args):
+    """Runs one real scrape of every expanded term and stores the DataFrames for later replays."""
+    from dotenv import load_dotenv
+    load_dotenv()
+    import services.seeker as seeker
+    from benchmarks.corpus import recording_scraper
+    from services.scrape_scheduler import scrape_terms_concurrently
+    from services.term_expander import get_expanded_terms
+
+    seeker.scrape_jobs = recording_scraper(seeker.scrape_jobs, args.record)
+    terms = get_expanded_terms(args.term)[:5]
+    jobs = scrape_terms_concurrently(terms, location=args.location, results_per_term=args.results_wanted,
+                                     hours_old=args.hours_old)
+    print(f"🎞️  Recorded '{args.record}': {len(jobs)} approved jobs for {len(terms)} terms.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the SeekerBot search pipeline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="synthetic corpus sizes")
+    parser.add_argument("--recording", help="replay benchmarks/recordings/<name> instead of synthetic corpora")
+    parser.add_argument("--searches", type=int, default=5, help="searches per corpus size")
+    parser.add_argument("--term", default=DEFAULT_TERM)
+    parser.add_argument("--location", default="Brazil")
+    parser.add_argument("--results-wanted", type=int, default=30)
+    parser.add_argument("--hours-old", type=int, default=24)
+    parser.add_argument("--min-score", type=int, default=80)
+    parser.add_argument("--target-matches", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=300, help="mean LLM stub latency")
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--rate-limit-prob", type=float, default=0.0, help="share of LLM calls answered with 429")
+    parser.add_argument("--rpm", type=int, default=100000, help="LLM_RPM of the app's limiter during the run")
+    parser.add_argument("--tpm", type=int, default=10**9, help="LLM_TPM of the app's limiter during the run")
+    parser.add_argument("--batch-mode", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="show the pipeline's own logs")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--record", help="scrape live and store the DataFrames under this recording name")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two stored result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.record:
+        record(args)
+        return
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sizes = [None] if args.recording else args.sizes
+    results = []
+    for size in sizes:
+        settings = {
+            "env": benchmark_environment(args), "repo_root": repo_root, "size": size,
+            "recording": args.recording, "searches": args.searches, "term": args.term,
+            "location": args.location, "results_wanted": args.results_wanted, "hours_old": args.hours_old, "min_score": args.min_score,
+            "target_matches": args.target_matches, "latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms,
+            "rate_limit_prob": args.rate_limit_prob, "seed": args.seed, "verbose": args.verbose,
+        }
+        # A fresh interpreter per size, so peak RSS belongs to that corpus alone
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            summary = summarize(pool.apply(run_size, (settings,)))
+        print_summary(summary)
+        results.append(summary)
+
+    if not args.no_save:
+        payload = {
+            "meta": {
+                "git": git_revision(),
+                "created_at": datetime.datetime.utcnow().isoformat(timespec="seconds") + "Z",
+                "config": {k: v for k, v in vars(args).items() if k not in ("compare", "record", "no_save", "verbose")},
+            },
+            "results": results,
+        }
+        print(f"\n💾 Results stored in {save_results(payload)}")
+
+if __name__ == "__main__":
+    main()
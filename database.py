@@ -2,7 +2,7 @@ import os
 import sys
 import datetime
 from dotenv import load_dotenv
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, create_engine
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, LargeBinary, create_engine
 from sqlalchemy.orm import declarative_base
 
 load_dotenv()
@@ -38,6 +38,99 @@ class Job(Base):
     # NOVO CAMPO: Data que a vaga foi postada no LinkedIn/Indeed/Google
     published_at = Column(String(50)) 
 
+    # Incremental crawl index: identity and change detection of a posting across runs
+    fingerprint = Column(Text, index=True)
+    content_hash = Column(String(64))
+    first_seen_at = Column(DateTime, default=datetime.datetime.utcnow)
+    last_seen_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    search_term = Column(String(255), index=True)
+    search_location = Column(String(255))
+
+class CVProfileEntry(Base):
+    __tablename__ = 'cv_profiles'
+
+    # sha256(cv_hash:model:profile_prompt_version)
+    cache_key = Column(String(64), primary_key=True)
+    cv_hash = Column(String(64), index=True)
+    # JSON structured profile (skills, seniority, years, domains, languages...)
+    profile = Column(Text, nullable=False)
+    model_name = Column(String(255))
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class JobSighting(Base):
+    __tablename__ = 'job_sightings'
+
+    # Which crawled (term, location) found a posting; a posting can belong to several
+    link = Column(Text, primary_key=True)
+    search_term = Column(String(255), primary_key=True)
+    search_location = Column(String(255), primary_key=True)
+    first_seen_at = Column(DateTime, default=datetime.datetime.utcnow)
+    last_seen_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class JobSeen(Base):
+    __tablename__ = 'job_seen'
+
+    # Postings an incremental searcher (its CV hash) was already handed, and with which content
+    consumer = Column(String(64), primary_key=True)
+    link = Column(Text, primary_key=True)
+    content_hash = Column(String(64))
+    seen_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class JobVector(Base):
+    __tablename__ = 'job_vectors'
+
+    # Local embedding of a `jobs` row, for CV-to-job retrieval without scraping
+    link = Column(Text, primary_key=True)
+    content_hash = Column(String(64))
+    # Tokenizer/dimensions/seed of the embedding; rows of other versions are re-embedded
+    embedding_version = Column(String(50), index=True)
+    # float16 little-endian bytes
+    vector = Column(LargeBinary, nullable=False)
+    embedded_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+
+class CrawlWatermark(Base):
+    __tablename__ = 'crawl_watermarks'
+
+    # Normalized search term + user location of the crawl
+    search_term = Column(String(255), primary_key=True)
+    search_location = Column(String(255), primary_key=True)
+    last_crawl_at = Column(DateTime, nullable=False)
+    # Oldest posting time the uninterrupted chain of crawls is known to cover
+    covered_since = Column(DateTime)
+
+class SearchWatermark(Base):
+    __tablename__ = 'search_watermarks'
+
+    # Last completed incremental crawl of (term, location) for one consumer (CV hash);
+    # kept apart from the pre-crawler's corpus watermarks so neither shrinks the other's window
+    consumer = Column(String(64), primary_key=True)
+    search_term = Column(String(255), primary_key=True)
+    search_location = Column(String(255), primary_key=True)
+    last_crawl_at = Column(DateTime, nullable=False)
+
+class ScoreCacheEntry(Base):
+    __tablename__ = 'score_cache'
+
+    # sha256(cv_hash:job_hash:model:prompt_version)
+    cache_key = Column(String(64), primary_key=True)
+    score = Column(Integer)
+    rationale = Column(Text)
+    model_name = Column(String(255))
+    prompt_version = Column(String(50))
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class CVDocument(Base):
+    __tablename__ = 'cv_documents'
+
+    # Short random token kept in the Flask session
+    token = Column(String(32), primary_key=True)
+    cv_hash = Column(String(64), index=True)
+    text = Column(Text, nullable=False)
+    token_count = Column(Integer)
+    # JSON {token: count} of the CV's matching tokens, most frequent first (the pre-ranker's BM25 query)
+    skills = Column(Text)
+    last_used_at = Column(DateTime, default=datetime.datetime.utcnow)
+
 engine = create_engine(DATABASE_URL)
 
 def init_db(reset=False):
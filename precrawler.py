@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import time
+import datetime
+from dotenv import load_dotenv
+
+# Load environment variables from .env file (before the services read their tuning knobs)
+load_dotenv()
+
+from services.scrape_scheduler import scrape_terms_concurrently
+from services.term_expander import get_expanded_terms
+from services.vector_index import vector_index
+
+# ==============================================================================
+# SECTION 1: CONFIGURATION (TERM x LOCATION MATRIX)
+# ==============================================================================
+
+PRECRAWL_MATRIX_FILE = os.getenv(
+    "PRECRAWL_MATRIX_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "precrawl_matrix.json")
+)
+PRECRAWL_INTERVAL_MINUTES = float(os.getenv("PRECRAWL_INTERVAL_MINUTES", 60))
+
+def load_matrix(path: str = PRECRAWL_MATRIX_FILE) -> dict:
+    """
+    Reads the popular queries to keep warm:
+    {"terms": [...], "locations": [...], "results_per_term": 30, "hours_old": 72}
+    """
+    with open(path, encoding="utf-8") as f:
+        matrix = json.load(f)
+    matrix.setdefault("results_per_term", 30)
+    matrix.setdefault("hours_old", 72)
+    return matrix
+
+# ==============================================================================
+# SECTION 2: CRAWL CYCLE
+# ==============================================================================
+
+def run_cycle(matrix: dict):
+    """
+    Crawls every base term x location of the matrix into the shared corpus.
+    Terms are expanded exactly like a user search, so /search finds every expanded
+    term fresh; incremental mode only scrapes the hours since each term's last crawl.
+    Nothing is scored here, so the crawled postings are stored without being marked as
+    seen: every CV still gets them in its incremental searches.
+    """
+    started = time.monotonic()
+    for base_term in matrix["terms"]:
+        expanded_terms = get_expanded_terms(base_term)[:5]
+        for location in matrix["locations"]:
+            print(f"\n📚 Pre-crawling '{base_term}' @ {location}...")
+            try:
+                scrape_terms_concurrently(
+                    expanded_terms,
+                    location=location,
+                    results_per_term=matrix["results_per_term"],
+                    hours_old=matrix["hours_old"],
+                    incremental=True,
+                )
+            except Exception as e:
+                print(f"❌ Pre-crawl failed for '{base_term}' @ {location}: {e}")
+    # Postings stored before the vector index existed (or before an embedding version bump)
+    vector_index.backfill()
+    print(f"\n✅ Pre-crawl cycle finished in {time.monotonic() - started:.0f}s")
+
+def main():
+    """
+    Usage:
+        python precrawler.py          # crawl the matrix every PRECRAWL_INTERVAL_MINUTES
+        python precrawler.py --once   # single cycle (e.g. from an external cron)
+    """
+    once = "--once" in sys.argv
+    interval = PRECRAWL_INTERVAL_MINUTES * 60
+
+    while True:
+        cycle_started = time.monotonic()
+        # Re-read the matrix every cycle so it can be edited without a restart
+        run_cycle(load_matrix())
+        if once:
+            return
+
+        # Fixed-rate schedule: a slow cycle shortens the next wait instead of drifting
+        wait = max(0, interval - (time.monotonic() - cycle_started))
+        next_run = datetime.datetime.now() + datetime.timedelta(seconds=wait)
+        print(f"💤 Next pre-crawl at {next_run:%H:%M:%S}")
+        time.sleep(wait)
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n👋 Pre-crawler stopped.")
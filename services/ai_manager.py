@@ -1,6 +1,141 @@
 import os
 import json
-from openai import OpenAI
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from services.llm_client import get_llm_client, llm_clients
+from services.rate_limiter import get_llm_rate_limiter
+from services.cache import get_score_cache, sha256_text, TTLCache
+from services.seeker import normalize_text
+from services.telemetry import JOBS_SCORED, log_event, metrics, record_llm_call, span, bind_trace
+from services.cv_profile import (
+    CV_PROFILE_PROMPT,
+    CV_PROFILE_SCORING,
+    PROFILE_PROMPT_VERSION,
+    PROFILE_RESPONSE_TOKENS,
+    get_cv_profile_store,
+    normalize_profile,
+    format_profile,
+)
+
+# Bump whenever the scoring prompt changes so cached scores from the old prompt are ignored
+PROMPT_VERSION = "ats-v2"
+
+# Scoring pool tuning (all overridable through the environment)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 5))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", 2))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", 60))
+# Per-call timeout of a scoring request (seconds), plus the time to generate the answer
+# at a conservative ~50 tokens/s, so larger batch answers get proportionally longer
+LLM_SCORE_TIMEOUT = float(os.getenv("LLM_SCORE_TIMEOUT", 45))
+
+# Room reserved for the JSON answer when estimating the tokens of a call
+SCORE_RESPONSE_TOKENS = 200
+
+# Batch mode: several jobs scored against a single copy of the CV per request
+LLM_BATCH_MODE = os.getenv("LLM_BATCH_MODE", "False") == "True"
+LLM_BATCH_MAX_JOBS = int(os.getenv("LLM_BATCH_MAX_JOBS", 8))
+# Input budget of one batch request (CV + prompt + job descriptions), kept well inside the context window
+LLM_BATCH_MAX_INPUT_TOKENS = int(os.getenv("LLM_BATCH_MAX_INPUT_TOKENS", 12000))
+BATCH_RESPONSE_TOKENS_PER_JOB = 150
+
+# Two-tier cascade: a fast model scores every job and only scores within LLM_CASCADE_BAND points
+# of the user's min_score are re-scored by the strong model (LLM_MODEL)
+LLM_CASCADE = os.getenv("LLM_CASCADE", "False") == "True"
+LLM_CASCADE_FAST_MODEL = os.getenv("LLM_CASCADE_FAST_MODEL", "llama-3.1-8b-instant")
+LLM_CASCADE_BAND = int(os.getenv("LLM_CASCADE_BAND", 10))
+
+# Truncate CV slightly if it's monstrously huge to prevent Token Limits (approx 15000 chars)
+CV_MAX_CHARS = 15000
+
+# =====================================================================
+# THE ELITE RECRUITER PROMPT
+# =====================================================================
+ATS_RUBRIC_PROMPT = (
+    "You are a strict, elite Tech Recruiter and an advanced ATS screening AI. "
+    "Evaluate the Candidate (given as their CV or as a structured profile extracted from it) against the Job Description. "
+    "Calculate the 'score' (integer 0-100) strictly based on this rubric:\n"
+    "- 40%: Hard Skills & Tech Stack match (Do they have the exact tools/languages required?).\n"
+    "- 40%: Experience level match (Penalize heavily if the job requires Senior/Lead experience (e.g., 5+ years) and the candidate is Junior/Mid).\n"
+    "- 20%: Domain knowledge, education, and soft skills.\n\n"
+    "Be extremely critical. A score above 80 should be rare and reserved ONLY for candidates who meet almost all requirements.\n\n"
+)
+
+SINGLE_JOB_OUTPUT_PROMPT = (
+    "Return ONLY a valid JSON object with EXACTLY these two keys:\n"
+    "1. 'score': <int>\n"
+    "2. 'rationale': <A short paragraph in Portuguese (max 3 sentences) explaining the main reason for the score. "
+    "Focus on the biggest gap or the strongest match. Be direct and professional.>"
+)
+
+BATCH_OUTPUT_PROMPT = (
+    "You will receive SEVERAL job descriptions, each one introduced by a header '--- JOB <id> ---'. "
+    "Score EACH job independently against the same CV.\n"
+    "Return ONLY a valid JSON object with EXACTLY one key 'results': an array with one entry per job, "
+    "each entry having EXACTLY these three keys:\n"
+    "1. 'id': <the job id from its header, as a string>\n"
+    "2. 'score': <int>\n"
+    "3. 'rationale': <A short paragraph in Portuguese (max 3 sentences) explaining the main reason for the score. "
+    "Focus on the biggest gap or the strongest match. Be direct and professional.>"
+)
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used to feed the TPM limiter."""
+    return len(text or "") // 4 + 1
+
+_cv_fingerprints = TTLCache(max_entries=64)
+_cv_token_counts = TTLCache(max_entries=64)
+
+def cv_fingerprint(master_cv: str) -> str:
+    """sha256 of a CV, memoized so a search hashes its CV once instead of once per job."""
+    fingerprint = _cv_fingerprints.get(master_cv)
+    if fingerprint is None:
+        fingerprint = sha256_text(master_cv)
+        _cv_fingerprints.set(master_cv, fingerprint)
+    return fingerprint
+
+def cv_token_count(master_cv: str) -> int:
+    """Estimated tokens of a CV, memoized like cv_fingerprint."""
+    token_count = _cv_token_counts.get(master_cv)
+    if token_count is None:
+        token_count = estimate_tokens(master_cv)
+        _cv_token_counts.set(master_cv, token_count)
+    return token_count
+
+def remember_cv(master_cv: str, cv_hash: str, token_count: int):
+    """Seeds the memos with the artifacts computed at upload by the CV store, so they are never recomputed."""
+    _cv_fingerprints.set(master_cv, cv_hash)
+    _cv_token_counts.set(master_cv, token_count)
+
+def validate_score_entry(entry) -> dict | None:
+    """Returns a clean {score, rationale} dict, or None if the model's entry is missing or malformed."""
+    if not isinstance(entry, dict):
+        return None
+    try:
+        score = int(entry.get("score"))
+    except (TypeError, ValueError):
+        return None
+    rationale = entry.get("rationale")
+    if not 0 <= score <= 100 or not isinstance(rationale, str) or not rationale.strip():
+        return None
+    return {"score": score, "rationale": rationale.strip()}
+
+def is_rate_limit_error(error: Exception) -> bool:
+    error_msg = str(error).lower()
+    return "429" in error_msg or "rate limit" in error_msg or "too many requests" in error_msg
+
+def retry_after_seconds(error: Exception):
+    """Reads the provider's Retry-After header from an OpenAI error, if present."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
 
 class AIManager:
     """
@@ -8,96 +143,526 @@ class AIManager:
     for resume tailoring and job matching analysis.
     """
 
-    def __init__(self, base_url: str = None, api_key: str = None, model_name: str = None):
+    def __init__(self, base_url: str = None, api_key: str = None, model_name: str = None, score_cache=None,
+                 use_profile: bool = None):
         # Setup to automatically pull from environment variables (like Groq or OpenAI)
-        # Using Groq's base URL and Llama 3 as standard for fast/free evaluation if not specified
-        self.client = OpenAI(
-            base_url=base_url or os.getenv("LLM_BASE_URL", "https://api.groq.com/openai/v1"),
-            api_key=api_key or os.getenv("GROQ_API_KEY", os.getenv("OPENAI_API_KEY", "no-key-needed"))
-        )
+        # Using Groq's base URL and Llama 3 as standard for fast/free evaluation if not specified.
+        # The client (and its keep-alive connection pool) is shared by the whole process;
+        # it never retries on its own, retries are handled below with the shared limiter and jittered backoff
+        self.client = get_llm_client(base_url, api_key)
         self.model_name = model_name or os.getenv("LLM_MODEL", "meta-llama/llama-4-scout-17b-16e-instruct")
+        self.rate_limiter = get_llm_rate_limiter()
+        self.score_cache = score_cache or get_score_cache()
+        # Tokens actually spent by this manager's completions (from the API usage when reported)
+        self.tokens_used = 0
+        self._usage_lock = threading.Lock()
+        # Score against the compact CV profile (profiled once per CV hash) instead of the raw text
+        self.use_profile = CV_PROFILE_SCORING if use_profile is None else use_profile
+        self.profile_store = get_cv_profile_store()
 
-    def evaluate_job_match(self, master_cv: str, job_description: str) -> dict:
+    def evaluate_job_match(self, master_cv: str, job_description: str, cache_text: str = None) -> dict | None:
         """
         Compares the CV text against a job description and returns a strict match score and rationale.
+        Scores are cached by (CV hash, normalized job hash, model, prompt version), so an unchanged
+        CV/job pair never goes back to the LLM. The job hash is taken from `cache_text` when given
+        (the full description of a compacted job), otherwise from `job_description`.
+        Returns None (and caches nothing) when the LLM fails or answers with an unusable entry,
+        so a failure is never mistaken for a real score of 0.
         """
-        # =====================================================================
-        # THE ELITE RECRUITER PROMPT
-        # =====================================================================
-        system_prompt = (
-            "You are a strict, elite Tech Recruiter and an advanced ATS screening AI. "
-            "Evaluate the Candidate's CV against the Job Description. "
-            "Calculate the 'score' (integer 0-100) strictly based on this rubric:\n"
-            "- 40%: Hard Skills & Tech Stack match (Do they have the exact tools/languages required?).\n"
-            "- 40%: Experience level match (Penalize heavily if the job requires Senior/Lead experience (e.g., 5+ years) and the candidate is Junior/Mid).\n"
-            "- 20%: Domain knowledge, education, and soft skills.\n\n"
-            "Be extremely critical. A score above 80 should be rare and reserved ONLY for candidates who meet almost all requirements.\n\n"
-            "Return ONLY a valid JSON object with EXACTLY these two keys:\n"
-            "1. 'score': <int>\n"
-            "2. 'rationale': <A short paragraph in Portuguese (max 3 sentences) explaining the main reason for the score. "
-            "Focus on the biggest gap or the strongest match. Be direct and professional.>"
-        )
+        # Resolved first: the cache key must carry the prompt version actually used (profile or raw CV)
+        candidate_block, prompt_version = self.candidate_context(master_cv)
+        cache_key = self.job_cache_key(master_cv, cache_text or job_description, prompt_version)
+        cached = self.score_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+
+        system_prompt = ATS_RUBRIC_PROMPT + SINGLE_JOB_OUTPUT_PROMPT
 
-        # Truncate CV slightly if it's monstrously huge to prevent Token Limits (approx 15000 chars)
-        safe_cv = master_cv[:15000] if master_cv else ""
-        
         user_prompt = (
-            f"--- CANDIDATE CV ---\n{safe_cv}\n\n"
+            f"{candidate_block}\n\n"
             f"--- TARGET JOB DESCRIPTION ---\n{job_description}"
         )
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.1, # Keep it low so the AI is analytical, not creative
-                response_format={"type": "json_object"} 
+        result = validate_score_entry(self.complete_json(system_prompt, user_prompt, purpose="score"))
+        if result is None:
+            # Generic errors leave this job unscored; the rest of the jobs are still processed
+            return None
+
+        self.score_cache.set(cache_key, result, model_name=self.model_name, prompt_version=prompt_version)
+        return result
+
+    def job_cache_key(self, master_cv: str, job_description: str, prompt_version: str) -> str:
+        return self.score_cache.make_key(
+            cv_fingerprint(master_cv), sha256_text(normalize_text(job_description)), self.model_name, prompt_version
+        )
+
+    @staticmethod
+    def prepare_cv(master_cv: str) -> str:
+        return master_cv[:CV_MAX_CHARS] if master_cv else ""
+
+    def _profile_key(self, master_cv: str) -> str:
+        return self.profile_store.make_key(cv_fingerprint(master_cv), self.model_name)
+
+    def cv_profile(self, master_cv: str):
+        """
+        Structured profile of the CV (skills, years, seniority, domains, languages), extracted by the
+        LLM once per CV hash and cached. Returns None if the CV could not be profiled.
+        """
+        key = self._profile_key(master_cv)
+        if self.profile_store.has_failed(key):
+            return None
+        profile = self.profile_store.get(key)
+        if profile is not None:
+            return profile
+
+        # Workers (and concurrent searches) with the same CV wait for a single profiling call
+        with self.profile_store.key_lock(key):
+            profile = self.profile_store.get(key)
+            if profile is not None or self.profile_store.has_failed(key):
+                return profile
+            try:
+                data = self.complete_json(
+                    CV_PROFILE_PROMPT, f"--- CANDIDATE CV ---\n{self.prepare_cv(master_cv)}",
+                    response_tokens=PROFILE_RESPONSE_TOKENS, purpose="cv_profile"
+                )
+            except Exception as e:
+                data = None
+                print(f"❌ CV profiling failed: {e}")
+            profile = normalize_profile(data)
+            if profile is None:
+                print("⚠️ Could not profile the CV. Scoring against the raw CV text instead.")
+                self.profile_store.mark_failed(key)
+                return None
+            self.profile_store.set(key, profile, cv_hash=cv_fingerprint(master_cv), model_name=self.model_name)
+            print(f"🧾 CV profiled once: {profile['seniority']}, {profile['years_experience']}y, {len(profile['skills'])} skills")
+            return profile
+
+    def candidate_context(self, master_cv: str) -> tuple:
+        """
+        Returns (candidate block of the prompt, prompt version): the compact profile when available,
+        otherwise the CV text truncated to CV_MAX_CHARS. The version tells the two apart in score cache keys.
+        """
+        if self.use_profile:
+            profile = self.cv_profile(master_cv)
+            if profile is not None:
+                return (f"--- CANDIDATE PROFILE (extracted from the CV) ---\n{format_profile(profile)}",
+                        f"{PROMPT_VERSION}:{PROFILE_PROMPT_VERSION}")
+        return f"--- CANDIDATE CV ---\n{self.prepare_cv(master_cv)}", f"{PROMPT_VERSION}:raw-cv"
+
+    def plan_batches(self, master_cv: str, job_descriptions: list) -> list:
+        """
+        Greedily groups job indexes into batches whose estimated input (prompt + one CV copy +
+        descriptions) stays under LLM_BATCH_MAX_INPUT_TOKENS, with at most LLM_BATCH_MAX_JOBS each.
+        Long descriptions therefore produce smaller batches.
+        """
+        candidate_block, prompt_version = self.candidate_context(master_cv)
+        if prompt_version.endswith(":raw-cv"):
+            # Raw CV block: the CV's stored token count, capped at CV_MAX_CHARS like prepare_cv
+            candidate_tokens = min(cv_token_count(master_cv), CV_MAX_CHARS // 4 + 1)
+        else:
+            candidate_tokens = estimate_tokens(candidate_block)
+        fixed_tokens = estimate_tokens(ATS_RUBRIC_PROMPT + BATCH_OUTPUT_PROMPT) + candidate_tokens
+        budget = max(0, LLM_BATCH_MAX_INPUT_TOKENS - fixed_tokens)
+
+        batches, current, used = [], [], 0
+        for idx, description in enumerate(job_descriptions):
+            cost = estimate_tokens(description) + BATCH_RESPONSE_TOKENS_PER_JOB
+            if current and (used + cost > budget or len(current) >= LLM_BATCH_MAX_JOBS):
+                batches.append(current)
+                current, used = [], 0
+            current.append(idx)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    def evaluate_jobs_batch(self, master_cv: str, jobs: list) -> dict:
+        """
+        Scores several jobs in one request against a single copy of the CV.
+        `jobs` is a list of (job_id, job_description, cache_text) where cache_text may be None
+        (see evaluate_job_match); returns {job_id: {score, rationale} or None if it failed}.
+        Cached jobs are skipped, and any entry the model omits or malforms falls back to
+        a single-job evaluate_job_match call.
+        """
+        # Resolved first: the cache keys must carry the prompt version actually used (profile or raw CV)
+        candidate_block, prompt_version = self.candidate_context(master_cv)
+        results, pending = {}, []
+        for job_id, description, cache_text in jobs:
+            cached = self.score_cache.get(self.job_cache_key(master_cv, cache_text or description, prompt_version))
+            if cached is not None:
+                results[job_id] = dict(cached)
+            else:
+                pending.append((str(job_id), description, cache_text))
+
+        if len(pending) == 1:
+            job_id, description, cache_text = pending[0]
+            results[job_id] = self.evaluate_job_match(master_cv, description, cache_text)
+            return results
+
+        if pending:
+            system_prompt = ATS_RUBRIC_PROMPT + BATCH_OUTPUT_PROMPT
+            jobs_block = "\n\n".join(f"--- JOB {job_id} ---\n{description}" for job_id, description, _ in pending)
+            user_prompt = (
+                f"{candidate_block}\n\n"
+                f"--- TARGET JOB DESCRIPTIONS ---\n{jobs_block}"
+            )
+            response = self.complete_json(
+                system_prompt, user_prompt, response_tokens=BATCH_RESPONSE_TOKENS_PER_JOB * len(pending),
+                purpose="score_batch"
             )
-            
-            result_str = response.choices[0].message.content
-            return json.loads(result_str)
-            
-        except Exception as e:
-            error_msg = str(e).lower()
-            print(f"❌ AI API Error: {error_msg}")
-            
-            # CRITICAL: If we hit a Rate Limit (429), we MUST raise the error
-            # so the web interface can stop and warn the user.
-            if "429" in error_msg or "rate limit" in error_msg or "too many requests" in error_msg:
-                raise Exception("API_RATE_LIMIT_429")
-                
-            # For other generic errors, we return a 0 so the rest of the jobs can still be processed
-            return {"score": 0, "rationale": "Falha ao gerar avaliação devido a um erro na IA."}
+
+            entries = response.get("results") if isinstance(response, dict) else None
+            by_id = {}
+            if isinstance(entries, list):
+                for entry in entries:
+                    if isinstance(entry, dict) and entry.get("id") is not None:
+                        by_id[str(entry.get("id")).strip()] = entry
+
+            for job_id, description, cache_text in pending:
+                result = validate_score_entry(by_id.get(job_id))
+                if result is None:
+                    print(f"⚠️ Batch entry for job {job_id} missing or malformed. Falling back to a single call.")
+                    results[job_id] = self.evaluate_job_match(master_cv, description, cache_text)
+                    continue
+                self.score_cache.set(
+                    self.job_cache_key(master_cv, cache_text or description, prompt_version), result,
+                    model_name=self.model_name, prompt_version=prompt_version
+                )
+                results[job_id] = result
+
+        return results
+
+    def complete_json(self, system_prompt: str, user_prompt: str, response_tokens: int = SCORE_RESPONSE_TOKENS,
+                      purpose: str = "score"):
+        """
+        Sends one JSON-mode chat completion through the shared rate limiter.
+        Rate limits are retried with jittered backoff; returns the parsed JSON,
+        None on generic errors, and raises API_RATE_LIMIT_429 once retries are exhausted.
+        Traced as an `llm.call` span (tokens, retries, outcome) tagged with `purpose`.
+        """
+        estimated_prompt_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+        estimated_tokens = estimated_prompt_tokens + response_tokens
+
+        with span("llm.call", purpose=purpose) as call_span:
+            for attempt in range(LLM_MAX_RETRIES + 1):
+                with span("llm.wait", purpose=purpose):
+                    self.rate_limiter.acquire(estimated_tokens)
+                try:
+                    response = self.client.chat.completions.create(
+                        model=self.model_name,
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": user_prompt}
+                        ],
+                        temperature=0.1, # Keep it low so the AI is analytical, not creative
+                        response_format={"type": "json_object"},
+                        timeout=LLM_SCORE_TIMEOUT + response_tokens / 50
+                    )
+
+                    usage = getattr(response, "usage", None)
+                    prompt_tokens = getattr(usage, "prompt_tokens", None) or estimated_prompt_tokens
+                    completion_tokens = getattr(usage, "completion_tokens", None) or 0
+                    with self._usage_lock:
+                        self.tokens_used += getattr(usage, "total_tokens", None) or estimated_tokens
+                    call_span.set(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, retries=attempt)
+
+                    result_str = response.choices[0].message.content
+                    result = json.loads(result_str)
+                    call_span.set(outcome="ok")
+                    record_llm_call(purpose, "ok", prompt_tokens, completion_tokens, retries=attempt)
+                    return result
+
+                except Exception as e:
+                    error_msg = str(e).lower()
+
+                    if is_rate_limit_error(e):
+                        if attempt < LLM_MAX_RETRIES:
+                            # Full-jitter exponential backoff, unless the provider told us how long to wait
+                            delay = retry_after_seconds(e) or random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+                            log_event("llm.rate_limited", logging.WARNING, purpose=purpose, attempt=attempt + 1,
+                                      max_retries=LLM_MAX_RETRIES, retry_in_seconds=round(delay, 2))
+                            with span("llm.backoff", purpose=purpose):
+                                time.sleep(delay)
+                            continue
+                        # CRITICAL: Retries exhausted, so we raise the error and let
+                        # the caller decide what to do with this job.
+                        call_span.set(outcome="rate_limited", retries=attempt)
+                        record_llm_call(purpose, "rate_limited", retries=attempt)
+                        log_event("llm.error", logging.ERROR, purpose=purpose, error=error_msg, retries=attempt)
+                        raise Exception("API_RATE_LIMIT_429")
+
+                    call_span.set(outcome="error", retries=attempt)
+                    record_llm_call(purpose, "error", retries=attempt)
+                    log_event("llm.error", logging.ERROR, purpose=purpose, error=error_msg, retries=attempt)
+                    return None
 
 
 # ==============================================================================
 # SECTION: WRAPPER FOR IN-MEMORY WEB PROCESSING
 # ==============================================================================
 
-def evaluate_jobs_in_memory(jobs_list: list, cv_text: str) -> list:
+class ScoringBudget:
+    """
+    Stop conditions of an early-terminating scoring run: a target number of jobs at or above
+    `min_score`, a wall-clock budget and a token budget. Limits left at None/0 are ignored.
+    Once any of them is reached no new job is sent to the LLM (calls already in flight finish),
+    and the jobs never sent are counted in `skipped`. Jobs the LLM could not score are counted
+    by cause: `rate_limited` (retries exhausted) or `failed` (any other error).
+    """
+    def __init__(self, min_score: int = None, target_matches: int = None,
+                 max_seconds: float = None, max_tokens: int = None):
+        self.min_score = min_score
+        self.target_matches = target_matches
+        self.max_seconds = max_seconds
+        self.max_tokens = max_tokens
+        self.matches = 0
+        self.skipped = 0
+        self.rate_limited = 0
+        self.failed = 0
+        self.stop_reason = None
+        self._started = time.monotonic()
+
+    def record(self, job):
+        if self.min_score is not None and job.match_score is not None and job.match_score >= self.min_score:
+            self.matches += 1
+
+    def record_failure(self, error: Exception = None):
+        if error is not None and is_rate_limit_error(error):
+            self.rate_limited += 1
+        else:
+            self.failed += 1
+
+    def check(self, tokens_used: int):
+        """Returns why scoring must stop ("target", "time" or "tokens"), or None to keep going."""
+        if self.stop_reason is None:
+            if self.target_matches and self.matches >= self.target_matches:
+                self.stop_reason = "target"
+            elif self.max_seconds and time.monotonic() - self._started >= self.max_seconds:
+                self.stop_reason = "time"
+            elif self.max_tokens and tokens_used >= self.max_tokens:
+                self.stop_reason = "tokens"
+        return self.stop_reason
+
+CASCADE_JOBS = metrics.counter("cascade_jobs_total", "Jobs whose final score came from each cascade tier.", ("tier",))
+CASCADE_SECONDS = metrics.histogram("cascade_tier_seconds", "Latency of one scoring request per cascade tier.", ("tier",))
+
+class TierStats:
+    """Jobs, requests, latency and tokens of one cascade tier (thread-safe)."""
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.jobs = 0
+        self.requests = 0
+        self.seconds = 0.0
+        self.tokens = 0
+        self._lock = threading.Lock()
+
+    def record(self, jobs: int, seconds: float):
+        with self._lock:
+            self.jobs += jobs
+            self.requests += 1
+            self.seconds += seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "model": self.model_name,
+                "jobs": self.jobs,
+                "requests": self.requests,
+                "avg_latency_s": round(self.seconds / self.requests, 3) if self.requests else 0.0,
+                "tokens": self.tokens,
+            }
+
+class ScoringCascade:
+    """
+    Two-tier scoring: the fast model scores every job, and a job is escalated to the strong
+    model only when its fast score lands within `band` points of `min_score` (where the
+    accept/reject decision is uncertain), or when the fast model failed to score it at all.
+    Clear rejects and clear matches keep the fast score. Per-tier stats (jobs, requests, latency, tokens) are kept to tune the band.
+    """
+    def __init__(self, min_score: int, band: int = LLM_CASCADE_BAND, fast_model: str = LLM_CASCADE_FAST_MODEL,
+                 strong_model: str = None):
+        self.min_score = min_score
+        self.band = band
+        self.fast = AIManager(model_name=fast_model)
+        self.strong = AIManager(model_name=strong_model)
+        self.tiers = {"fast": TierStats(self.fast.model_name), "strong": TierStats(self.strong.model_name)}
+        self.escalated = 0
+        self._lock = threading.Lock()
+
+    def needs_escalation(self, result) -> bool:
+        # A job the fast tier could not score comes back as None (see evaluate_job_match):
+        # it is escalated rather than dropped, and stays unscored only if the strong tier fails too
+        if result is None:
+            return True
+        return self.min_score - self.band <= result.get("score", 0) < self.min_score + self.band
+
+    def tokens_used(self) -> int:
+        return self.fast.tokens_used + self.strong.tokens_used
+
+    def count_escalations(self, count: int):
+        with self._lock:
+            self.escalated += count
+
+    def stats(self) -> dict:
+        for name, manager in (("fast", self.fast), ("strong", self.strong)):
+            self.tiers[name].tokens = manager.tokens_used
+        with self._lock:
+            escalated = self.escalated
+        return {"band": self.band, "min_score": self.min_score, "escalated": escalated,
+                **{name: tier.snapshot() for name, tier in self.tiers.items()}}
+
+def job_text_for_cache(job) -> str:
+    # If there's no description, we can't really score it properly
+    return job.description if job.description and len(job.description) > 50 else job.title
+
+def job_text_for_scoring(job) -> str:
+    # Compacted, token-budgeted description when the compactor ran
+    if getattr(job, "scoring_text", None):
+        return job.scoring_text
+    return job_text_for_cache(job)
+
+def evaluate_jobs_in_memory(jobs_list: list, cv_text: str, max_workers: int = None, batch_mode: bool = None,
+                            on_result=None, budget: ScoringBudget = None, cascade: ScoringCascade = None) -> list:
     """
     Takes a list of JobInMemory objects and the extracted CV text.
-    Runs them through the AI and populates their score and rationale.
+    Runs them through the AI on a bounded thread pool and populates their score and rationale.
+    In batch mode each pool task scores a token-sized group of jobs in a single request.
+    `on_result(job, done, total)` is called as each job completes, so callers can stream results.
+    Jobs that still hit the rate limit after all retries, or whose LLM call failed, are left with
+    match_score=None (never a fake 0), so the work already done for the other jobs is kept.
+    Jobs are sent in list order, only as workers free up, so with a `budget` the run stops
+    early once it is reached: the remaining jobs are left unscored and counted in `budget.skipped`.
+    With a `cascade`, each unit is scored by the fast model first and only its borderline jobs
+    go to the strong model; `job.score_tier` records which tier produced the final score.
     """
     if not jobs_list:
         return []
         
-    ai = AIManager()
-    
-    for idx, job in enumerate(jobs_list):
-        print(f"   [{idx+1}/{len(jobs_list)}] Scoring: {job.title} at {job.company}...")
-        
-        # If there's no description, we can't really score it properly
-        jd = job.description if job.description and len(job.description) > 50 else job.title
-        
-        # Evaluate
-        result = ai.evaluate_job_match(cv_text, jd)
-        
-        # Populate the in-memory object
-        job.match_score = result.get("score", 0)
-        job.rationale = result.get("rationale", "Sem justificativa.")
+    ai = cascade.fast if cascade else AIManager()
+    tokens_used = cascade.tokens_used if cascade else (lambda: ai.tokens_used)
+    budget = budget or ScoringBudget()
+    max_workers = max_workers or LLM_MAX_CONCURRENCY
+    batch_mode = LLM_BATCH_MODE if batch_mode is None else batch_mode
+    descriptions = [job_text_for_scoring(job) for job in jobs_list]
+    # Scores are cached under the full description: the compacted text depends on the process's
+    # boilerplate model, which keeps learning and starts empty after every restart
+    cache_texts = [job_text_for_cache(job) for job in jobs_list]
+
+    if batch_mode:
+        units = ai.plan_batches(cv_text, descriptions)
+        print(f"📦 Batch mode: {len(jobs_list)} jobs in {len(units)} requests.")
+    else:
+        units = [[idx] for idx in range(len(jobs_list))]
+
+    def score_with(manager, unit):
+        if len(unit) == 1:
+            return {str(unit[0]): manager.evaluate_job_match(cv_text, descriptions[unit[0]], cache_texts[unit[0]])}
+        return manager.evaluate_jobs_batch(cv_text, [(str(idx), descriptions[idx], cache_texts[idx]) for idx in unit])
+
+    def tag_tier(results: dict, tier: str) -> dict:
+        # Failed jobs stay None, so they are reported as unscored rather than as a 0
+        return {key: {**value, "tier": tier} if value is not None else None for key, value in results.items()}
+
+    def timed_tier(tier: str, manager, unit):
+        started = time.perf_counter()
+        results = score_with(manager, unit)
+        elapsed = time.perf_counter() - started
+        cascade.tiers[tier].record(len(unit), elapsed)
+        CASCADE_SECONDS.observe(elapsed, tier=tier)
+        return tag_tier(results, tier)
+
+    def score_unit(unit):
+        if cascade is None:
+            return tag_tier(score_with(ai, unit), "single")
+
+        results = timed_tier("fast", cascade.fast, unit)
+        borderline = [idx for idx in unit if cascade.needs_escalation(results.get(str(idx)))]
+        if borderline:
+            cascade.count_escalations(len(borderline))
+            results.update(timed_tier("strong", cascade.strong, borderline))
+        return results
+
+    done = 0
+    pending = list(reversed(units))
+    in_flight = {}
+    workers = max(1, min(max_workers, len(units)))
+
+    # Pool threads record their LLM spans into the caller's trace
+    traced_score_unit = bind_trace(score_unit)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        def submit_next():
+            if pending and budget.check(tokens_used()) is None:
+                unit = pending.pop()
+                in_flight[pool.submit(traced_score_unit, unit)] = unit
+
+        for _ in range(workers):
+            submit_next()
+
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                unit = in_flight.pop(future)
+                try:
+                    results = future.result()
+                    error = None
+                except Exception as e:
+                    results, error = {}, e
+
+                for idx in unit:
+                    job = jobs_list[idx]
+                    done += 1
+                    result = results.get(str(idx))
+                    if result is None:
+                        JOBS_SCORED.inc(outcome="failed")
+                        log_event("job.not_scored", logging.WARNING, done=done, total=len(jobs_list),
+                                  title=job.title, company=job.company, error=str(error) if error else None)
+                        job.match_score = None
+                        job.rationale = (
+                            "Não avaliada: limite de requisições da IA atingido."
+                            if error is not None and is_rate_limit_error(error) else "Falha ao gerar avaliação devido a um erro na IA."
+                        )
+                        budget.record_failure(error)
+                        if on_result:
+                            on_result(job, done, len(jobs_list))
+                        continue
+
+                    # Populate the in-memory object
+                    job.match_score = result.get("score", 0)
+                    job.rationale = result.get("rationale", "Sem justificativa.")
+                    job.score_tier = result.get("tier")
+                    budget.record(job)
+                    JOBS_SCORED.inc(outcome="scored")
+                    if cascade:
+                        CASCADE_JOBS.inc(tier=job.score_tier)
+                    log_event("job.scored", logging.DEBUG, done=done, total=len(jobs_list), score=job.match_score,
+                              tier=job.score_tier, title=job.title, company=job.company)
+                    if on_result:
+                        on_result(job, done, len(jobs_list))
+
+                submit_next()
+
+    # Early termination: whatever was never sent stays unscored
+    for unit in pending:
+        for idx in unit:
+            job = jobs_list[idx]
+            job.match_score = None
+            job.rationale = "Não avaliada: a busca parou antes (meta de vagas ou orçamento de tempo/tokens atingido)."
+            budget.skipped += 1
+    if budget.skipped:
+        JOBS_SCORED.inc(budget.skipped, outcome="skipped")
+
+    log_event(
+        "scoring.summary",
+        jobs=len(jobs_list),
+        requests=len(units),
+        matches=budget.matches,
+        skipped=budget.skipped,
+        stop_reason=budget.stop_reason,
+        tokens_used=tokens_used(),
+        cascade=cascade.stats() if cascade else None,
+        score_cache=ai.score_cache.stats(),
+        llm_pool=llm_clients.stats(),
+    )
         
-    return jobs_list
\ No newline at end of file
+    return jobs_list
@@ -0,0 +1,188 @@
+import os
+import time
+import hashlib
+import datetime
+import threading
+from collections import OrderedDict
+
+from services.telemetry import metrics
+
+# ==============================================================================
+# SECTION 1: IN-PROCESS LRU CACHE WITH TTL
+# ==============================================================================
+
+class TTLCache:
+    """
+    Thread-safe LRU cache where every entry also expires after `ttl_seconds`.
+    Keeps hit/miss counters so callers can report how effective the cache is.
+    """
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl_seconds: float = None):
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return entry[0] if entry is not None else default
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and (entry[1] is None or entry[1] > time.monotonic())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+# ==============================================================================
+# SECTION 2: CONTENT-ADDRESSED ATS SCORE CACHE
+# ==============================================================================
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+class ScoreCache:
+    """
+    Two-level cache of ATS scores keyed by (CV hash, normalized job hash, model, prompt version).
+    Level 1 is an in-process TTLCache; level 2 is the `score_cache` table on the database.py engine
+    (the temporary SQLite file in public mode), so scores survive restarts and are shared by workers.
+    """
+    def __init__(self, max_entries: int = 4096, ttl_seconds: float = 7 * 24 * 3600, persist: bool = True):
+        self.ttl_seconds = ttl_seconds
+        self.memory = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.persist = persist
+        self.disk_hits = 0
+        self.misses = 0
+        self._engine = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(cv_hash: str, job_hash: str, model_name: str, prompt_version: str) -> str:
+        return sha256_text(f"{cv_hash}:{job_hash}:{model_name}:{prompt_version}")
+
+    def _get_engine(self):
+        """Lazily binds to database.py, creating the cache table on first use."""
+        if not self.persist:
+            return None
+        with self._lock:
+            if self._engine is None:
+                try:
+                    from database import engine, ScoreCacheEntry
+                    ScoreCacheEntry.__table__.create(engine, checkfirst=True)
+                    self._engine = engine
+                except (Exception, SystemExit) as e:
+                    # database.py exits when USE_DB=True without a DATABASE_URL; the memory layer keeps working
+                    print(f"⚠️ Score cache persistence disabled: {e}")
+                    self.persist = False
+            return self._engine
+
+    def get(self, key: str):
+        result = self.memory.get(key)
+        if result is not None:
+            return result
+
+        engine = self._get_engine()
+        if engine is not None:
+            from sqlalchemy.orm import Session
+            from database import ScoreCacheEntry
+            try:
+                with Session(engine) as db:
+                    row = db.get(ScoreCacheEntry, key)
+                    age = (datetime.datetime.utcnow() - row.created_at).total_seconds() if row else None
+                    if row is not None and age < self.ttl_seconds:
+                        result = {"score": row.score, "rationale": row.rationale}
+                        self.memory.set(key, result, ttl_seconds=self.ttl_seconds - age)
+                        self.disk_hits += 1
+                        return result
+            except Exception as e:
+                print(f"⚠️ Score cache read failed: {e}")
+
+        self.misses += 1
+        return None
+
+    def set(self, key: str, result: dict, model_name: str = None, prompt_version: str = None):
+        self.memory.set(key, result)
+
+        engine = self._get_engine()
+        if engine is not None:
+            from sqlalchemy.exc import IntegrityError
+            from sqlalchemy.orm import Session
+            from database import ScoreCacheEntry
+            try:
+                with Session(engine) as db:
+                    db.merge(ScoreCacheEntry(
+                        cache_key=key,
+                        score=result.get("score"),
+                        rationale=result.get("rationale"),
+                        model_name=model_name,
+                        prompt_version=prompt_version,
+                        created_at=datetime.datetime.utcnow(),
+                    ))
+                    db.commit()
+            except IntegrityError:
+                # Another worker stored the same key concurrently; both scores are equally valid
+                pass
+            except Exception as e:
+                print(f"⚠️ Score cache write failed: {e}")
+
+    def stats(self) -> dict:
+        memory_hits = self.memory.hits
+        total = memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((memory_hits + self.disk_hits) / total, 3) if total else 0.0,
+        }
+
+
+_score_cache = None
+_score_cache_lock = threading.Lock()
+
+def get_score_cache() -> ScoreCache:
+    """Returns the process-wide ATS score cache."""
+    global _score_cache
+    with _score_cache_lock:
+        if _score_cache is None:
+            _score_cache = ScoreCache(
+                max_entries=int(os.getenv("SCORE_CACHE_MAX_ENTRIES", 4096)),
+                ttl_seconds=float(os.getenv("SCORE_CACHE_TTL", 7 * 24 * 3600)),
+                persist=os.getenv("SCORE_CACHE_PERSIST", "True") == "True",
+            )
+            metrics.add_collector("score_cache", _score_cache.stats, "ATS score cache")
+        return _score_cache
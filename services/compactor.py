@@ -0,0 +1,185 @@
+import os
+import re
+import zlib
+import threading
+from collections import Counter, OrderedDict
+
+from services.ai_manager import estimate_tokens
+from services.seeker import normalize_text
+
+# Per-job token budget of the description sent to the LLM (the card still shows the full text)
+JOB_DESCRIPTION_MAX_TOKENS = int(os.getenv("JOB_DESCRIPTION_MAX_TOKENS", 600))
+
+# A line seen in this many different postings is boilerplate (EEO notices, company blurbs...)
+BOILERPLATE_MIN_DOCS = int(os.getenv("BOILERPLATE_MIN_DOCS", 3))
+# Shorter lines ("- Python", "Requisitos:") are legitimately repeated across postings
+BOILERPLATE_MIN_WORDS = 6
+BOILERPLATE_MAX_KEYS = 50000
+# Postings remembered as already counted (LRU), so a re-scraped posting never counts twice
+BOILERPLATE_MAX_DOCS = 50000
+# Paragraphs longer than this are split into sentences so the budget can keep part of them
+MAX_LINE_TOKENS = 120
+
+# ==============================================================================
+# SECTION 1: MARKDOWN CLEANUP & SECTION CLASSIFICATION
+# ==============================================================================
+
+# Section headings worth keeping for the ATS rubric (hard skills, seniority, duties)
+KEEP_SECTION_PATTERN = re.compile(
+    r'requisit|requirement|qualifica|responsab|responsibilit|atividades|atribui|what you.?ll do|o que (voce|vai|esperamos)'
+    r'|skills|habilidades|competencias|conhecimentos|experien|must have|nice to have|diferenciais|desejavel|stack|tecnologias|perfil'
+)
+# Section headings that never change a match score
+DROP_SECTION_PATTERN = re.compile(
+    r'beneficio|benefit|perks|we offer|oferecemos|sobre (a|nos|o)|about (us|the company|the team|company)|quem somos'
+    r'|equal opportunit|diversity|diversidade|inclusao|eeo|salary|salario|remuneracao|como se candidatar|how to apply|etapas do processo'
+)
+
+_LINK_PATTERN = re.compile(r'\[([^\]]*)\]\([^)]*\)')
+_ESCAPE_PATTERN = re.compile(r'\\([\\`*_{}\[\]()#+\-.!>])')
+_EMPHASIS_PATTERN = re.compile(r'(\*\*|__|\*|_)(?=\S)(.+?)(?<=\S)\1')
+_SENTENCE_PATTERN = re.compile(r'(?<=[.!?;])\s+')
+
+def clean_markdown_line(line: str) -> str:
+    """Removes link targets, escapes and emphasis markers, which cost tokens and carry no meaning."""
+    line = _LINK_PATTERN.sub(r'\1', line)
+    line = _ESCAPE_PATTERN.sub(r'\1', line)
+    line = _EMPHASIS_PATTERN.sub(r'\2', line)
+    return re.sub(r'[ \t]+', ' ', line).strip()
+
+def heading_text(line: str) -> str | None:
+    """Normalized heading text if the (cleaned) line looks like a section heading, else None."""
+    if line.startswith('#'):
+        return normalize_text(line.lstrip('#'))
+    words = line.split()
+    if line.endswith(':') and 0 < len(words) <= 8:
+        return normalize_text(line)
+    return None
+
+def line_key(line: str) -> int | None:
+    """Fingerprint of a line for the boilerplate model, or None for lines too short to judge."""
+    normalized = normalize_text(line)
+    if len(normalized.split()) < BOILERPLATE_MIN_WORDS:
+        return None
+    return zlib.crc32(normalized.encode("utf-8"))
+
+# ==============================================================================
+# SECTION 2: BOILERPLATE LEARNED FROM THE CORPUS
+# ==============================================================================
+
+class BoilerplateModel:
+    """
+    Document frequency of description lines across every posting seen by the process.
+    A line found in BOILERPLATE_MIN_DOCS different postings is recurring boilerplate.
+    The model keeps learning and starts empty after a restart, so the compacted text of a
+    posting is NOT stable over time: the score cache is keyed on the full description instead.
+    """
+    def __init__(self, min_docs: int = BOILERPLATE_MIN_DOCS, max_keys: int = BOILERPLATE_MAX_KEYS,
+                 max_docs: int = BOILERPLATE_MAX_DOCS):
+        self.min_docs = min_docs
+        self.max_keys = max_keys
+        self.max_docs = max_docs
+        self._doc_freq = Counter()
+        self._seen_docs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def observe(self, descriptions: list):
+        for description in descriptions:
+            doc_key = zlib.crc32(normalize_text(description).encode("utf-8"))
+            keys = {key for key in (line_key(clean_markdown_line(l)) for l in description.splitlines()) if key is not None}
+            with self._lock:
+                if doc_key in self._seen_docs:
+                    self._seen_docs.move_to_end(doc_key)
+                    continue
+                self._seen_docs[doc_key] = None
+                while len(self._seen_docs) > self.max_docs:
+                    self._seen_docs.popitem(last=False)
+                self._doc_freq.update(keys)
+                if len(self._doc_freq) > self.max_keys:
+                    # Only one-off lines are pruned; the counted postings stay remembered
+                    self._doc_freq = Counter({k: c for k, c in self._doc_freq.items() if c > 1})
+
+    def is_boilerplate(self, key: int) -> bool:
+        with self._lock:
+            return self._doc_freq.get(key, 0) >= self.min_docs
+
+
+boilerplate_model = BoilerplateModel()
+
+# ==============================================================================
+# SECTION 3: COMPACTION WITH A PER-JOB TOKEN BUDGET
+# ==============================================================================
+
+def compact_description(description: str, max_tokens: int = JOB_DESCRIPTION_MAX_TOKENS,
+                        model: BoilerplateModel = None) -> str:
+    """
+    Compacts one markdown description for scoring:
+    1. cleans markdown noise and drops recurring boilerplate lines;
+    2. drops benefits / about-us / EEO sections;
+    3. fills the token budget with requirements and responsibilities first, then the rest,
+       keeping the original order of the selected lines.
+    """
+    model = model or boilerplate_model
+
+    cleaned = []
+    for raw_line in (description or "").splitlines():
+        line = clean_markdown_line(raw_line)
+        if estimate_tokens(line) > MAX_LINE_TOKENS:
+            cleaned.extend(_SENTENCE_PATTERN.split(line))
+        elif line:
+            cleaned.append(line)
+
+    lines = []  # (priority, text): 2 = keep section, 1 = neutral, 0 = dropped
+    section_priority = 1
+    for line in cleaned:
+        heading = heading_text(line)
+        if heading is not None:
+            if KEEP_SECTION_PATTERN.search(heading):
+                section_priority = 2
+            elif DROP_SECTION_PATTERN.search(heading):
+                section_priority = 0
+            else:
+                section_priority = 1
+            lines.append((section_priority, line.lstrip('# ')))
+            continue
+
+        key = line_key(line)
+        if section_priority < 2 and key is not None and model.is_boilerplate(key):
+            continue
+        lines.append((section_priority, line))
+
+    selected, used = set(), 0
+    for priority in (2, 1):
+        for idx, (line_priority, line) in enumerate(lines):
+            if line_priority != priority:
+                continue
+            cost = estimate_tokens(line)
+            if used + cost > max_tokens:
+                continue
+            selected.add(idx)
+            used += cost
+
+    return "\n".join(line for idx, (_, line) in enumerate(lines) if idx in selected)
+
+def compact_jobs(jobs_list: list, max_tokens: int = JOB_DESCRIPTION_MAX_TOKENS) -> list:
+    """
+    Learns boilerplate from this batch (on top of everything seen before), then stores the
+    compacted text of each job in `job.scoring_text`. Returns the jobs.
+    """
+    descriptions = [job.description or "" for job in jobs_list]
+    boilerplate_model.observe(descriptions)
+
+    before = after = 0
+    for job, description in zip(jobs_list, descriptions):
+        compacted = compact_description(description, max_tokens)
+        if len(compacted) > 50:
+            job.scoring_text = compacted
+        elif len(description) > 50:
+            # Nothing left worth sending (e.g. only boilerplate): send the start of the original
+            job.scoring_text = description[:max_tokens * 4]
+        before += estimate_tokens(description)
+        after += estimate_tokens(job.scoring_text or job.title)
+
+    if jobs_list:
+        print(f"✂️  Compacted {len(jobs_list)} descriptions: ~{before} -> ~{after} tokens (budget {max_tokens}/job).")
+    return jobs_list
@@ -0,0 +1,360 @@
+import os
+import math
+import datetime
+import threading
+import pandas as pd
+
+from services.cache import sha256_text
+from services.seeker import normalize_text
+
+# Extra hours re-scraped behind the watermark, so postings indexed late by the boards are not missed
+CRAWL_WATERMARK_OVERLAP_HOURS = int(os.getenv("CRAWL_WATERMARK_OVERLAP_HOURS", 1))
+
+# Rows per bulk statement (keeps SQLite under its bound-parameter limit)
+CRAWL_UPSERT_CHUNK = 500
+
+# A (term, location) crawled longer ago than this is stale: searches scrape it live instead
+CORPUS_MAX_AGE_MINUTES = float(os.getenv("CORPUS_MAX_AGE_MINUTES", 120))
+
+# Most recent corpus postings handed to a search per (term, location)
+CORPUS_MAX_JOBS = int(os.getenv("CORPUS_MAX_JOBS", 300))
+
+# ==============================================================================
+# SECTION 1: POSTING IDENTITY
+# ==============================================================================
+
+def job_fingerprint(job) -> str:
+    """Same title+company fingerprint used by the in-session deduplication."""
+    return normalize_text(job.title) + normalize_text(job.company)
+
+def job_content_hash(job) -> str:
+    """Changes whenever the visible content of a posting is edited on the board."""
+    return sha256_text("|".join(normalize_text(v) for v in (job.title, job.company, job.location, job.description)))
+
+def _chunks(items: list, size: int = CRAWL_UPSERT_CHUNK):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+# ==============================================================================
+# SECTION 2: PERSISTENT SEEN-JOB INDEX + WATERMARKS
+# ==============================================================================
+
+class CrawlStore:
+    """
+    Persistent index of every scraped posting (the `jobs` table), the (term, location)
+    crawls that found it (`job_sightings`) and crawl watermarks per (term, location).
+    - Incremental crawls only ask the boards for the hours elapsed since their watermark. The
+      pre-crawler owns the corpus watermarks (`crawl_watermarks`, read by `is_fresh`); each
+      incremental searcher has its own (`search_watermarks`, keyed by consumer).
+    - Incremental searches also skip the postings their CV was already handed with the same
+      content (`job_seen`, one seen set per consumer), so one searcher never hides a posting
+      from another.
+    - Kept warm by the pre-crawler, it is also the shared corpus searches answer from
+      while a (term, location) is fresh.
+    Without a usable database every crawl behaves as a full, live one.
+    """
+    def __init__(self, persist: bool = True):
+        self.persist = persist
+        self._engine = None
+        self._lock = threading.Lock()
+
+    def _get_engine(self):
+        """Lazily binds to database.py, creating/upgrading the crawl tables on first use."""
+        if not self.persist:
+            return None
+        with self._lock:
+            if self._engine is None:
+                try:
+                    from database import engine, Job, JobSighting, JobSeen, CrawlWatermark, SearchWatermark
+                    for table in (Job.__table__, JobSighting.__table__, JobSeen.__table__,
+                                  CrawlWatermark.__table__, SearchWatermark.__table__):
+                        table.create(engine, checkfirst=True)
+                        self._add_missing_columns(engine, table)
+                    self._engine = engine
+                except (Exception, SystemExit) as e:
+                    # database.py exits when USE_DB=True without a DATABASE_URL; crawl in full mode
+                    print(f"⚠️ Crawl index disabled (full crawls only): {e}")
+                    self.persist = False
+            return self._engine
+
+    @staticmethod
+    def _add_missing_columns(engine, table):
+        """
+        `create_all` never alters an existing table: add the crawl columns to older `jobs` tables,
+        together with the indexes the model declares on them.
+        """
+        from sqlalchemy import inspect, text
+        existing = {c["name"] for c in inspect(engine).get_columns(table.name)}
+        missing = [c for c in table.columns if c.name not in existing]
+        if not missing:
+            return
+        with engine.begin() as conn:
+            for column in missing:
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+        added = {c.name for c in missing}
+        for index in table.indexes:
+            if added & {c.name for c in index.columns}:
+                index.create(engine, checkfirst=True)
+        print(f"🛠️ Added crawl columns to '{table.name}': {', '.join(c.name for c in missing)}")
+
+    @staticmethod
+    def _key(term: str, location: str) -> tuple:
+        return normalize_text(term)[:255], normalize_text(location)[:255]
+
+    # --------------------------------------------------------------------------
+    # WATERMARKS
+    # --------------------------------------------------------------------------
+
+    def watermark(self, term: str, location: str, consumer: str = None):
+        """
+        UTC datetime of the last completed crawl of (term, location), or None: the pre-crawler's
+        corpus watermark without a `consumer`, that consumer's own one otherwise.
+        """
+        engine = self._get_engine()
+        if engine is None:
+            return None
+        from sqlalchemy.orm import Session
+        from database import CrawlWatermark, SearchWatermark
+        try:
+            with Session(engine) as db:
+                if consumer:
+                    row = db.get(SearchWatermark, (consumer, *self._key(term, location)))
+                else:
+                    row = db.get(CrawlWatermark, self._key(term, location))
+                return row.last_crawl_at if row else None
+        except Exception as e:
+            print(f"⚠️ Crawl watermark read failed: {e}")
+            return None
+
+    def incremental_hours(self, term: str, location: str, hours_old: int, consumer: str = None) -> int:
+        """Scrape window for the next crawl: hours since the watermark (plus overlap), capped at `hours_old`."""
+        last_crawl = self.watermark(term, location, consumer)
+        if last_crawl is None:
+            return hours_old
+        elapsed = (datetime.datetime.utcnow() - last_crawl).total_seconds() / 3600
+        return max(1, min(hours_old, math.ceil(elapsed) + CRAWL_WATERMARK_OVERLAP_HOURS))
+
+    def advance_watermark(self, term: str, location: str, crawled_at: datetime.datetime, window_hours: int,
+                          consumer: str = None):
+        """
+        Records a completed crawl that scraped the `window_hours` before `crawled_at`.
+        Corpus coverage keeps its start while consecutive windows overlap, and restarts otherwise.
+        With a `consumer` only that consumer's own watermark moves.
+        """
+        engine = self._get_engine()
+        if engine is None:
+            return
+        from sqlalchemy.orm import Session
+        from database import CrawlWatermark, SearchWatermark
+        key = self._key(term, location)
+        window_start = crawled_at - datetime.timedelta(hours=window_hours)
+        try:
+            with Session(engine) as db:
+                if consumer:
+                    row = db.get(SearchWatermark, (consumer, *key))
+                    if row is None:
+                        row = SearchWatermark(consumer=consumer, search_term=key[0], search_location=key[1])
+                        db.add(row)
+                    row.last_crawl_at = crawled_at
+                    db.commit()
+                    return
+                row = db.get(CrawlWatermark, key)
+                if row is None:
+                    row = CrawlWatermark(search_term=key[0], search_location=key[1])
+                    db.add(row)
+                if row.covered_since is None or row.last_crawl_at is None or row.last_crawl_at < window_start:
+                    row.covered_since = window_start
+                row.last_crawl_at = crawled_at
+                db.commit()
+        except Exception as e:
+            print(f"⚠️ Crawl watermark write failed: {e}")
+
+    def is_fresh(self, term: str, location: str, hours_old: int, max_age_minutes: float = CORPUS_MAX_AGE_MINUTES) -> bool:
+        """True when the corpus was crawled recently enough and covers the last `hours_old` hours."""
+        engine = self._get_engine()
+        if engine is None:
+            return False
+        from sqlalchemy.orm import Session
+        from database import CrawlWatermark
+        try:
+            with Session(engine) as db:
+                row = db.get(CrawlWatermark, self._key(term, location))
+        except Exception as e:
+            print(f"⚠️ Crawl watermark read failed: {e}")
+            return False
+        if row is None or row.covered_since is None:
+            return False
+        now = datetime.datetime.utcnow()
+        return (now - row.last_crawl_at).total_seconds() <= max_age_minutes * 60 \
+            and row.covered_since <= now - datetime.timedelta(hours=hours_old)
+
+    def load_corpus(self, term: str, location: str, hours_old: int, limit: int = CORPUS_MAX_JOBS) -> pd.DataFrame:
+        """
+        Postings of the corpus found by (term, location) within the last `hours_old` hours,
+        shaped like a jobspy DataFrame so they go through the same filters as a live scrape.
+        """
+        engine = self._get_engine()
+        if engine is None:
+            return None
+        from sqlalchemy import select
+        from sqlalchemy.orm import Session
+        from database import Job, JobSighting
+        search_term, search_location = self._key(term, location)
+        cutoff = datetime.datetime.utcnow() - datetime.timedelta(hours=hours_old + CRAWL_WATERMARK_OVERLAP_HOURS)
+        query = (
+            select(Job.title, Job.company, Job.location, Job.link.label("job_url"), Job.description,
+                   Job.source.label("site"), Job.published_at.label("date_posted"))
+            .join(JobSighting, JobSighting.link == Job.link)
+            .where(JobSighting.search_term == search_term,
+                   JobSighting.search_location == search_location,
+                   JobSighting.first_seen_at >= cutoff)
+            .order_by(JobSighting.last_seen_at.desc())
+            .limit(limit)
+        )
+        try:
+            with Session(engine) as db:
+                df = pd.DataFrame(db.execute(query).mappings().all())
+        except Exception as e:
+            print(f"⚠️ Corpus read failed: {e}")
+            return None
+        if df.empty:
+            return None
+
+        # The first crawl of a term backfills older postings: drop those published before the window
+        published = pd.to_datetime(df["date_posted"], format="%d/%m/%Y", errors="coerce")
+        df = df[published.isna() | (published >= pd.Timestamp(cutoff.date()))]
+        return df if not df.empty else None
+
+    # --------------------------------------------------------------------------
+    # SEEN-JOB INDEX
+    # --------------------------------------------------------------------------
+
+    @staticmethod
+    def _upsert_statement(engine, table, index_elements: list, refreshed: list):
+        """Dialect-native INSERT ... ON CONFLICT DO UPDATE, or None if unsupported."""
+        if engine.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif engine.dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            return None
+        stmt = insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={name: stmt.excluded[name] for name in refreshed},
+        )
+
+    def record_jobs(self, jobs: list, term: str, location: str):
+        """
+        Bulk-upserts the scraped postings of one crawl into the corpus (`jobs` + `job_sightings`).
+        Storing a posting never marks it as seen: that is per consumer, see `filter_unseen`.
+        """
+        engine = self._get_engine()
+        if engine is None or not jobs:
+            return
+
+        from sqlalchemy.orm import Session
+        from database import Job, JobSighting
+
+        now = datetime.datetime.utcnow()
+        search_term, search_location = self._key(term, location)
+        rows = {}
+        for job in jobs:
+            rows[job.link] = {
+                "title": (job.title or "")[:255],
+                "company": (job.company or "")[:255],
+                "location": (job.location or "")[:255],
+                "link": job.link,
+                "description": job.description,
+                "source": (job.source or "")[:100],
+                "published_at": (job.published_at or "")[:50],
+                "fingerprint": job_fingerprint(job),
+                "content_hash": job_content_hash(job),
+                "first_seen_at": now,
+                "last_seen_at": now,
+                "search_term": search_term,
+                "search_location": search_location,
+            }
+
+        try:
+            with Session(engine) as db:
+                sightings = [
+                    {"link": link, "search_term": search_term, "search_location": search_location,
+                     "first_seen_at": now, "last_seen_at": now}
+                    for link in rows
+                ]
+                upsert = self._upsert_statement(
+                    engine, Job.__table__, ["link"],
+                    ["title", "company", "location", "description", "source", "published_at",
+                     "fingerprint", "content_hash", "last_seen_at", "search_term", "search_location"]
+                )
+                sighting_upsert = self._upsert_statement(
+                    engine, JobSighting.__table__, ["link", "search_term", "search_location"], ["last_seen_at"]
+                )
+                if upsert is not None:
+                    for chunk in _chunks(list(rows.values())):
+                        db.execute(upsert, chunk)
+                    for chunk in _chunks(sightings):
+                        db.execute(sighting_upsert, chunk)
+                else:
+                    for row in rows.values():
+                        updated = {k: v for k, v in row.items() if k != "first_seen_at"}
+                        if not db.query(Job).filter(Job.link == row["link"]).update(updated):
+                            db.add(Job(**row))
+                    for sighting in sightings:
+                        existing = db.get(JobSighting, (sighting["link"], search_term, search_location))
+                        if existing is not None:
+                            existing.last_seen_at = now
+                        else:
+                            db.add(JobSighting(**sighting))
+                db.commit()
+        except Exception as e:
+            print(f"⚠️ Crawl index write failed: {e}")
+
+    def filter_unseen(self, jobs: list, consumer: str) -> list:
+        """
+        Returns only the postings `consumer` (an incremental searcher, keyed by CV hash) was
+        never handed, or whose content changed since, and remembers them as seen by it.
+        Every consumer has its own seen set: pre-crawls and other users' searches never hide
+        a posting from a CV that has not scored it. All postings pass without a database.
+        """
+        engine = self._get_engine()
+        if engine is None or not jobs:
+            return list(jobs)
+
+        from sqlalchemy import select
+        from sqlalchemy.orm import Session
+        from database import JobSeen
+
+        now = datetime.datetime.utcnow()
+        hashes = {job.link: job_content_hash(job) for job in jobs}
+        try:
+            with Session(engine) as db:
+                known = {}
+                for links in _chunks(list(hashes)):
+                    known.update(db.execute(
+                        select(JobSeen.link, JobSeen.content_hash)
+                        .where(JobSeen.consumer == consumer, JobSeen.link.in_(links))
+                    ).all())
+
+                rows = [
+                    {"consumer": consumer, "link": link, "content_hash": content_hash, "seen_at": now}
+                    for link, content_hash in hashes.items() if known.get(link) != content_hash
+                ]
+                upsert = self._upsert_statement(engine, JobSeen.__table__, ["consumer", "link"], ["content_hash", "seen_at"])
+                if upsert is not None:
+                    for chunk in _chunks(rows):
+                        db.execute(upsert, chunk)
+                else:
+                    for row in rows:
+                        db.merge(JobSeen(**row))
+                db.commit()
+        except Exception as e:
+            print(f"⚠️ Seen-job index write failed, treating all postings as new: {e}")
+            return list(jobs)
+
+        return [job for job in jobs if known.get(job.link) != hashes[job.link]]
+
+
+crawl_store = CrawlStore(persist=os.getenv("CRAWL_INDEX_PERSIST", "True") == "True")
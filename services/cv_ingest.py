@@ -0,0 +1,138 @@
+import io
+import os
+import re
+import hashlib
+import threading
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pypdf import PdfReader
+
+from services.cache import TTLCache
+
+# Per-upload limits
+CV_MAX_FILES = int(os.getenv("CV_MAX_FILES", 5))
+CV_MAX_FILE_BYTES = int(os.getenv("CV_MAX_FILE_BYTES", 10 * 1024 * 1024))
+CV_MAX_PAGES = int(os.getenv("CV_MAX_PAGES", 20))
+
+# Extraction workers; files with few pages are parsed inline, the pool is not worth its overhead
+CV_EXTRACT_WORKERS = int(os.getenv("CV_EXTRACT_WORKERS", 2))
+CV_PARALLEL_MIN_PAGES = 4
+
+# Extracted (and cleaned) text per file, keyed by the sha256 of its bytes
+_extraction_cache = TTLCache(max_entries=256, ttl_seconds=float(os.getenv("CV_EXTRACT_CACHE_TTL", 24 * 3600)))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# ==============================================================================
+# SECTION 1: PAGE EXTRACTION (PROCESS POOL)
+# ==============================================================================
+
+def _extract_pages(data: bytes, start: int, stop: int) -> list:
+    """Worker entry point: extracts the text of pages [start, stop) of a PDF."""
+    reader = PdfReader(io.BytesIO(data))
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # 'spawn' because the web process is multi-threaded, and forking it is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=CV_EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+def extract_pdf_pages(data: bytes) -> list:
+    """Returns the text of each page (up to CV_MAX_PAGES), spreading large PDFs over the process pool."""
+    page_count = min(len(PdfReader(io.BytesIO(data)).pages), CV_MAX_PAGES)
+
+    if page_count < CV_PARALLEL_MIN_PAGES or CV_EXTRACT_WORKERS < 2:
+        return _extract_pages(data, 0, page_count)
+
+    chunk = -(-page_count // CV_EXTRACT_WORKERS)
+    ranges = [(start, min(start + chunk, page_count)) for start in range(0, page_count, chunk)]
+    try:
+        pool = _get_pool()
+        futures = [pool.submit(_extract_pages, data, start, stop) for start, stop in ranges]
+        return [page for future in futures for page in future.result()]
+    except Exception as e:
+        print(f"⚠️ Parallel PDF extraction failed ({e}). Falling back to inline extraction.")
+        return _extract_pages(data, 0, page_count)
+
+# ==============================================================================
+# SECTION 2: TEXT CLEANUP
+# ==============================================================================
+
+# "3", "3/4", "Page 3 of 4", "Página 3 de 4" (up to 3 digits, so a lone year like "2021" is kept)
+PAGE_NUMBER_PATTERN = re.compile(r'^((page|pagina|página)\s*)?\d{1,3}(\s*(/|of|de)\s*\d{1,3})?$', re.IGNORECASE)
+
+def clean_cv_pages(pages: list) -> str:
+    """
+    Shrinks the CV text sent to the LLM without losing content:
+    collapses whitespace, drops page numbers and the header/footer lines repeated
+    on most pages, and removes consecutive duplicate lines and blank runs.
+    """
+    page_lines = [[re.sub(r'[ \t\u00a0]+', ' ', line).strip() for line in page.splitlines()] for page in pages]
+
+    # A line present on at least half of a multi-page CV is a running header/footer
+    boilerplate = set()
+    if len(page_lines) > 1:
+        presence = Counter(line for lines in page_lines for line in set(lines) if line)
+        boilerplate = {line for line, count in presence.items() if count >= max(2, len(page_lines) / 2)}
+
+    cleaned, previous = [], None
+    for idx, lines in enumerate(page_lines):
+        for line in lines:
+            if PAGE_NUMBER_PATTERN.match(line):
+                continue
+            # Keep the first occurrence of a repeated line (it may be the candidate's name)
+            if line in boilerplate and idx > 0:
+                continue
+            if line == previous or (not line and not previous):
+                continue
+            cleaned.append(line)
+            previous = line
+
+    return "\n".join(cleaned).strip()
+
+# ==============================================================================
+# SECTION 3: UPLOAD INGESTION
+# ==============================================================================
+
+def ingest_pdf_bytes(data: bytes, filename: str = "") -> str:
+    """Returns the cleaned text of one PDF, served from the hash cache when the same file was seen before."""
+    file_hash = hashlib.sha256(data).hexdigest()
+    cached = _extraction_cache.get(file_hash)
+    if cached is not None:
+        print(f"📄 CV '{filename}' served from extraction cache.")
+        return cached
+
+    text = clean_cv_pages(extract_pdf_pages(data))
+    _extraction_cache.set(file_hash, text)
+    return text
+
+def ingest_cv_files(files) -> str:
+    """
+    Extracts and combines the text of uploaded PDF files (werkzeug FileStorage objects),
+    enforcing the per-upload file, size and page limits. Unreadable files are skipped.
+    """
+    texts = []
+    for file in list(files)[:CV_MAX_FILES]:
+        if not file.filename or not file.filename.lower().endswith('.pdf'):
+            continue
+        data = file.read(CV_MAX_FILE_BYTES + 1)
+        if len(data) > CV_MAX_FILE_BYTES:
+            print(f"⚠️ CV {file.filename} skipped: larger than {CV_MAX_FILE_BYTES} bytes.")
+            continue
+        try:
+            text = ingest_pdf_bytes(data, file.filename)
+        except Exception as e:
+            print(f"❌ Error reading PDF {file.filename}: {e}")
+            continue
+        if text:
+            texts.append(text)
+
+    return "\n\n".join(texts)
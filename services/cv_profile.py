@@ -0,0 +1,191 @@
+import os
+import json
+import datetime
+import threading
+
+from services.cache import TTLCache, sha256_text
+
+# Bump whenever the profiling prompt or the profile format changes
+PROFILE_PROMPT_VERSION = "cv-profile-v1"
+
+# Score every job against the compact profile instead of the raw CV text
+CV_PROFILE_SCORING = os.getenv("CV_PROFILE_SCORING", "True") == "True"
+
+# Room reserved for the profile JSON when estimating the tokens of the profiling call
+PROFILE_RESPONSE_TOKENS = 600
+
+# How long (seconds) a CV the LLM failed to profile is scored against its raw text before profiling is retried
+CV_PROFILE_FAILURE_TTL = float(os.getenv("CV_PROFILE_FAILURE_TTL", 15 * 60))
+
+# Caps that keep the rendered profile compact (a few hundred tokens)
+PROFILE_MAX_SKILLS = 40
+PROFILE_MAX_ITEMS = 8
+
+# ==============================================================================
+# SECTION 1: PROFILING PROMPT & NORMALIZATION
+# ==============================================================================
+
+CV_PROFILE_PROMPT = (
+    "You are an expert technical recruiter. Read the candidate's CV and extract a compact, factual profile "
+    "that will later be used to screen the candidate against many job descriptions.\n"
+    "Return ONLY a valid JSON object with EXACTLY these keys:\n"
+    "1. 'skills': <array of the candidate's concrete hard skills, tools, languages and frameworks, most relevant first (max 40)>\n"
+    "2. 'years_experience': <int, total years of professional experience (0 if none)>\n"
+    "3. 'seniority': <one of 'intern', 'junior', 'mid', 'senior', 'lead'>\n"
+    "4. 'domains': <array of industries/scientific domains the candidate worked in>\n"
+    "5. 'languages': <array of spoken languages with level, e.g. 'English (fluent)'>\n"
+    "6. 'education': <short string with the highest degree and field>\n"
+    "7. 'highlights': <array of up to 5 short phrases with the strongest achievements or responsibilities>\n"
+    "Do not invent anything that is not in the CV."
+)
+
+SENIORITY_LEVELS = ("intern", "junior", "mid", "senior", "lead")
+
+def _string_list(value, limit: int) -> list:
+    if not isinstance(value, list):
+        return []
+    items = [str(v).strip() for v in value if isinstance(v, (str, int, float)) and str(v).strip()]
+    return items[:limit]
+
+def normalize_profile(data) -> dict | None:
+    """Returns a clean profile dict, or None if the model's answer is unusable (no skills at all)."""
+    if not isinstance(data, dict):
+        return None
+    skills = _string_list(data.get("skills"), PROFILE_MAX_SKILLS)
+    if not skills:
+        return None
+    try:
+        years = max(0, int(data.get("years_experience") or 0))
+    except (TypeError, ValueError):
+        years = 0
+    seniority = str(data.get("seniority") or "").strip().lower()
+    return {
+        "skills": skills,
+        "years_experience": years,
+        "seniority": seniority if seniority in SENIORITY_LEVELS else "unknown",
+        "domains": _string_list(data.get("domains"), PROFILE_MAX_ITEMS),
+        "languages": _string_list(data.get("languages"), PROFILE_MAX_ITEMS),
+        "education": str(data.get("education") or "").strip()[:200],
+        "highlights": _string_list(data.get("highlights"), 5),
+    }
+
+def format_profile(profile: dict) -> str:
+    """Renders a profile as the compact candidate block sent with every scoring call."""
+    lines = [
+        f"Seniority: {profile['seniority']} | Years of experience: {profile['years_experience']}",
+        f"Skills: {', '.join(profile['skills'])}",
+    ]
+    if profile["domains"]:
+        lines.append(f"Domains: {', '.join(profile['domains'])}")
+    if profile["languages"]:
+        lines.append(f"Languages: {', '.join(profile['languages'])}")
+    if profile["education"]:
+        lines.append(f"Education: {profile['education']}")
+    if profile["highlights"]:
+        lines.append("Highlights: " + "; ".join(profile["highlights"]))
+    return "\n".join(lines)
+
+# ==============================================================================
+# SECTION 2: PROFILE CACHE (BY CV HASH)
+# ==============================================================================
+
+class CVProfileStore:
+    """
+    Profiles keyed by (CV hash, model, profile prompt version): in-process TTLCache plus the
+    `cv_profiles` table on the database.py engine, so a CV is profiled once, not once per search.
+    Concurrent searches with the same CV wait for a single profiling call (per-hash lock), and a
+    failed profiling is remembered for CV_PROFILE_FAILURE_TTL, so no search or cascade tier retries it.
+    """
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 30 * 24 * 3600, persist: bool = True):
+        self.memory = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.failures = TTLCache(max_entries=max_entries, ttl_seconds=CV_PROFILE_FAILURE_TTL)
+        self.persist = persist
+        self._engine = None
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    @staticmethod
+    def make_key(cv_hash: str, model_name: str) -> str:
+        return sha256_text(f"{cv_hash}:{model_name}:{PROFILE_PROMPT_VERSION}")
+
+    def _get_engine(self):
+        """Lazily binds to database.py, creating the profile table on first use."""
+        if not self.persist:
+            return None
+        with self._lock:
+            if self._engine is None:
+                try:
+                    from database import engine, CVProfileEntry
+                    CVProfileEntry.__table__.create(engine, checkfirst=True)
+                    self._engine = engine
+                except (Exception, SystemExit) as e:
+                    # database.py exits when USE_DB=True without a DATABASE_URL; the memory layer keeps working
+                    print(f"⚠️ CV profile persistence disabled: {e}")
+                    self.persist = False
+            return self._engine
+
+    def mark_failed(self, key: str):
+        self.failures.set(key, True)
+
+    def has_failed(self, key: str) -> bool:
+        return key in self.failures
+
+    def key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, key: str):
+        profile = self.memory.get(key)
+        if profile is not None:
+            return profile
+
+        engine = self._get_engine()
+        if engine is not None:
+            from sqlalchemy.orm import Session
+            from database import CVProfileEntry
+            try:
+                with Session(engine) as db:
+                    row = db.get(CVProfileEntry, key)
+                    if row is not None:
+                        profile = json.loads(row.profile)
+                        self.memory.set(key, profile)
+                        return profile
+            except Exception as e:
+                print(f"⚠️ CV profile read failed: {e}")
+        return None
+
+    def set(self, key: str, profile: dict, cv_hash: str = None, model_name: str = None):
+        self.memory.set(key, profile)
+
+        engine = self._get_engine()
+        if engine is not None:
+            from sqlalchemy.exc import IntegrityError
+            from sqlalchemy.orm import Session
+            from database import CVProfileEntry
+            try:
+                with Session(engine) as db:
+                    db.merge(CVProfileEntry(
+                        cache_key=key,
+                        cv_hash=cv_hash,
+                        profile=json.dumps(profile, ensure_ascii=False),
+                        model_name=model_name,
+                        created_at=datetime.datetime.utcnow(),
+                    ))
+                    db.commit()
+            except IntegrityError:
+                # Another worker profiled the same CV concurrently
+                pass
+            except Exception as e:
+                print(f"⚠️ CV profile write failed: {e}")
+
+
+_profile_store = None
+_profile_store_lock = threading.Lock()
+
+def get_cv_profile_store() -> CVProfileStore:
+    """Returns the process-wide CV profile store."""
+    global _profile_store
+    with _profile_store_lock:
+        if _profile_store is None:
+            _profile_store = CVProfileStore(persist=os.getenv("CV_PROFILE_PERSIST", "True") == "True")
+        return _profile_store
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import secrets
+import datetime
+import threading
+from collections import OrderedDict, Counter
+
+from services.cache import sha256_text
+from services.ai_manager import estimate_tokens
+from services.pre_ranker import tokenize
+
+# Memory budget of the store (bytes of CV text) and idle lifetime of a CV
+CV_STORE_MAX_BYTES = int(os.getenv("CV_STORE_MAX_BYTES", 50 * 1024 * 1024))
+CV_STORE_TTL = float(os.getenv("CV_STORE_TTL", 24 * 3600))
+
+# ==============================================================================
+# SECTION 1: CV RECORD (TEXT + DERIVED ARTIFACTS)
+# ==============================================================================
+
+class CVRecord:
+    """
+    An extracted CV plus the artifacts derived from it once, handed to every search of the
+    session instead of being recomputed: the hash (score cache and CV profile keys), the token
+    count (batch planning) and the pre-parsed skills (the pre-ranker's query).
+    """
+    def __init__(self, token: str, text: str, cv_hash: str = None, token_count: int = None, skills: dict = None):
+        self.token = token
+        self.text = text
+        self.cv_hash = cv_hash or sha256_text(text)
+        self.token_count = token_count if token_count is not None else estimate_tokens(text)
+        # Matching tokens of the CV with their counts, most frequent first (a cheap skill/keyword profile)
+        self.skills = skills if skills is not None else dict(Counter(tokenize(text)).most_common())
+        self.last_used = time.monotonic()
+
+    @property
+    def size(self) -> int:
+        return len(self.text.encode("utf-8"))
+
+# ==============================================================================
+# SECTION 2: SERVER-SIDE STORE
+# ==============================================================================
+
+class CVStore:
+    """
+    Server-side home of the uploaded CVs, keyed by a short token kept in the Flask session
+    (instead of the whole text in the signed cookie).
+    In-memory LRU evicted by total size and idle TTL; with USE_DB on, records are also
+    written to the `cv_documents` table so they survive restarts and are shared across workers.
+    """
+    def __init__(self, max_bytes: int = CV_STORE_MAX_BYTES, ttl_seconds: float = CV_STORE_TTL, persist: bool = None):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.persist = os.getenv("USE_DB", "True") == "True" if persist is None else persist
+        self._records = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._engine = None
+
+    def _get_engine(self):
+        if not self.persist:
+            return None
+        with self._lock:
+            if self._engine is None:
+                try:
+                    from database import engine, CVDocument
+                    CVDocument.__table__.create(engine, checkfirst=True)
+                    self._engine = engine
+                except (Exception, SystemExit) as e:
+                    # database.py exits when USE_DB=True without a DATABASE_URL; keep the CVs in memory only
+                    print(f"⚠️ CV store persistence disabled: {e}")
+                    self.persist = False
+            return self._engine
+
+    def _remember(self, record: CVRecord):
+        with self._lock:
+            previous = self._records.pop(record.token, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._records[record.token] = record
+            self._bytes += record.size
+            while self._bytes > self.max_bytes and len(self._records) > 1:
+                _, evicted = self._records.popitem(last=False)
+                self._bytes -= evicted.size
+
+    def put(self, text: str) -> CVRecord:
+        """Stores a freshly extracted CV and returns its record (with a new token)."""
+        record = CVRecord(secrets.token_urlsafe(12), text)
+        self._remember(record)
+
+        engine = self._get_engine()
+        if engine is not None:
+            from sqlalchemy.orm import Session
+            from database import CVDocument
+            try:
+                with Session(engine) as db:
+                    db.merge(CVDocument(
+                        token=record.token,
+                        cv_hash=record.cv_hash,
+                        text=record.text,
+                        token_count=record.token_count,
+                        skills=json.dumps(record.skills, ensure_ascii=False),
+                        last_used_at=datetime.datetime.utcnow(),
+                    ))
+                    db.commit()
+            except Exception as e:
+                print(f"⚠️ CV store write failed: {e}")
+        return record
+
+    def get(self, token: str):
+        """Returns the CVRecord for `token`, or None if it is unknown or expired."""
+        if not token:
+            return None
+
+        with self._lock:
+            record = self._records.get(token)
+            if record is not None:
+                if self.ttl_seconds and time.monotonic() - record.last_used > self.ttl_seconds:
+                    del self._records[token]
+                    self._bytes -= record.size
+                    record = None
+                else:
+                    record.last_used = time.monotonic()
+                    self._records.move_to_end(token)
+                    return record
+
+        engine = self._get_engine()
+        if engine is not None:
+            from sqlalchemy.orm import Session
+            from database import CVDocument
+            try:
+                with Session(engine) as db:
+                    row = db.get(CVDocument, token)
+                    if row is None:
+                        return None
+                    idle = (datetime.datetime.utcnow() - row.last_used_at).total_seconds()
+                    if self.ttl_seconds and idle > self.ttl_seconds:
+                        db.delete(row)
+                        db.commit()
+                        return None
+                    row.last_used_at = datetime.datetime.utcnow()
+                    db.commit()
+                    skills = json.loads(row.skills) if row.skills else None
+                    # Rows written by older versions (no skills, or a plain list) are re-derived
+                    record = CVRecord(row.token, row.text, row.cv_hash, row.token_count,
+                                      skills if isinstance(skills, dict) else None)
+                    self._remember(record)
+                    return record
+            except Exception as e:
+                print(f"⚠️ CV store read failed: {e}")
+        return None
+
+    def delete(self, token: str):
+        if not token:
+            return
+        with self._lock:
+            record = self._records.pop(token, None)
+            if record is not None:
+                self._bytes -= record.size
+
+        engine = self._get_engine()
+        if engine is not None:
+            from sqlalchemy.orm import Session
+            from database import CVDocument
+            try:
+                with Session(engine) as db:
+                    row = db.get(CVDocument, token)
+                    if row is not None:
+                        db.delete(row)
+                        db.commit()
+            except Exception as e:
+                print(f"⚠️ CV store delete failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._records), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+cv_store = CVStore()
@@ -0,0 +1,89 @@
+import os
+import zlib
+import numpy as np
+
+from services.seeker import normalize_text
+
+# ==============================================================================
+# SECTION 1: MINHASH SIGNATURES
+# ==============================================================================
+
+# Banding: 16 bands x 8 rows puts the LSH candidate threshold near Jaccard 0.7;
+# candidates are then confirmed against NEAR_DUPLICATE_THRESHOLD.
+MINHASH_BANDS = 16
+MINHASH_ROWS = 8
+MINHASH_PERMUTATIONS = MINHASH_BANDS * MINHASH_ROWS
+SHINGLE_SIZE = 3
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", 0.8))
+
+# Texts with fewer shingles than this (e.g. "details on the source link") are too
+# generic to prove two postings are the same job, so they are never collapsed.
+MIN_SHINGLES = 20
+
+_PRIME = np.uint64(4294967311)  # smallest prime above 2**32
+_rng = np.random.default_rng(20240601)
+# a < 2**31 keeps a * x + b (x < 2**32) inside uint64 without overflow
+_PERM_A = _rng.integers(1, 2**31, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 2**31, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+def shingle_hashes(text: str) -> np.ndarray:
+    """crc32 of every word 3-gram of the normalized text."""
+    words = normalize_text(text).split()
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(0, len(words) - SHINGLE_SIZE + 1))}
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+def minhash_signature(hashes: np.ndarray) -> np.ndarray:
+    """One min-hash per permutation, computed for all permutations at once."""
+    permuted = (hashes[:, None] * _PERM_A[None, :] + _PERM_B[None, :]) % _PRIME
+    return permuted.min(axis=0)
+
+# ==============================================================================
+# SECTION 2: LSH NEAR-DUPLICATE INDEX
+# ==============================================================================
+
+class NearDuplicateIndex:
+    """
+    Search-wide index of job postings by MinHash signature with LSH banding.
+    Collapses reposts of the same job across sites, locations and expanded terms
+    (whose links and title/company fingerprints differ) before they reach the LLM.
+    """
+    def __init__(self, threshold: float = NEAR_DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._buckets = [dict() for _ in range(MINHASH_BANDS)]
+        self._entries = []
+
+    def _band_keys(self, signature: np.ndarray) -> list:
+        return [signature[b * MINHASH_ROWS:(b + 1) * MINHASH_ROWS].tobytes() for b in range(MINHASH_BANDS)]
+
+    def find_or_add(self, job):
+        """
+        Returns the already indexed job that `job` is a near-duplicate of,
+        or indexes `job` and returns None if it is new.
+        """
+        hashes = shingle_hashes(f"{job.title} {job.description or ''}")
+        if len(hashes) < MIN_SHINGLES:
+            return None
+
+        signature = minhash_signature(hashes)
+        band_keys = self._band_keys(signature)
+
+        candidates = set()
+        for bucket, key in zip(self._buckets, band_keys):
+            candidates.update(bucket.get(key, ()))
+
+        best_idx, best_similarity = None, 0.0
+        for idx in candidates:
+            similarity = float(np.mean(self._entries[idx][0] == signature))
+            if similarity > best_similarity:
+                best_idx, best_similarity = idx, similarity
+        if best_idx is not None and best_similarity >= self.threshold:
+            return self._entries[best_idx][1]
+
+        idx = len(self._entries)
+        self._entries.append((signature, job))
+        for bucket, key in zip(self._buckets, band_keys):
+            bucket.setdefault(key, []).append(idx)
+        return None
+
+    def __len__(self):
+        return len(self._entries)
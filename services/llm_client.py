@@ -0,0 +1,159 @@
+import os
+import threading
+import importlib.util
+
+import httpx
+from openai import OpenAI
+
+from services.telemetry import metrics
+
+# ==============================================================================
+# SECTION 1: CONNECTION POOL TUNING
+# ==============================================================================
+
+DEFAULT_LLM_BASE_URL = "https://api.groq.com/openai/v1"
+
+# Sized for the scoring pool (LLM_MAX_CONCURRENCY per search x SEARCH_WORKERS) plus term expansion
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", 20))
+LLM_POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", 10))
+# Idle connections are kept open this long, so back-to-back searches skip the TLS handshake
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", 120))
+
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", 5))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", 60))
+LLM_WRITE_TIMEOUT = float(os.getenv("LLM_WRITE_TIMEOUT", 10))
+# How long a call may wait for a free connection of the pool
+LLM_POOL_TIMEOUT = float(os.getenv("LLM_POOL_TIMEOUT", 10))
+
+# "auto" enables HTTP/2 when `h2` is importable (installed by the `httpx[http2]` dependency)
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "auto")
+
+def http2_enabled() -> bool:
+    if LLM_HTTP2 == "auto":
+        return importlib.util.find_spec("h2") is not None
+    return LLM_HTTP2 == "True"
+
+def default_timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        connect=LLM_CONNECT_TIMEOUT,
+        read=LLM_READ_TIMEOUT,
+        write=LLM_WRITE_TIMEOUT,
+        pool=LLM_POOL_TIMEOUT,
+    )
+
+# ==============================================================================
+# SECTION 2: POOL STATISTICS
+# ==============================================================================
+
+class PoolStats:
+    """
+    Counts requests and the connections/TLS handshakes they caused, fed by httpcore's
+    trace hook, so connection reuse can be watched under load.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+        self.errors = 0
+
+    def _trace(self, event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.connections_opened += 1
+        elif event_name == "connection.start_tls.complete":
+            with self._lock:
+                self.tls_handshakes += 1
+
+    def on_request(self, request: httpx.Request):
+        with self._lock:
+            self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    def on_response(self, response: httpx.Response):
+        if response.status_code >= 400:
+            with self._lock:
+                self.errors += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            reused = max(0, self.requests - self.connections_opened)
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections_opened,
+                "tls_handshakes": self.tls_handshakes,
+                "reused_requests": reused,
+                "reuse_rate": round(reused / self.requests, 3) if self.requests else 0.0,
+                "error_responses": self.errors,
+            }
+
+# ==============================================================================
+# SECTION 3: PROCESS-WIDE CLIENT REGISTRY
+# ==============================================================================
+
+class LLMClientRegistry:
+    """
+    One pooled OpenAI-compatible client per (base_url, api_key) for the whole process,
+    shared by the AI scorer and the term expander. Clients are built with max_retries=0:
+    callers that want SDK retries opt in with `client.with_options(...)`, which keeps
+    the same underlying connection pool.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._http_clients = {}
+        self.pool_stats = PoolStats()
+
+    def _build_http_client(self) -> httpx.Client:
+        return httpx.Client(
+            http2=http2_enabled(),
+            timeout=default_timeout(),
+            limits=httpx.Limits(
+                max_connections=LLM_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+            ),
+            event_hooks={"request": [self.pool_stats.on_request], "response": [self.pool_stats.on_response]},
+        )
+
+    def get(self, base_url: str = None, api_key: str = None) -> OpenAI:
+        base_url = base_url or os.getenv("LLM_BASE_URL", DEFAULT_LLM_BASE_URL)
+        api_key = api_key or os.getenv("GROQ_API_KEY", os.getenv("OPENAI_API_KEY", "no-key-needed"))
+        key = (base_url, api_key)
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                http_client = self._http_clients.get(base_url)
+                if http_client is None:
+                    # Clients of the same host share the pool even if they use different keys
+                    http_client = self._http_clients[base_url] = self._build_http_client()
+                client = self._clients[key] = OpenAI(
+                    base_url=base_url,
+                    api_key=api_key,
+                    max_retries=0,
+                    timeout=default_timeout(),
+                    http_client=http_client,
+                )
+            return client
+
+    def stats(self) -> dict:
+        with self._lock:
+            hosts = len(self._http_clients)
+            clients = len(self._clients)
+        return {"hosts": hosts, "clients": clients, "http2": http2_enabled(), **self.pool_stats.snapshot()}
+
+    def close(self):
+        with self._lock:
+            for http_client in self._http_clients.values():
+                http_client.close()
+            self._http_clients.clear()
+            self._clients.clear()
+
+
+llm_clients = LLMClientRegistry()
+metrics.add_collector("llm_pool", llm_clients.stats, "Shared LLM connection pool")
+
+def get_llm_client(base_url: str = None, api_key: str = None) -> OpenAI:
+    """Returns the process-wide pooled client for (base_url, api_key)."""
+    return llm_clients.get(base_url, api_key)
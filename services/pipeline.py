@@ -0,0 +1,251 @@
+import os
+import math
+
+from services.scrape_scheduler import scrape_terms_concurrently
+from services.ai_manager import (
+    evaluate_jobs_in_memory, cv_fingerprint, remember_cv, is_rate_limit_error,
+    ScoringBudget, ScoringCascade, LLM_CASCADE
+)
+from services.cv_store import CVRecord
+from services.term_expander import get_expanded_terms
+from services.pre_ranker import pre_rank_jobs, rank_agreement, order_by_prior
+from services.compactor import compact_jobs
+from services.telemetry import span
+from services.search_cache import search_result_cache
+
+# Answer fresh (term, location) pairs from the pre-crawler's shared corpus instead of scraping live
+SEARCH_USE_CORPUS = os.getenv("SEARCH_USE_CORPUS", "True") == "True"
+
+# Matches per results page (server-rendered page and /search/<id>/results)
+RESULTS_PAGE_SIZE = int(os.getenv("RESULTS_PAGE_SIZE", 20))
+
+# Early-termination scoring: default number of matches after which the AI stage stops (0 = score all),
+# and the wall-clock (seconds) / token budgets of the AI stage (0 = unlimited)
+SCORING_TARGET_MATCHES = int(os.getenv("SCORING_TARGET_MATCHES", 0))
+SCORING_TIME_BUDGET = float(os.getenv("SCORING_TIME_BUDGET", 0))
+SCORING_TOKEN_BUDGET = int(os.getenv("SCORING_TOKEN_BUDGET", 0))
+
+# ==============================================================================
+# SECTION 1: SEARCH PARAMETERS & SERIALIZATION
+# ==============================================================================
+
+def parse_search_params(form) -> dict:
+    """Reads the search form (request.form or any dict-like) into typed pipeline parameters."""
+    return {
+        "term": form.get('term', 'Engenheiro'),
+        "min_score": int(form.get('min_score', 80)), # User defined threshold
+        "filter_words": form.get('filter_words', ''),
+        "location": form.get('location', 'Brazil'),
+        "results_wanted": int(form.get('results_wanted', 30)),
+        "hours_old": int(form.get('hours_old', 24)),
+        # Only new/changed postings since the last crawl of each term (scheduled refreshes)
+        "incremental": str(form.get('incremental', '')).lower() in ('1', 'true', 'on'),
+        # Stop scoring once this many jobs clear min_score (0 = score every pre-ranked job)
+        "target_matches": int(form.get('target_matches') or SCORING_TARGET_MATCHES),
+    }
+
+def serialize_job(job) -> dict:
+    """JSON-friendly view of a JobInMemory, as streamed to the browser."""
+    return {
+        "title": job.title,
+        "company": job.company,
+        "location": job.location,
+        "link": job.link,
+        "source": job.source,
+        "published_at": job.published_at,
+        "match_score": job.match_score,
+        "score_tier": job.score_tier,
+        "pre_rank_score": job.pre_rank_score,
+        "rationale": job.rationale,
+        "similarity": job.similarity,
+        # Rendered (memoized) here: only jobs that are actually sent to a browser pay for it
+        "formatted_description": job.formatted_description,
+        "merged_from": job.merged_from,
+    }
+
+def paginate_jobs(jobs: list, page=1, per_page=None) -> dict:
+    """
+    One page of the (score-sorted) matches. Only the jobs of the page ever get their
+    description rendered, so response size stays flat however many jobs were scraped.
+    """
+    per_page = max(1, min(int(per_page or RESULTS_PAGE_SIZE), 100))
+    pages = max(1, math.ceil(len(jobs) / per_page))
+    page = max(1, min(int(page or 1), pages))
+    start = (page - 1) * per_page
+    return {
+        "jobs": jobs[start:start + per_page],
+        "page": page,
+        "pages": pages,
+        "per_page": per_page,
+        "total": len(jobs),
+    }
+
+# ==============================================================================
+# SECTION 2: EXPAND -> SCRAPE -> PRE-RANK -> SCORE PIPELINE
+# ==============================================================================
+
+def collect_jobs(params: dict, emit=None, consumer: str = None) -> list:
+    """
+    Expands the search term with AI (max 5 terms) and scrapes every platform into memory.
+    Depends only on the search parameters, never on the CV, so identical searches can share it;
+    incremental searches pass their CV hash as `consumer` so they skip only postings it has seen.
+    """
+    emit = emit or (lambda event, data: None)
+    base_term = params["term"]
+
+    # --------------------------------------------------------------------------
+    # 1. EXPAND TERMS (LIMITED TO 5)
+    # --------------------------------------------------------------------------
+    emit("stage", {"stage": "expand", "message": "🧠 Expandindo o termo de busca com IA..."})
+    with span("expand", term=base_term) as expand_span:
+        expanded_terms = get_expanded_terms(base_term)
+        expand_span.set(terms=len(expanded_terms))
+
+    # FORCE CAP AT 5 TERMS to prevent taking too long or hitting rate limits
+    expanded_terms = expanded_terms[:5]
+
+    results_per_term = max(10, params["results_wanted"] // len(expanded_terms))
+
+    # --------------------------------------------------------------------------
+    # 2. SCRAPE JOBS INTO MEMORY
+    # --------------------------------------------------------------------------
+    emit("stage", {"stage": "scrape", "message": f"🕵️ Raspando vagas para {len(expanded_terms)} termos nas plataformas..."})
+    # Every term x location x site unit runs in parallel, throttled per job board
+    # instead of sleeping between terms.
+    with span("scrape", terms=len(expanded_terms)) as scrape_span:
+        jobs = scrape_terms_concurrently(
+            expanded_terms,
+            location=params["location"],
+            results_per_term=results_per_term,
+            hours_old=params["hours_old"],
+            filter_words=params["filter_words"],
+            incremental=params.get("incremental", False),
+            use_corpus=SEARCH_USE_CORPUS,
+            consumer=consumer,
+        )
+        scrape_span.set(jobs=len(jobs))
+    return jobs
+
+def run_search_pipeline(cv, params: dict, emit=None) -> dict:
+    """
+    Runs the whole stateless search for one CV:
+    1. Expands search terms using AI (max 5).
+    2. Scrapes jobs across platforms into memory.
+    3. Pre-ranks them locally and evaluates the best ones against the CV using AI.
+    4. Applies the user's threshold.
+    Steps 1-2 are shared by identical searches (same normalized term, location, window,
+    keywords and size): served from the search result cache or coalesced with an
+    identical search already running. Incremental searches always scrape.
+    `cv` is the session's CVRecord (its stored hash, token count and skills are reused) or plain CV text.
+    `emit(event, data)` receives stage/progress/job/notice/done events as they happen.
+    Returns {"jobs": [...], "messages": [(category, message), ...]}.
+    """
+    if isinstance(cv, CVRecord):
+        remember_cv(cv.text, cv.cv_hash, cv.token_count)
+        cv_text, cv_skills = cv.text, cv.skills
+    else:
+        cv_text, cv_skills = cv, None
+    emit = emit or (lambda event, data: None)
+    result = {"jobs": [], "messages": []}
+
+    def notice(category: str, message: str):
+        result["messages"].append((category, message))
+        emit("notice", {"category": category, "message": message})
+
+    base_term = params["term"]
+    min_score = params["min_score"]
+    results_wanted = params["results_wanted"]
+
+    print(f"\n🚀 Stateless Search Started for: {base_term}")
+    print(f"🎯 Threshold: {min_score} | Target results: {results_wanted}")
+
+    # Incremental runs depend on (and move) the CV's own seen set and watermarks, so they are never shared
+    if params.get("incremental"):
+        all_scraped_jobs = collect_jobs(params, emit, consumer=cv_fingerprint(cv_text))
+    else:
+        all_scraped_jobs, outcome = search_result_cache.get_or_collect(params, lambda: collect_jobs(params, emit))
+        if outcome in ("hit", "coalesced"):
+            print(f"♻️  Reusing the scrape of an identical search ({outcome}): {len(all_scraped_jobs)} jobs")
+            emit("stage", {"stage": "scrape", "message": f"♻️ Reaproveitando as {len(all_scraped_jobs)} vagas de uma busca idêntica recente..."})
+
+    if not all_scraped_jobs:
+        notice("warning", "No jobs found with these parameters. Try expanding your search.")
+        emit("done", {"matches": 0})
+        return result
+
+    # --------------------------------------------------------------------------
+    # 3. AI EVALUATION & ERROR HANDLING (RATE LIMITS)
+    # --------------------------------------------------------------------------
+    # Local BM25 pre-ranking: only the jobs closest to the CV go to the LLM,
+    # ordered by a cheap prior (pre-rank, title match, recency) so the likeliest matches are scored first
+    with span("pre_rank", jobs=len(all_scraped_jobs)) as pre_rank_span:
+        all_scraped_jobs = pre_rank_jobs(all_scraped_jobs, cv_text, top_k=results_wanted, cv_skills=cv_skills)
+        all_scraped_jobs = order_by_prior(all_scraped_jobs, base_term)
+        pre_rank_span.set(kept=len(all_scraped_jobs))
+    # Boilerplate-free, token-budgeted descriptions keep every prompt a predictable size
+    with span("compact", jobs=len(all_scraped_jobs)):
+        compact_jobs(all_scraped_jobs)
+    budget = ScoringBudget(
+        min_score=min_score,
+        target_matches=params.get("target_matches"),
+        max_seconds=SCORING_TIME_BUDGET,
+        max_tokens=SCORING_TOKEN_BUDGET,
+    )
+
+    print(f"\n🧠 Evaluating {len(all_scraped_jobs)} jobs against uploaded CV...")
+    emit("stage", {"stage": "score", "message": f"🤖 A IA está avaliando {len(all_scraped_jobs)} vagas contra o seu CV..."})
+
+    def on_result(job, done, total):
+        emit("progress", {"done": done, "total": total})
+        if job.match_score is not None and job.match_score >= min_score:
+            # Streamed cards are displayed right away, so this is where their markdown gets rendered
+            emit("job", serialize_job(job))
+
+    try:
+        with span("score", jobs=len(all_scraped_jobs)) as score_span:
+            # Cascade mode: a fast model screens every job, the strong one re-scores only the borderline ones
+            cascade = ScoringCascade(min_score) if LLM_CASCADE else None
+            evaluated_jobs = evaluate_jobs_in_memory(all_scraped_jobs, cv_text, on_result=on_result, budget=budget,
+                                                     cascade=cascade)
+            score_span.set(skipped=budget.skipped, matches=budget.matches)
+
+    except Exception as e:
+        error_msg = str(e)
+        if is_rate_limit_error(e):
+            notice("error", "🤖 AI Rate Limit Reached! The Groq API is overwhelmed. Please wait a few minutes and try again.")
+        else:
+            notice("error", f"🤖 AI Evaluation Error: {error_msg}")
+        print(f"❌ AI Error: {error_msg}")
+        emit("done", {"matches": 0})
+        return result
+
+    print(f"📐 Pre-rank vs AI agreement (Spearman): {rank_agreement(evaluated_jobs)}")
+
+    if budget.skipped:
+        reasons = {"target": f"{budget.matches} vagas acima de {min_score}% encontradas",
+                   "time": "orçamento de tempo esgotado", "tokens": "orçamento de tokens esgotado"}
+        notice("info", f"⏱️ Avaliação encerrada antes ({reasons[budget.stop_reason]}): {budget.skipped} de {len(evaluated_jobs)} vagas não foram avaliadas.")
+
+    # Unscored jobs are reported by their actual cause: only exhausted rate-limit retries are a rate limit
+    if budget.rate_limited:
+        notice("warning", f"🤖 AI Rate Limit Reached! {budget.rate_limited} of {len(evaluated_jobs)} jobs could not be scored. The others are shown below.")
+    if budget.failed:
+        notice("warning", f"🤖 {budget.failed} of {len(evaluated_jobs)} jobs could not be scored due to an AI error. The others are shown below.")
+
+    # --------------------------------------------------------------------------
+    # 4. APPLY THRESHOLD
+    # --------------------------------------------------------------------------
+    # Only the matches outlive the search; their HTML is rendered per displayed page (paginate_jobs)
+    final_jobs = [job for job in evaluated_jobs if job.match_score and job.match_score >= min_score]
+    for job in final_jobs:
+        # The compacted prompt copy of the description is dead weight once scored
+        job.scoring_text = None
+
+    # Sort highest scores first
+    final_jobs.sort(key=lambda x: x.match_score, reverse=True)
+
+    print(f"✅ Finished! {len(final_jobs)} jobs passed the >= {min_score} threshold.")
+    emit("done", {"matches": len(final_jobs)})
+
+    result["jobs"] = final_jobs
+    return result
@@ -0,0 +1,158 @@
+import os
+from datetime import datetime
+from collections import Counter
+import numpy as np
+
+from services.seeker import normalize_text
+
+# ==============================================================================
+# SECTION 1: TOKENIZATION
+# ==============================================================================
+
+# Function words (PT + EN) that carry no signal for CV <-> job matching
+STOP_WORDS = {
+    'de', 'da', 'do', 'das', 'dos', 'em', 'na', 'no', 'nas', 'nos', 'para', 'por', 'com', 'sem', 'que',
+    'uma', 'um', 'ao', 'aos', 'as', 'os', 'se', 'ou', 'como', 'mais', 'sua', 'seu', 'suas', 'seus',
+    'the', 'and', 'for', 'with', 'you', 'your', 'are', 'our', 'will', 'from', 'this', 'that', 'have',
+    'has', 'was', 'were', 'not', 'all', 'can', 'who', 'what', 'about', 'their', 'they', 'its',
+}
+
+# Pre-ranking knobs: how many jobs go on to the LLM and the minimum relative pre-score (0-100) to qualify
+PRE_RANK_TOP_K = int(os.getenv("PRE_RANK_TOP_K", 0)) or None
+PRE_RANK_MIN_SCORE = float(os.getenv("PRE_RANK_MIN_SCORE", 0))
+
+def tokenize(text: str) -> list:
+    """Splits normalized text into matching tokens, dropping stop words and 1-2 letter noise."""
+    return [t for t in normalize_text(text).split() if len(t) > 2 and t not in STOP_WORDS]
+
+# ==============================================================================
+# SECTION 2: VECTORIZED BM25
+# ==============================================================================
+
+def bm25_scores(query_text: str, documents: list, k1: float = 1.5, b: float = 0.75,
+                query_counts: dict = None) -> np.ndarray:
+    """
+    Scores every document against the query in one batch with Okapi BM25.
+    The term-frequency matrix is restricted to the query vocabulary, so it stays
+    small (n_documents x distinct CV tokens) and the scoring is a single matrix product.
+    `query_counts` ({token: count}) skips tokenizing the query when it was parsed beforehand.
+    """
+    n_docs = len(documents)
+    query_counts = query_counts or Counter(tokenize(query_text))
+    if not n_docs or not query_counts:
+        return np.zeros(n_docs, dtype=np.float32)
+
+    vocabulary = {token: idx for idx, token in enumerate(query_counts)}
+    query_weights = np.log1p(np.fromiter(query_counts.values(), dtype=np.float32, count=len(query_counts)))
+
+    rows, cols = [], []
+    doc_lengths = np.zeros(n_docs, dtype=np.float32)
+    for doc_idx, document in enumerate(documents):
+        tokens = tokenize(document)
+        doc_lengths[doc_idx] = len(tokens)
+        hits = [vocabulary[t] for t in tokens if t in vocabulary]
+        rows.extend([doc_idx] * len(hits))
+        cols.extend(hits)
+
+    term_freq = np.zeros((n_docs, len(vocabulary)), dtype=np.float32)
+    np.add.at(term_freq, (np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)), 1.0)
+
+    doc_freq = (term_freq > 0).sum(axis=0)
+    idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+
+    avg_length = doc_lengths.mean() or 1.0
+    length_norm = k1 * (1 - b + b * doc_lengths / avg_length)
+    saturated = term_freq * (k1 + 1) / (term_freq + length_norm[:, None])
+
+    return saturated @ (idf * query_weights)
+
+# ==============================================================================
+# SECTION 3: PRE-RANKING STAGE
+# ==============================================================================
+
+def pre_rank_jobs(jobs_list: list, cv_text: str, top_k: int = None, min_score: float = None,
+                  cv_skills: dict = None) -> list:
+    """
+    Locally scores every scraped job against the CV, stores the result in `job.pre_rank_score`
+    (0-100, relative to the best job of the batch) and returns the jobs in pre-rank order,
+    keeping only those above `min_score` and at most `top_k` of them.
+    `cv_skills` are the CV's pre-parsed token counts (CVRecord.skills), used instead of re-tokenizing it.
+    """
+    if not jobs_list:
+        return []
+
+    top_k = top_k if top_k is not None else PRE_RANK_TOP_K
+    min_score = min_score if min_score is not None else PRE_RANK_MIN_SCORE
+
+    # Title is repeated so it weighs more than a single mention deep in the description
+    documents = [f"{job.title} {job.title} {job.description or ''}" for job in jobs_list]
+    scores = bm25_scores(cv_text, documents, query_counts=cv_skills)
+
+    best = float(scores.max()) if len(scores) else 0.0
+    relative = (scores / best * 100) if best > 0 else np.zeros_like(scores)
+    for job, score in zip(jobs_list, relative):
+        job.pre_rank_score = round(float(score), 1)
+
+    order = np.argsort(-relative, kind="stable")
+    ranked = [jobs_list[i] for i in order if relative[i] >= min_score]
+    if top_k:
+        ranked = ranked[:top_k]
+
+    print(f"📐 Pre-ranker kept {len(ranked)}/{len(jobs_list)} jobs for the AI (top_k={top_k}, min_score={min_score}).")
+    return ranked
+
+def rank_agreement(jobs_list: list):
+    """
+    Spearman correlation between pre-rank and LLM scores over the jobs that have both,
+    used to check how well the local stage agrees with the LLM. Returns None with < 3 pairs.
+    """
+    pairs = [(j.pre_rank_score, j.match_score) for j in jobs_list
+             if getattr(j, "pre_rank_score", None) is not None and j.match_score is not None]
+    if len(pairs) < 3:
+        return None
+
+    pre, llm = np.array(pairs, dtype=np.float64).T
+    pre_ranks = pre.argsort().argsort().astype(np.float64)
+    llm_ranks = llm.argsort().argsort().astype(np.float64)
+    if pre_ranks.std() == 0 or llm_ranks.std() == 0:
+        return None
+    return round(float(np.corrcoef(pre_ranks, llm_ranks)[0, 1]), 3)
+
+# ==============================================================================
+# SECTION 4: SCORING PRIOR (ORDER OF THE AI STAGE)
+# ==============================================================================
+
+# Weights of the cheap prior used to decide which jobs the LLM scores first
+PRIOR_WEIGHTS = {"pre_rank": 0.6, "title": 0.25, "recency": 0.15}
+# Postings older than this get no recency bonus
+PRIOR_RECENCY_DAYS = 14
+
+def recency_score(published_at: str) -> float:
+    """100 for a job published today, decaying linearly to 0 after PRIOR_RECENCY_DAYS; 50 when unknown."""
+    try:
+        age_days = (datetime.now() - datetime.strptime(str(published_at), '%d/%m/%Y')).days
+    except ValueError:
+        return 50.0
+    return max(0.0, 100.0 * (1 - age_days / PRIOR_RECENCY_DAYS))
+
+def title_match_score(title: str, term_tokens: set) -> float:
+    """Share (0-100) of the search term's tokens found in the job title."""
+    if not term_tokens:
+        return 0.0
+    return 100.0 * len(term_tokens & set(tokenize(title))) / len(term_tokens)
+
+def order_by_prior(jobs_list: list, base_term: str) -> list:
+    """
+    Orders the jobs by a cheap prior (pre-rank, title match with the searched term, recency)
+    so an early-terminating AI stage spends its budget on the likeliest matches first.
+    """
+    term_tokens = set(tokenize(base_term))
+
+    def prior(job) -> float:
+        return (
+            PRIOR_WEIGHTS["pre_rank"] * (job.pre_rank_score or 0.0)
+            + PRIOR_WEIGHTS["title"] * title_match_score(job.title, term_tokens)
+            + PRIOR_WEIGHTS["recency"] * recency_score(job.published_at)
+        )
+
+    return sorted(jobs_list, key=prior, reverse=True)
@@ -0,0 +1,77 @@
+import os
+import time
+import threading
+
+# ==============================================================================
+# SECTION 1: TOKEN BUCKETS
+# ==============================================================================
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to `capacity` units and refills continuously
+    at `refill_per_second`. Not thread-safe on its own, the RateLimiter guards it.
+    """
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.available = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if they already are)."""
+        missing = amount - self.available
+        if missing <= 0:
+            return 0.0
+        return missing / self.refill_per_second
+
+# ==============================================================================
+# SECTION 2: PROVIDER RATE LIMITER (RPM + TPM)
+# ==============================================================================
+
+class RateLimiter:
+    """
+    Blocks callers until both the requests-per-minute and the tokens-per-minute
+    budgets of the LLM provider can absorb the next call.
+    """
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self._lock = threading.Lock()
+
+    def acquire(self, estimated_tokens: int = 0):
+        # A single call larger than the whole bucket would wait forever, so clamp it
+        estimated_tokens = min(float(estimated_tokens), self.tokens.capacity)
+        while True:
+            with self._lock:
+                self.requests.refill()
+                self.tokens.refill()
+                wait = max(self.requests.wait_time(1), self.tokens.wait_time(estimated_tokens))
+                if wait <= 0:
+                    self.requests.available -= 1
+                    self.tokens.available -= estimated_tokens
+                    return
+            time.sleep(wait)
+
+
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+def get_llm_rate_limiter() -> RateLimiter:
+    """
+    Returns the process-wide limiter for the LLM provider.
+    Limits are per API key, so every scoring pool in the process must share the same buckets.
+    Defaults follow Groq's free tier for llama-4-scout (30 RPM / 30k TPM).
+    """
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter(
+                requests_per_minute=int(os.getenv("LLM_RPM", 30)),
+                tokens_per_minute=int(os.getenv("LLM_TPM", 30000)),
+            )
+        return _shared_limiter
@@ -0,0 +1,237 @@
+import os
+import time
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from services.seeker import (
+    SCRAPE_SITES,
+    TrackingReport,
+    RelevanceFilter,
+    resolve_scrape_locations,
+    scrape_unit,
+    filter_scraped_jobs,
+)
+from services.dedupe import NearDuplicateIndex
+from services.crawl_store import crawl_store
+from services.vector_index import vector_index
+from services.telemetry import span, bind_trace
+
+# ==============================================================================
+# SECTION 1: PER-SITE POLITENESS
+# ==============================================================================
+
+# Minimum spacing (seconds) between two scrape starts on the same job board.
+# LinkedIn is the most aggressive at blocking bursts, so it gets the largest gap.
+DEFAULT_SITE_INTERVALS = {
+    "linkedin": float(os.getenv("SCRAPE_INTERVAL_LINKEDIN", 4)),
+    "indeed": float(os.getenv("SCRAPE_INTERVAL_INDEED", 2)),
+    "glassdoor": float(os.getenv("SCRAPE_INTERVAL_GLASSDOOR", 3)),
+}
+
+# How many scrapes may hit the same site at the same time
+SITE_MAX_CONCURRENCY = int(os.getenv("SCRAPE_SITE_CONCURRENCY", 2))
+
+# Upper bound of threads shared by all work units of a search
+SCRAPE_MAX_WORKERS = int(os.getenv("SCRAPE_MAX_WORKERS", 6))
+
+
+class SitePoliteness:
+    """
+    Per-site rate limiter that replaces the old global `time.sleep(10)` between terms.
+    Each site hands out start slots spaced by its own interval and caps its concurrent scrapes,
+    so LinkedIn, Indeed and Glassdoor are throttled independently of each other.
+    """
+    def __init__(self, intervals: dict = None, max_concurrency: int = SITE_MAX_CONCURRENCY):
+        self.intervals = intervals or DEFAULT_SITE_INTERVALS
+        self.max_concurrency = max_concurrency
+        self._lock = threading.Lock()
+        self._next_slot = {}
+        self._semaphores = {}
+
+    def _semaphore(self, site: str) -> threading.Semaphore:
+        with self._lock:
+            if site not in self._semaphores:
+                self._semaphores[site] = threading.Semaphore(self.max_concurrency)
+            return self._semaphores[site]
+
+    def wait_turn(self, site: str):
+        """Blocks the calling thread until the site's next start slot is reached."""
+        interval = self.intervals.get(site, 0)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(site, now))
+            self._next_slot[site] = slot + interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def run(self, site: str, func, *args, **kwargs):
+        """Runs `func` once a concurrency slot and a start slot are available for `site`."""
+        semaphore = self._semaphore(site)
+        # Time spent queued behind the site's concurrency cap and start spacing
+        with span("scrape.wait", site=site):
+            semaphore.acquire()
+            self.wait_turn(site)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            semaphore.release()
+
+
+_shared_politeness = None
+_shared_politeness_lock = threading.Lock()
+
+def get_site_politeness() -> SitePoliteness:
+    """
+    Returns the process-wide per-site limiter. Job boards throttle by client IP, so every
+    concurrent search of the process (queue workers, batch runs) must share one budget per site.
+    """
+    global _shared_politeness
+    with _shared_politeness_lock:
+        if _shared_politeness is None:
+            _shared_politeness = SitePoliteness()
+        return _shared_politeness
+
+# ==============================================================================
+# SECTION 2: CONCURRENT TERM x LOCATION x SITE SCHEDULER
+# ==============================================================================
+
+def scrape_terms_concurrently(terms: list, location: str = "Brazil", results_per_term: int = 30,
+                              hours_old: int = 24, filter_words: str = "",
+                              max_workers: int = SCRAPE_MAX_WORKERS,
+                              politeness: SitePoliteness = None,
+                              incremental: bool = False,
+                              use_corpus: bool = False,
+                              consumer: str = None) -> list:
+    """
+    Scrapes every (term, location, site) work unit in parallel on a bounded thread pool.
+    Results are filtered and deduplicated as each unit finishes, using dedup sets shared by
+    the whole search, so wall-clock time is set by the slowest site instead of the sum of all terms.
+    Reposts of the same job on other sites/terms are collapsed by a MinHash near-duplicate index
+    and recorded in the surviving job's `merged_from`.
+    In incremental mode each term only scrapes the hours since its last crawl watermark. With a
+    `consumer` (the CV hash of an incremental search) that is the consumer's own watermark, and
+    postings it was already handed with unchanged content are dropped before scoring. The
+    pre-crawler passes none: it moves the corpus watermarks `use_corpus` reads and drops nothing.
+    With `use_corpus`, terms the pre-crawler keeps fresh are read from the shared corpus and
+    only the missing or stale ones are scraped live.
+    """
+    if not terms:
+        return []
+
+    politeness = politeness or get_site_politeness()
+    targets, is_remote_search, results_wanted = resolve_scrape_locations(location, results_per_term)
+
+    crawl_started_at = datetime.datetime.utcnow()
+    corpus_terms = [term for term in terms if crawl_store.is_fresh(term, location, hours_old)] if use_corpus else []
+    live_terms = [term for term in terms if term not in corpus_terms]
+
+    if incremental:
+        term_hours = {term: crawl_store.incremental_hours(term, location, hours_old, consumer) for term in live_terms}
+    else:
+        term_hours = {term: hours_old for term in live_terms}
+
+    units = [
+        (term, loc, country, site)
+        for term in live_terms
+        for loc, country in targets
+        for site in SCRAPE_SITES
+    ]
+
+    if corpus_terms:
+        print(f"📚 Answering {len(corpus_terms)} of {len(terms)} terms from the pre-crawled corpus: {', '.join(corpus_terms)}")
+    mode = "incremental" if incremental else f"Last {hours_old}h"
+    print(f"🕵️  Scheduling {len(units)} scrape units ({len(live_terms)} terms x {len(targets)} locations x {len(SCRAPE_SITES)} sites) in '{location}' ({mode})...")
+
+    # One compiled relevance filter per term, shared by all of that term's units
+    filters = {term: RelevanceFilter(term, filter_words) for term in terms}
+    existing_links = set()
+    existing_fingerprints = set()
+    report = TrackingReport()
+    near_duplicates = NearDuplicateIndex()
+    failed_terms = set()
+    merged_jobs = []
+
+    def merge(df, term: str, from_live: bool = True):
+        """Filters one DataFrame into the search results. Only ever called from this thread."""
+        with span("filter", term=term, rows=len(df)) as filter_span:
+            approved = filter_scraped_jobs(
+                df, term,
+                filter_words=filter_words,
+                is_remote_search=is_remote_search,
+                existing_links=existing_links,
+                existing_fingerprints=existing_fingerprints,
+                report=report,
+                relevance_filter=filters[term],
+            )
+            filter_span.set(approved=len(approved))
+
+        # Live scrapes of incremental crawls (and of any search while the vector index is on)
+        # feed the stored corpus; only a consumer's own seen set drops unchanged postings
+        index_live = vector_index.enabled and from_live
+        if from_live and (incremental or index_live):
+            with span("crawl.record", term=term, jobs=len(approved)):
+                crawl_store.record_jobs(approved, term, location)
+            if index_live and crawl_store.persist:
+                vector_index.add_jobs(approved)
+        if incremental and consumer:
+            fresh = crawl_store.filter_unseen(approved, consumer)
+            report.stats["approved"] -= len(approved) - len(fresh)
+            report.stats["unchanged"] += len(approved) - len(fresh)
+            approved = fresh
+
+        for job in approved:
+            original = near_duplicates.find_or_add(job)
+            if original is None:
+                merged_jobs.append(job)
+                continue
+            original.merged_from.append({"source": job.source, "link": job.link, "location": job.location})
+            report.stats["approved"] -= 1
+            report.stats["duplicated"] += 1
+            report.log_duplicates.append(f"[{job.company}] {job.title} (Near-Duplicate of {original.source} Posting)")
+
+    for term in corpus_terms:
+        with span("corpus.load", term=term):
+            df = crawl_store.load_corpus(term, location, hours_old)
+        if df is not None:
+            merge(df, term, from_live=False)
+
+    if units:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(units)))) as pool:
+            futures = {
+                pool.submit(
+                    bind_trace(politeness.run), site, scrape_unit,
+                    term, loc, country, [site], results_wanted, term_hours[term], is_remote_search,
+                    raise_errors=True
+                ): (term, loc, site)
+                for term, loc, country, site in units
+            }
+
+            # Merge in completion order: filtering runs on this thread only, so the shared
+            # dedup sets never need a lock.
+            for future in as_completed(futures):
+                # Popped so each raw DataFrame is freed once merged, not kept until every unit is done
+                term, loc, site = futures.pop(future)
+                try:
+                    df = future.result()
+                except Exception as e:
+                    print(f"❌ Scrape unit failed ('{term}' @ {loc} on {site}): {e}")
+                    failed_terms.add(term)
+                    continue
+                if df is None:
+                    # jobspy logs and swallows some site errors, returning nothing: an empty unit
+                    # cannot vouch for its window either, so the term's watermark stays put
+                    failed_terms.add(term)
+                    continue
+                merge(df, term)
+
+    if incremental:
+        # A term only moves its watermark forward when none of its units failed or came back empty
+        for term in live_terms:
+            if term not in failed_terms:
+                crawl_store.advance_watermark(term, location, crawl_started_at, term_hours[term], consumer)
+
+    report.log_report(", ".join(terms))
+
+    return merged_jobs
@@ -0,0 +1,155 @@
+import os
+import copy
+import json
+import threading
+
+from services.cache import TTLCache, sha256_text
+from services.seeker import normalize_text
+from services.telemetry import metrics
+
+# Whole-search result cache: identical searches (term, location, window, keywords, size) share one
+# expansion + scrape, and only the per-CV scoring runs again
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "True") == "True"
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", 64))
+# Freshness TTL as a fraction of the search window: a 24h search stays fresh for ~1h, a 72h one for ~3h
+SEARCH_CACHE_TTL_FRACTION = float(os.getenv("SEARCH_CACHE_TTL_FRACTION", 1 / 24))
+SEARCH_CACHE_MIN_TTL = float(os.getenv("SEARCH_CACHE_MIN_TTL", 5 * 60))
+SEARCH_CACHE_MAX_TTL = float(os.getenv("SEARCH_CACHE_MAX_TTL", 6 * 3600))
+
+SEARCH_CACHE_LOOKUPS = metrics.counter("search_cache_lookups_total", "Whole-search cache lookups by outcome.", ("outcome",))
+
+# ==============================================================================
+# SECTION 1: KEYS & FRESHNESS
+# ==============================================================================
+
+def search_cache_key(params: dict) -> str:
+    """Key of the search parameters that decide the scraped jobs (never the CV or min_score)."""
+    filter_words = sorted({normalize_text(w) for w in (params.get("filter_words") or "").split(",")} - {""})
+    normalized = {
+        "term": normalize_text(params.get("term")),
+        "location": normalize_text(params.get("location")),
+        "hours_old": int(params.get("hours_old") or 0),
+        "results_wanted": int(params.get("results_wanted") or 0),
+        "filter_words": filter_words,
+    }
+    return sha256_text(json.dumps(normalized, sort_keys=True))
+
+def search_cache_ttl(hours_old: int) -> float:
+    """Seconds a scrape for the last `hours_old` hours is reused, bounded by the MIN/MAX TTLs."""
+    ttl = (hours_old or 24) * 3600 * SEARCH_CACHE_TTL_FRACTION
+    return max(SEARCH_CACHE_MIN_TTL, min(SEARCH_CACHE_MAX_TTL, ttl))
+
+def clone_jobs(jobs: list) -> list:
+    """
+    Per-search copies of cached jobs: scoring writes match_score, rationale, scoring_text...
+    on each job, so searches sharing a scrape must never share the objects themselves.
+    """
+    clones = []
+    for job in jobs:
+        clone = copy.copy(job)
+        clone.merged_from = list(job.merged_from)
+        clones.append(clone)
+    return clones
+
+# ==============================================================================
+# SECTION 2: SINGLE-FLIGHT COALESCING
+# ==============================================================================
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Runs at most one `func` per key at a time: callers arriving while it runs wait for
+    the leader and get its result (or its exception) instead of starting their own.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def do(self, key: str, func) -> tuple:
+        """Returns (value, shared) where `shared` is True for callers that waited on a leader."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value, False
+
+# ==============================================================================
+# SECTION 3: SEARCH RESULT CACHE
+# ==============================================================================
+
+class SearchResultCache:
+    """
+    Scraped (filtered, deduplicated) jobs of a search keyed by its normalized parameters,
+    fresh for a TTL derived from `hours_old`. Concurrent identical searches are coalesced
+    into one expansion + scrape; every caller gets its own copies of the jobs.
+    Empty results are not cached, since they usually mean a blocked or failing scraper.
+    """
+    def __init__(self, max_entries: int = SEARCH_CACHE_MAX_ENTRIES, enabled: bool = SEARCH_CACHE_ENABLED):
+        self.enabled = enabled
+        self.memory = TTLCache(max_entries=max_entries)
+        self.flights = SingleFlight()
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def get_or_collect(self, params: dict, collect) -> tuple:
+        """
+        Returns (jobs, outcome) where outcome is "hit" (served from the cache), "coalesced"
+        (waited on an identical in-flight search), "miss" (ran `collect()`) or "bypass".
+        """
+        if not self.enabled:
+            return collect(), "bypass"
+
+        key = search_cache_key(params)
+        cached = self.memory.get(key)
+        if cached is not None:
+            SEARCH_CACHE_LOOKUPS.inc(outcome="hit")
+            return clone_jobs(cached), "hit"
+
+        def run():
+            jobs = collect()
+            if jobs:
+                self.memory.set(key, jobs, ttl_seconds=search_cache_ttl(params.get("hours_old")))
+            return jobs
+
+        jobs, shared = self.flights.do(key, run)
+        outcome = "coalesced" if shared else "miss"
+        if shared:
+            with self._lock:
+                self.coalesced += 1
+        SEARCH_CACHE_LOOKUPS.inc(outcome=outcome)
+        return clone_jobs(jobs), outcome
+
+    def stats(self) -> dict:
+        with self._lock:
+            coalesced = self.coalesced
+        return {**self.memory.stats(), "coalesced": coalesced, "in_flight": self.flights.in_flight()}
+
+
+search_result_cache = SearchResultCache()
+metrics.add_collector("search_cache", search_result_cache.stats, "Whole-search result cache")
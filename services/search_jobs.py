@@ -0,0 +1,190 @@
+import os
+import time
+import uuid
+import queue
+import threading
+from collections import deque
+
+from services.cache import TTLCache
+from services.pipeline import run_search_pipeline
+from services.telemetry import SEARCHES, Trace, start_trace, end_trace, metrics
+
+# Searches run on their own workers, never on gunicorn's request threads
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", 2))
+SEARCH_QUEUE_MAX = int(os.getenv("SEARCH_QUEUE_MAX", 50))
+
+# ==============================================================================
+# SECTION 1: SEARCH JOB (EVENT LOG OF ONE SEARCH)
+# ==============================================================================
+
+class SearchJob:
+    """
+    One search running in the background. Pipeline events are appended to an
+    in-memory log that any number of stream readers can follow (and resume) by index.
+    """
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.events = []
+        self.finished = False
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        # Span breakdown of the search (expand, scrape units, filtering, LLM calls, rendering)
+        self.trace = Trace("search", trace_id=job_id)
+        self._condition = threading.Condition()
+
+    def emit(self, event: str, data: dict):
+        with self._condition:
+            self.events.append((event, data))
+            self._condition.notify_all()
+
+    def finish(self):
+        with self._condition:
+            self.finished = True
+            self._condition.notify_all()
+
+    def wait_for_events(self, cursor: int, timeout: float = 15.0) -> tuple:
+        """
+        Blocks until there are events after `cursor`, the job finishes or `timeout` elapses.
+        Returns (new_events, finished).
+        """
+        with self._condition:
+            if cursor >= len(self.events) and not self.finished:
+                self._condition.wait(timeout)
+            return self.events[cursor:], self.finished
+
+# ==============================================================================
+# SECTION 2: REGISTRY
+# ==============================================================================
+
+# Finished searches stay readable for an hour so a reconnecting browser can replay them
+_search_jobs = TTLCache(max_entries=512, ttl_seconds=3600)
+
+def get_search_job(job_id: str):
+    return _search_jobs.get(job_id)
+
+def create_search_job() -> SearchJob:
+    job = SearchJob(uuid.uuid4().hex[:16])
+    _search_jobs.set(job.id, job)
+    return job
+
+def run_search_job(job: SearchJob, cv, params: dict):
+    """Runs the pipeline for `job`, always closing its event log."""
+    job.status = "running"
+    job.started_at = time.time()
+    token = start_trace(job.trace)
+    try:
+        job.result = run_search_pipeline(cv, params, emit=job.emit)
+        job.status = "done"
+    except Exception as e:
+        print(f"❌ Search {job.id} failed: {e}")
+        job.status = "failed"
+        job.emit("failure", {"message": f"Erro inesperado na busca: {e}"})
+    finally:
+        end_trace(token)
+        SEARCHES.inc(status=job.status)
+        job.finished_at = time.time()
+        job.finish()
+
+# ==============================================================================
+# SECTION 3: WORK QUEUE & WORKER POOL
+# ==============================================================================
+
+class QueueFullError(Exception):
+    """Raised when the search queue is at SEARCH_QUEUE_MAX and cannot accept more work."""
+
+class SearchQueue:
+    """
+    Bounded in-process work queue served by a fixed pool of worker threads.
+    The web tier only enqueues, so a burst of searches waits here instead of
+    occupying every gunicorn thread. Tracks depth, wait time and worker utilization.
+    """
+    def __init__(self, workers: int = SEARCH_WORKERS, max_depth: int = SEARCH_QUEUE_MAX):
+        self.workers = max(1, workers)
+        self._queue = queue.Queue(maxsize=max_depth)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._busy = 0
+        self._busy_seconds = 0.0
+        self._started_at = None
+        self._wait_times = deque(maxlen=200)
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _ensure_workers(self):
+        # Started lazily so gunicorn's forked workers (not the master) own the threads
+        with self._lock:
+            if self._threads:
+                return
+            self._started_at = time.monotonic()
+            for idx in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"search-worker-{idx}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, job: SearchJob, cv, params: dict) -> int:
+        """Enqueues a search and returns its position in the queue."""
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait((job, cv, params, time.monotonic()))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise QueueFullError("Search queue is full. Please try again in a few minutes.")
+
+        position = self._queue.qsize()
+        job.emit("stage", {"stage": "queued", "message": f"⏳ Busca na fila (posição {position})..."})
+        return position
+
+    def _work(self):
+        while True:
+            job, cv, params, enqueued_at = self._queue.get()
+            started = time.monotonic()
+            with self._lock:
+                self._wait_times.append(started - enqueued_at)
+                self._busy += 1
+            try:
+                run_search_job(job, cv, params)
+            finally:
+                with self._lock:
+                    self._busy -= 1
+                    self._busy_seconds += time.monotonic() - started
+                    if job.status == "failed":
+                        self.failed += 1
+                    else:
+                        self.completed += 1
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._wait_times)
+            uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+            return {
+                "workers": self.workers,
+                "busy_workers": self._busy,
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "wait_seconds_avg": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                "wait_seconds_p95": round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else 0.0,
+                "utilization": round(self._busy_seconds / (uptime * self.workers), 3) if uptime else 0.0,
+            }
+
+
+search_queue = SearchQueue()
+metrics.add_collector("search_queue", search_queue.stats, "Background search queue")
+
+def start_search_job(cv, params: dict) -> SearchJob:
+    """Creates a search job for a CVRecord (or plain CV text) and hands it to the background worker pool."""
+    job = create_search_job()
+    try:
+        search_queue.submit(job, cv, params)
+    except QueueFullError:
+        _search_jobs.pop(job.id)
+        raise
+    return job
@@ -3,18 +3,47 @@ import unicodedata
 import re
 from datetime import datetime, timedelta
 import pandas as pd
+import markdown
 from jobspy import scrape_jobs
 
+from services.cache import TTLCache, sha256_text
+from services.telemetry import SCRAPED_POSTINGS, log_event, span, metrics
+
+# Rendered description HTML memoized by content hash (reposts and repeated searches render once)
+DESCRIPTION_HTML_CACHE_SIZE = int(os.getenv("DESCRIPTION_HTML_CACHE_SIZE", 512))
+
 # ==============================================================================
 # SECTION 0: IN-MEMORY DATA MODEL (Replaces SQLAlchemy Job Model)
 # ==============================================================================
 
+_description_html = TTLCache(max_entries=DESCRIPTION_HTML_CACHE_SIZE)
+metrics.add_collector("description_html", _description_html.stats, "Rendered job description memo")
+
+def render_description(text: str) -> str:
+    """Markdown description -> HTML, memoized by the sha256 of the markdown."""
+    text = text or ""
+    key = sha256_text(text)
+    html = _description_html.get(key)
+    if html is None:
+        with span("render.markdown"):
+            html = markdown.markdown(text)
+        _description_html.set(key, html)
+    return html
+
 class JobInMemory:
     """
     A lightweight, plain Python object to hold job data in memory.
     This replaces the SQLAlchemy Job model so we don't need a database,
     while keeping the dot notation (job.title, job.description) working across the app.
+    Slotted (no per-instance __dict__), and the HTML of the description is never stored
+    on the job: `formatted_description` renders it on demand through a shared memo.
     """
+    __slots__ = (
+        "title", "company", "location", "link", "description", "source", "published_at",
+        "match_score", "rationale", "score_tier", "pre_rank_score", "merged_from", "scoring_text",
+        "similarity",
+    )
+
     def __init__(self, title, company, location, link, description, source, published_at):
         self.title = title
         self.company = company
@@ -27,7 +56,25 @@ class JobInMemory:
         # Fields that will be filled later by the AI Manager
         self.match_score = None
         self.rationale = None
-        self.formatted_description = None
+        # Scoring tier that produced match_score: "single", or "fast"/"strong" in cascade mode
+        self.score_tier = None
+
+        # Local lexical score (0-100) filled by the pre-ranker before the AI stage
+        self.pre_rank_score = None
+
+        # Near-duplicate reposts collapsed into this job: [{"source", "link", "location"}, ...]
+        self.merged_from = []
+
+        # Token-budgeted description sent to the LLM instead of the full markdown (set by the compactor)
+        self.scoring_text = None
+
+        # Cosine similarity (0-100) to a CV, set by the vector index on stored-job retrieval
+        self.similarity = None
+
+    @property
+    def formatted_description(self) -> str:
+        """Description rendered to HTML, only when a job is actually displayed."""
+        return render_description(self.description)
 
 # ==============================================================================
 # SECTION 1: TEXT TREATMENT UTILITIES
@@ -50,6 +97,21 @@ def normalize_text(text: str) -> str:
     normalized = re.sub(r'\s+', ' ', normalized)
     return normalized.strip()
 
+def normalize_series(series: pd.Series) -> pd.Series:
+    """
+    Vectorized normalize_text over a whole DataFrame column.
+    Whitespace is collapsed before the ASCII fold so non-ASCII spaces still separate words;
+    the fold then drops the accents (and any other non-ASCII char the regex would remove anyway).
+    """
+    return (
+        series.fillna("").astype(str).str.lower()
+        .str.replace(r'\s+', ' ', regex=True)
+        .str.normalize('NFD').str.encode('ascii', 'ignore').str.decode('ascii')
+        .str.replace(r'[^a-z0-9\s]', '', regex=True)
+        .str.replace(r'\s+', ' ', regex=True)
+        .str.strip()
+    )
+
 # ==============================================================================
 # SECTION 2: DATE PARSING ENGINE
 # ==============================================================================
@@ -124,14 +186,45 @@ def format_date_br(date_val) -> str:
 # SECTION 3: COLLECTION AND FILTERING LOGIC
 # ==============================================================================
 
-def fetch_jobs_in_memory(term: str, location: str = "Brazil", results_wanted: int = 30, hours_old: int = 24, filter_words: str = "") -> list:
+SCRAPE_SITES = ["linkedin", "indeed", "glassdoor"]
+
+class TrackingReport:
     """
-    Fetches job postings from multiple platforms, applies exclusion filters, 
-    deduplicates IN-MEMORY for the current session, and returns the list of objects.
+    Accumulates the approval/rejection counters and log samples of a scraping run.
+    A single report can be shared by several scrape units so the whole search is summarized at once.
+    """
+    def __init__(self):
+        self.stats = {
+            "approved": 0, "duplicated": 0, "rejected_missing_keyword": 0, "rejected_strict_relevance": 0, "rejected_invalid": 0,
+            "unchanged": 0
+        }
+        self.log_duplicates = []
+        self.log_rejected_keywords = []
+        self.log_rejected_relevance = []
+
+    def log_report(self, label: str):
+        """
+        Emits the run's counters as the `scrape.report` structured event (with up to 5 samples
+        of each rejection kind) and adds them to the scraped-postings metric.
+        """
+        for outcome, count in self.stats.items():
+            if count:
+                SCRAPED_POSTINGS.inc(count, outcome=outcome)
+        log_event(
+            "scrape.report",
+            label=label,
+            **self.stats,
+            duplicate_samples=self.log_duplicates[:5],
+            missing_keyword_samples=self.log_rejected_keywords[:5],
+            irrelevant_samples=self.log_rejected_relevance[:5],
+        )
+
+def resolve_scrape_locations(location: str, results_wanted: int) -> tuple:
+    """
+    Applies the REMOTE & MULTI-COUNTRY logic to a user location.
+    Returns (targets, is_remote_search, results_wanted) where targets is a list of
+    (location, country_indeed) pairs to be scraped.
     """
-    print(f"🕵️  Starting focused search: '{term}' in '{location}' (Last {hours_old}h)...")
-    
-    # --- REMOTE & MULTI-COUNTRY LOGIC ---
     is_remote_search = False
     locations_to_scrape = [location]
     
@@ -142,8 +235,7 @@ def fetch_jobs_in_memory(term: str, location: str = "Brazil", results_wanted: in
     elif 'remote' in location.lower() or 'remoto' in location.lower():
         is_remote_search = True
 
-    all_dfs = []
-    
+    targets = []
     for loc in locations_to_scrape:
         target_country = 'brazil'
         loc_lower = loc.lower()
@@ -153,123 +245,161 @@ def fetch_jobs_in_memory(term: str, location: str = "Brazil", results_wanted: in
             target_country = 'uk'
         elif loc_lower in ['ireland', 'irlanda']:
             target_country = 'ireland'
+        targets.append((loc, target_country))
 
+    return targets, is_remote_search, results_wanted
+
+def scrape_unit(term: str, location: str, country: str, sites: list, results_wanted: int, hours_old: int, is_remote_search: bool,
+                raise_errors: bool = False):
+    """
+    Runs a single jobspy scrape for one term, one location and the given sites.
+    Returns a DataFrame, or None if nothing was found or the scraper failed.
+    With `raise_errors`, scraper failures are logged and re-raised instead, so callers
+    that keep crawl watermarks can tell a failed unit from an empty one.
+    """
+    with span("scrape.unit", term=term, location=location, sites=",".join(sites), hours_old=hours_old) as unit_span:
         try:
-            print(f"   -> Scraping location: {loc} (is_remote={is_remote_search})...")
+            print(f"   -> Scraping '{term}' @ {location} on {', '.join(sites)} (is_remote={is_remote_search})...")
             df = scrape_jobs(
-                site_name=["linkedin", "indeed", "glassdoor"],
+                site_name=sites,
                 search_term=term,
-                location=loc,
+                location=location,
                 results_wanted=results_wanted,
                 hours_old=hours_old,
-                country_indeed=target_country,
+                country_indeed=country,
                 is_remote=is_remote_search,    
                 linkedin_fetch_description=True,
                 description_format="markdown",
                 delay=5
             )
+            unit_span.set(rows=0 if df is None else len(df))
             if df is not None and not df.empty:
-                all_dfs.append(df)
+                return df
         except Exception as e:
-            print(f"❌ Critical failure in scraper for {loc}: {e}")
+            unit_span.set(error=type(e).__name__)
+            print(f"❌ Critical failure in scraper for {location} ({', '.join(sites)}): {e}")
+            if raise_errors:
+                raise
+    return None
 
-    if not all_dfs:
-        print("⚠️ No jobs found by the scrapers in this run.")
+# Words ignored when looking for the search term in a job title
+RELEVANCE_STOP_WORDS = {'de', 'da', 'do', 'das', 'dos', 'em', 'para', 'com', 'e', 'o', 'a', 'analista', 'pessoa', 'pleno', 'senior', 'junior', 'sr', 'jr', 'of', 'and', 'for', 'in'}
+
+class RelevanceFilter:
+    """
+    The GENERALIZED RELEVANCE FILTER compiled once per (term, filter_words):
+    term tokens, required keywords and regexes are precomputed, then applied
+    to whole normalized title/description columns at once.
+    """
+    def __init__(self, term: str, filter_words: str = ""):
+        self.term = term
+        self.term_norm = normalize_text(term)
+
+        # 1. Dynamic User INCLUSION (filter_words from the frontend)
+        self.required_words = [w for w in (normalize_text(w.strip()) for w in filter_words.split(','))] if filter_words else []
+        self.required_words = [w for w in self.required_words if w]
+
+        # 2. Strict Relevance Check (Title Priority + Word Boundaries + Stop Words)
+        term_words = [w for w in self.term_norm.split() if w not in RELEVANCE_STOP_WORDS and len(w) > 2]
+        self.title_pattern = re.compile("|".join(re.escape(w) for w in term_words)) if term_words else None
+        self.strict_pattern = re.compile(r'\b' + re.escape(self.term_norm) + r'\b')
+
+    def missing_keywords(self, title_norm: pd.Series, desc_norm: pd.Series) -> pd.Series:
+        """First required keyword absent from both title and description ('' when none is missing)."""
+        missing = pd.Series("", index=title_norm.index)
+        for req_word in self.required_words:
+            absent = ~(title_norm.str.contains(req_word, regex=False) | desc_norm.str.contains(req_word, regex=False))
+            missing = missing.mask((missing == "") & absent, req_word)
+        return missing
+
+    def is_relevant(self, title_norm: pd.Series, desc_norm: pd.Series) -> pd.Series:
+        is_in_title = title_norm.str.contains(self.title_pattern) if self.title_pattern else pd.Series(False, index=title_norm.index)
+        is_in_desc_strictly = desc_norm.str.contains(self.strict_pattern)
+        return is_in_title | is_in_desc_strictly
+
+def _column(df: pd.DataFrame, name: str) -> pd.Series:
+    return df[name] if name in df.columns else pd.Series(None, index=df.index, dtype=object)
+
+def filter_scraped_jobs(jobs_df, term: str, filter_words: str = "", is_remote_search: bool = False,
+                        existing_links: set = None, existing_fingerprints: set = None,
+                        report: TrackingReport = None, relevance_filter: RelevanceFilter = None) -> list:
+    """
+    Applies validation, the relevance filter and deduplication to a scraped DataFrame
+    and returns the approved rows as JobInMemory objects.
+    Normalization and matching run over whole columns; only the surviving rows are
+    visited one by one for deduplication. The dedup sets and the report are updated
+    in place, so callers can share them across several scrapes.
+    """
+    existing_links = existing_links if existing_links is not None else set()
+    existing_fingerprints = existing_fingerprints if existing_fingerprints is not None else set()
+    report = report if report is not None else TrackingReport()
+    relevance_filter = relevance_filter or RelevanceFilter(term, filter_words)
+    stats = report.stats
+
+    # Positional labels, so per-row lookups below never hit a duplicated index
+    jobs_df = jobs_df.reset_index(drop=True)
+    titles = _column(jobs_df, 'title').fillna("").astype(str)
+    companies = _column(jobs_df, 'company').fillna("").astype(str)
+    links = _column(jobs_df, 'job_url').fillna("").astype(str)
+
+    # Validation
+    valid = (titles != "") & (links != "")
+    stats["rejected_invalid"] += int((~valid).sum())
+    if not valid.any():
         return []
 
-    jobs_df = pd.concat(all_dfs, ignore_index=True)
-    all_found_jobs = jobs_df.to_dict('records')
-    
-    # --- PREPARING IN-MEMORY DEDUPLICATION ---
-    # We only check for duplicates within THIS specific search session
-    existing_links = set()
-    existing_fingerprints = set()
+    df = jobs_df[valid]
+    titles, companies, links = titles[valid], companies[valid], links[valid]
+    descriptions = _column(df, 'description').fillna("").astype(str)
+
+    title_norm = normalize_series(titles)
+    comp_norm = normalize_series(companies)
+    desc_norm = normalize_series(descriptions)
+
+    # --- GENERALIZED RELEVANCE FILTER (vectorized) ---
+    missing = relevance_filter.missing_keywords(title_norm, desc_norm)
+    has_keywords = missing == ""
+    relevant = relevance_filter.is_relevant(title_norm, desc_norm)
+
+    rejected_keywords = ~has_keywords
+    rejected_relevance = has_keywords & ~relevant
+    stats["rejected_missing_keyword"] += int(rejected_keywords.sum())
+    stats["rejected_strict_relevance"] += int(rejected_relevance.sum())
+
+    for idx in missing[rejected_keywords].index[:5]:
+        report.log_rejected_keywords.append(f"[{companies[idx]}] {titles[idx]} -> Missing keyword: '{missing[idx]}'")
+    for idx in relevant[rejected_relevance].index[:5]:
+        report.log_rejected_relevance.append(f"[{companies[idx]}] {titles[idx]} -> No core relation to '{term}'")
+
+    candidates = has_keywords & relevant
+    fingerprints = title_norm + comp_norm
 
-    # Detailed Stats and Logs
-    stats = {
-        "approved": 0, "duplicated": 0, "rejected_missing_keyword": 0, "rejected_strict_relevance": 0, "rejected_invalid": 0
-    }
-    
-    log_duplicates = []
-    log_rejected_keywords = []
-    log_rejected_relevance = []
-    
     final_jobs_list = []
-    
-    for row in all_found_jobs:
-        title = str(row.get('title', ''))
-        company = str(row.get('company', ''))
-        link = str(row.get('job_url', ''))
-        desc = str(row.get('description', ''))
-        
-        # Validation
-        if not title or not link or pd.isna(title) or pd.isna(link):
-            stats["rejected_invalid"] += 1
-            continue
+
+    for idx in candidates[candidates].index:
+        title, company, link = titles[idx], companies[idx], links[idx]
 
         # --- BULLETPROOF DEDUPLICATION ---
         if link in existing_links:
             stats["duplicated"] += 1
-            log_duplicates.append(f"[{company}] {title} (Session Link Match)")
+            report.log_duplicates.append(f"[{company}] {title} (Session Link Match)")
             continue
-            
-        current_tit_norm = normalize_text(title)
-        current_comp_norm = normalize_text(company)
-        current_fingerprint = f"{current_tit_norm}{current_comp_norm}"
-        
+
+        current_fingerprint = fingerprints[idx]
         if current_fingerprint in existing_fingerprints:
             stats["duplicated"] += 1
-            log_duplicates.append(f"[{company}] {title} (Session Fingerprint Match)")
-            continue
-
-        desc_norm = normalize_text(desc)
-
-        # =====================================================================
-        # --- GENERALIZED RELEVANCE FILTER ---
-        # =====================================================================
-        
-        # 1. Dynamic User INCLUSION (filter_words from the frontend)
-        missing_mandatory_keyword = False
-        missing_word_name = ""
-        if filter_words:
-            required_words = [normalize_text(w.strip()) for w in filter_words.split(',')]
-            for req_word in required_words:
-                if req_word and req_word not in current_tit_norm and req_word not in desc_norm:
-                    missing_mandatory_keyword = True
-                    missing_word_name = req_word
-                    break 
-                    
-        if missing_mandatory_keyword:
-            stats["rejected_missing_keyword"] += 1
-            log_rejected_keywords.append(f"[{company}] {title} -> Missing keyword: '{missing_word_name}'")
+            report.log_duplicates.append(f"[{company}] {title} (Session Fingerprint Match)")
             continue
 
-        # 2. Strict Relevance Check (Title Priority + Word Boundaries + Stop Words)
-        term_norm = normalize_text(term)
-        
-        stop_words = {'de', 'da', 'do', 'das', 'dos', 'em', 'para', 'com', 'e', 'o', 'a', 'analista', 'pessoa', 'pleno', 'senior', 'junior', 'sr', 'jr', 'of', 'and', 'for', 'in'}
-        term_words = [w for w in term_norm.split() if w not in stop_words and len(w) > 2]
-        
-        is_in_title = any(word in current_tit_norm for word in term_words) if term_words else False
-        
-        strict_pattern = r'\b' + re.escape(term_norm) + r'\b'
-        is_in_desc_strictly = bool(re.search(strict_pattern, desc_norm))
-        
-        if not (is_in_title or is_in_desc_strictly):
-            stats["rejected_strict_relevance"] += 1
-            log_rejected_relevance.append(f"[{company}] {title} -> No core relation to '{term}'")
-            continue
-            
-        # =====================================================================
-
         # --- APPROVAL AND PREPARATION ---
         stats["approved"] += 1
         existing_links.add(link)
         existing_fingerprints.add(current_fingerprint)
 
+        row = df.loc[idx]
         job_location = str(row.get('location', 'Not provided'))
         is_job_remote = row.get('is_remote', False)
-        if is_remote_search or is_job_remote:
+        if is_remote_search or (not pd.isna(is_job_remote) and bool(is_job_remote)):
             if "remote" not in job_location.lower():
                 job_location = f"Remote, {job_location}"
 
@@ -279,33 +409,44 @@ def fetch_jobs_in_memory(term: str, location: str = "Brazil", results_wanted: in
             company=company,
             location=job_location,
             link=link,
-            description=desc or "Detailed description available on the source link.",
+            description=descriptions[idx] or "Detailed description available on the source link.",
             source=str(row.get('site', 'unknown')).lower(),
             published_at=format_date_br(row.get('date_posted'))
         )
         final_jobs_list.append(new_job)
 
-    # --- TRACKING REPORT ---
-    print(f"\n" + "="*70)
-    print(f"📊 TRACKING REPORT FOR: '{term}'")
-    print(f"="*70)
-    print(f"✅ New Jobs Approved:         {stats['approved']}")
-    print(f"🔄 Discarded (Duplicates):    {stats['duplicated']}")
-    print(f"❌ Rejected (No Keywords):    {stats['rejected_missing_keyword']}")
-    print(f"❌ Rejected (Irrelevant):     {stats['rejected_strict_relevance']}")
+    return final_jobs_list
+
+def fetch_jobs_in_memory(term: str, location: str = "Brazil", results_wanted: int = 30, hours_old: int = 24, filter_words: str = "") -> list:
+    """
+    Fetches job postings from multiple platforms, applies exclusion filters, 
+    deduplicates IN-MEMORY for the current session, and returns the list of objects.
+    """
+    print(f"🕵️  Starting focused search: '{term}' in '{location}' (Last {hours_old}h)...")
     
-    if log_duplicates:
-        print("\n  🔄 Duplicates Sample:")
-        for log in log_duplicates[:5]: print(f"     - {log}")
-            
-    if log_rejected_keywords:
-        print("\n  ❌ Missing User Keyword Sample:")
-        for log in log_rejected_keywords[:5]: print(f"     - {log}")
+    targets, is_remote_search, results_wanted = resolve_scrape_locations(location, results_wanted)
 
-    if log_rejected_relevance:
-        print("\n  ❌ Irrelevant Job Sample (Saved API Tokens!):")
-        for log in log_rejected_relevance[:5]: print(f"     - {log}")
-        
-    print(f"="*70 + "\n")
+    all_dfs = []
+    
+    for loc, target_country in targets:
+        df = scrape_unit(term, loc, target_country, SCRAPE_SITES, results_wanted, hours_old, is_remote_search)
+        if df is not None:
+            all_dfs.append(df)
+
+    if not all_dfs:
+        print("⚠️ No jobs found by the scrapers in this run.")
+        return []
+
+    jobs_df = pd.concat(all_dfs, ignore_index=True)
+    
+    # --- IN-MEMORY DEDUPLICATION ---
+    # We only check for duplicates within THIS specific search session
+    report = TrackingReport()
+    final_jobs_list = filter_scraped_jobs(
+        jobs_df, term, filter_words=filter_words, is_remote_search=is_remote_search, report=report
+    )
+
+    # --- TRACKING REPORT ---
+    report.log_report(term)
 
-    return final_jobs_list
\ No newline at end of file
+    return final_jobs_list
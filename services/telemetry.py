@@ -0,0 +1,338 @@
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import atexit
+import bisect
+import logging
+import threading
+import contextvars
+from logging.handlers import QueueHandler, QueueListener
+
+# Structured log level of the "seekerbot" logger (per-job scoring lines are DEBUG)
+TELEMETRY_LOG_LEVEL = os.getenv("TELEMETRY_LOG_LEVEL", "INFO").upper()
+
+# Adds a Server-Timing header (span breakdown of the request / search) to HTTP responses
+SERVER_TIMING = os.getenv("SERVER_TIMING", "False") == "True"
+
+# Spans kept per trace for the timing breakdown; the aggregated totals keep counting past it
+TRACE_MAX_SPANS = 2000
+
+# Seconds; wide enough for minute-long scrapes and rate-limited LLM waits
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# ==============================================================================
+# SECTION 1: METRICS (COUNTERS, HISTOGRAMS, PROMETHEUS TEXT FORMAT)
+# ==============================================================================
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter with a fixed set of label names."""
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list:
+        with self._lock:
+            return [(self.name, _format_labels(self.labels, key), value) for key, value in sorted(self._values.items())]
+
+class Histogram:
+    """Cumulative-bucket histogram with a fixed set of label names."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # label key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            if position < len(self.buckets):
+                state[position] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self) -> list:
+        rows = []
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                rows.append((f"{self.name}_bucket", _format_labels(self.labels, key, f'le="{_format_value(float(bound))}"'), cumulative))
+            rows.append((f"{self.name}_bucket", _format_labels(self.labels, key, 'le="+Inf"'), state[-1]))
+            rows.append((f"{self.name}_sum", _format_labels(self.labels, key), round(state[-2], 6)))
+            rows.append((f"{self.name}_count", _format_labels(self.labels, key), state[-1]))
+        return rows
+
+class MetricsRegistry:
+    """
+    Process-wide metrics, rendered in the Prometheus text exposition format by /metrics.
+    Collectors expose the existing `stats()` dicts (search queue, LLM pool, caches) as gauges,
+    read at scrape time. Each gunicorn worker process keeps (and serves) its own registry.
+    """
+    def __init__(self, prefix: str = "seekerbot"):
+        self.prefix = prefix
+        self._metrics = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str, labels: tuple = ()) -> Counter:
+        return self._register(Counter(f"{self.prefix}_{name}", help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(f"{self.prefix}_{name}", help_text, labels, buckets))
+
+    def add_collector(self, name: str, stats_func, help_text: str = ""):
+        """Publishes every numeric value of `stats_func()` as a gauge named <prefix>_<name>_<key>."""
+        with self._lock:
+            self._collectors[name] = (stats_func, help_text)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in metric.samples())
+
+        for name, (stats_func, help_text) in collectors:
+            try:
+                stats = stats_func()
+            except Exception as e:
+                lines.append(f"# collector {name} failed: {_escape(e)}")
+                continue
+            for key, value in stats.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if not isinstance(value, (int, float)):
+                    continue
+                gauge = f"{self.prefix}_{name}_{key}"
+                lines.append(f"# HELP {gauge} {help_text or name} ({key})")
+                lines.append(f"# TYPE {gauge} gauge")
+                lines.append(f"{gauge} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+SPAN_SECONDS = metrics.histogram("span_duration_seconds", "Duration of traced pipeline stages.", ("span",))
+SPAN_ERRORS = metrics.counter("span_errors_total", "Traced stages that raised.", ("span",))
+SCRAPED_POSTINGS = metrics.counter("scraped_postings_total", "Scraped postings by filtering outcome.", ("outcome",))
+LLM_REQUESTS = metrics.counter("llm_requests_total", "LLM completions by purpose and final outcome.", ("purpose", "outcome"))
+LLM_RETRIES = metrics.counter("llm_retries_total", "Rate-limited LLM attempts that were retried.", ("purpose",))
+LLM_TOKENS = metrics.counter("llm_tokens_total", "LLM tokens spent, from the API usage when reported.", ("purpose", "kind"))
+JOBS_SCORED = metrics.counter("jobs_scored_total", "Jobs leaving the AI stage by outcome.", ("outcome",))
+SEARCHES = metrics.counter("searches_total", "Background searches by final status.", ("status",))
+HTTP_SECONDS = metrics.histogram("http_request_duration_seconds", "Flask request latency by endpoint.", ("endpoint", "status"))
+
+# ==============================================================================
+# SECTION 2: STRUCTURED, NON-BLOCKING LOGGING
+# ==============================================================================
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, event name, trace id and the event's fields."""
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "event": record.getMessage(),
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            payload["trace_id"] = trace_id
+        payload.update(getattr(record, "fields", {}))
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+def _build_logger() -> logging.Logger:
+    # Records go through a queue to a single writer thread, so request and worker
+    # threads never block on stdout under load
+    logger = logging.getLogger("seekerbot")
+    logger.setLevel(TELEMETRY_LOG_LEVEL)
+    logger.propagate = False
+    if not logger.handlers:
+        records = queue.SimpleQueue()
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(JSONFormatter())
+        listener = QueueListener(records, stream)
+        listener.start()
+        atexit.register(listener.stop)
+        logger.addHandler(QueueHandler(records))
+    return logger
+
+
+logger = _build_logger()
+
+def log_event(event: str, level: int = logging.INFO, **fields):
+    """Logs a structured event, tagged with the id of the current trace (if any)."""
+    if not logger.isEnabledFor(level):
+        return
+    trace = _current_trace.get()
+    logger.log(level, event, extra={"fields": fields, "trace_id": trace.id if trace else None})
+
+# ==============================================================================
+# SECTION 3: TRACES & SPANS
+# ==============================================================================
+
+class Trace:
+    """
+    Spans of one HTTP request or one background search. Keeps up to TRACE_MAX_SPANS raw spans
+    and per-name totals, which make the timing breakdown (JSON and Server-Timing header).
+    """
+    def __init__(self, name: str, trace_id: str = None):
+        self.id = trace_id or uuid.uuid4().hex[:16]
+        self.name = name
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.spans = []
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, started: float, duration: float, attrs: dict):
+        with self._lock:
+            count, total = self.totals.get(name, (0, 0.0))
+            self.totals[name] = (count + 1, total + duration)
+            if len(self.spans) < TRACE_MAX_SPANS:
+                self.spans.append({
+                    "name": name,
+                    "start_ms": round((started - self._started) * 1000, 1),
+                    "duration_ms": round(duration * 1000, 1),
+                    **attrs,
+                })
+
+    def breakdown(self) -> dict:
+        """{span name: {count, total_ms}} plus the trace's own elapsed time."""
+        with self._lock:
+            totals = dict(self.totals)
+            spans = list(self.spans)
+        return {
+            "trace_id": self.id,
+            "name": self.name,
+            "elapsed_ms": round((time.perf_counter() - self._started) * 1000, 1),
+            "stages": {name: {"count": count, "total_ms": round(total * 1000, 1)} for name, (count, total) in totals.items()},
+            "spans": spans,
+        }
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: one entry per span name with its summed duration."""
+        with self._lock:
+            totals = sorted(self.totals.items(), key=lambda item: item[1][1], reverse=True)
+        return ", ".join(
+            f'{name.replace(" ", "_")};dur={total * 1000:.1f};desc="x{count}"' for name, (count, total) in totals
+        )
+
+
+_current_trace = contextvars.ContextVar("seekerbot_trace", default=None)
+
+def current_trace():
+    return _current_trace.get()
+
+def start_trace(trace: Trace):
+    """Makes `trace` current for this thread/context; returns the token for `end_trace`."""
+    return _current_trace.set(trace)
+
+def end_trace(token):
+    _current_trace.reset(token)
+
+def bind_trace(func):
+    """
+    Wraps `func` so it runs inside the caller's current trace. Needed for work handed to
+    thread pools, whose threads do not inherit the submitting thread's context.
+    """
+    trace = _current_trace.get()
+
+    def traced(*args, **kwargs):
+        token = _current_trace.set(trace)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current_trace.reset(token)
+
+    return traced
+
+class Span:
+    """
+    Times one stage: always observed in the span histogram, and recorded with its attributes
+    in the current trace when there is one. Use through `span(name, **attrs)`.
+    """
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+        self._started = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._started
+        SPAN_SECONDS.observe(duration, span=self.name)
+        if exc_type is not None:
+            SPAN_ERRORS.inc(span=self.name)
+            self.attrs["error"] = exc_type.__name__
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(self.name, self._started, duration, self.attrs)
+        return False
+
+def span(name: str, **attrs) -> Span:
+    return Span(name, attrs)
+
+# ==============================================================================
+# SECTION 4: DOMAIN HELPERS
+# ==============================================================================
+
+def record_llm_call(purpose: str, outcome: str, prompt_tokens: int = 0, completion_tokens: int = 0, retries: int = 0):
+    """Counts one logical LLM call (after its retries) and the tokens it spent."""
+    LLM_REQUESTS.inc(purpose=purpose, outcome=outcome)
+    if retries:
+        LLM_RETRIES.inc(retries, purpose=purpose)
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, purpose=purpose, kind="prompt")
+    if completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, purpose=purpose, kind="completion")
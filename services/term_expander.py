@@ -1,21 +1,90 @@
 import os
-from openai import OpenAI
+import json
+from services.cache import TTLCache
+from services.llm_client import get_llm_client
+from services.seeker import normalize_text
+from services.telemetry import record_llm_call, span
+
+# ==============================================================================
+# SECTION 1: EXPANSION CACHE & PRE-WARMED TABLE
+# ==============================================================================
+
+TERM_EXPANSION_TTL = float(os.getenv("TERM_EXPANSION_TTL", 7 * 24 * 3600))
+TERM_EXPANSIONS_FILE = os.getenv(
+    "TERM_EXPANSIONS_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "term_expansions.json")
+)
+
+# Expansions produced by the LLM, keyed by the normalized base term
+_expansion_cache = TTLCache(max_entries=2048, ttl_seconds=TERM_EXPANSION_TTL)
+# Curated expansions loaded at startup; they never expire nor get evicted
+_prewarmed_expansions = {}
+
+# Expansion sits in front of every search, so it fails fast instead of waiting a full read timeout
+TERM_EXPANSION_TIMEOUT = float(os.getenv("TERM_EXPANSION_TIMEOUT", 15))
+
+def load_prewarmed_expansions(path: str = TERM_EXPANSIONS_FILE) -> int:
+    """
+    Loads a JSON table of {"base term": ["variation", ...]} so popular searches
+    get their variations with zero latency and without spending the LLM rate limit.
+    Returns how many base terms were loaded.
+    """
+    if not path or not os.path.exists(path):
+        return 0
+    try:
+        with open(path, encoding="utf-8") as f:
+            table = json.load(f)
+    except Exception as e:
+        print(f"⚠️ Could not load pre-warmed term expansions from {path}: {e}")
+        return 0
+
+    for base_term, variations in table.items():
+        key = normalize_text(base_term)
+        if key and variations:
+            _prewarmed_expansions[key] = [str(v) for v in variations]
+    return len(table)
+
+def _with_base_term(base_term: str, variations: list) -> list:
+    # The cached list may have been produced by a differently cased/accented
+    # spelling of the same term, so the user's own spelling always comes first.
+    final_list = [base_term]
+    for term in variations:
+        if normalize_text(term) != normalize_text(base_term) and term.lower() not in [t.lower() for t in final_list]:
+            final_list.append(term)
+    return final_list[:10]
+
+load_prewarmed_expansions()
+
+# ==============================================================================
+# SECTION 2: AI TERM EXPANSION
+# ==============================================================================
 
 def get_expanded_terms(base_term: str) -> list:
     """
     Uses the Groq API (Llama) to expand a job search term into 5 highly relevant variations.
-    Returns a list of strings.
+    Returns a list of strings. Results are served from the pre-warmed table or the TTL cache when possible.
     """
+    cache_key = normalize_text(base_term)
+
+    if cache_key in _prewarmed_expansions:
+        final_list = _with_base_term(base_term, _prewarmed_expansions[cache_key])
+        print(f"✅ Expanded terms (pre-warmed): {final_list}")
+        return final_list
+
+    cached = _expansion_cache.get(cache_key)
+    if cached is not None:
+        final_list = _with_base_term(base_term, cached)
+        print(f"✅ Expanded terms (cached): {final_list}")
+        return final_list
+
     api_key = os.getenv("GROQ_API_KEY")
     
     if not api_key:
         print("⚠️ GROQ_API_KEY not found. Defaulting to the original search term.")
         return [base_term]
 
-    client = OpenAI(
-        base_url="https://api.groq.com/openai/v1",
-        api_key=api_key
-    )
+    # Shared pooled client; expansion keeps the SDK's own retries on top of it
+    client = get_llm_client("https://api.groq.com/openai/v1", api_key).with_options(max_retries=2, timeout=TERM_EXPANSION_TIMEOUT)
 
     # Strict English prompt to ensure the LLM outputs ONLY a comma-separated list
     system_prompt = (
@@ -29,15 +98,26 @@ def get_expanded_terms(base_term: str) -> list:
 
     try:
         print(f"🧠 Querying AI to expand search term: '{base_term}'...")
-        response = client.chat.completions.create(
-            model="meta-llama/llama-4-scout-17b-16e-instruct",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Term: {base_term}"}
-            ],
-            temperature=0.3, # Low temperature for strict compliance
-            max_tokens=60
-        )
+        with span("llm.call", purpose="expand") as call_span:
+            try:
+                response = client.chat.completions.create(
+                    model="meta-llama/llama-4-scout-17b-16e-instruct",
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": f"Term: {base_term}"}
+                    ],
+                    temperature=0.3, # Low temperature for strict compliance
+                    max_tokens=60
+                )
+            except Exception:
+                call_span.set(outcome="error")
+                record_llm_call("expand", "error")
+                raise
+            usage = getattr(response, "usage", None)
+            prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+            completion_tokens = getattr(usage, "completion_tokens", None) or 0
+            call_span.set(outcome="ok", prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+            record_llm_call("expand", "ok", prompt_tokens, completion_tokens)
         
         ai_output = response.choices[0].message.content.strip()
         expanded_terms = [term.strip() for term in ai_output.split(',')]
@@ -52,6 +132,7 @@ def get_expanded_terms(base_term: str) -> list:
         final_list = final_list[:10]
         
         print(f"✅ Expanded terms: {final_list}")
+        _expansion_cache.set(cache_key, final_list)
         return final_list
 
     except Exception as e:
@@ -0,0 +1,346 @@
+import os
+import time
+import zlib
+import datetime
+import threading
+from collections import Counter
+import numpy as np
+
+from services.seeker import JobInMemory
+from services.pre_ranker import tokenize
+from services.crawl_store import job_content_hash, _chunks
+from services.telemetry import span, metrics
+
+# Embed every scraped posting into the local vector index (needs the database.py engine)
+VECTOR_INDEX_ENABLED = os.getenv("VECTOR_INDEX_ENABLED", "True") == "True"
+# Vectors written by other processes (e.g. the pre-crawler) are picked up at most this late
+VECTOR_INDEX_SYNC_SECONDS = float(os.getenv("VECTOR_INDEX_SYNC_SECONDS", 60))
+# Each sync re-reads this many seconds before its watermark: rows are stamped before their writer
+# commits, so a slow writer's rows can become visible with an older embedded_at (also absorbs clock skew)
+VECTOR_INDEX_SYNC_OVERLAP = float(os.getenv("VECTOR_INDEX_SYNC_OVERLAP", 300))
+
+# Feature hashing into EMBEDDING_BUCKETS buckets, then a fixed random projection to EMBEDDING_DIMS.
+# The projection is data-independent, so vectors never need refitting as the corpus grows.
+EMBEDDING_BUCKETS = 2 ** 14
+EMBEDDING_DIMS = 256
+EMBEDDING_SEED = 20240901
+# Characters of the description embedded (the requirements are near the top of most postings)
+EMBEDDING_MAX_CHARS = 6000
+# Bump whenever the tokenizer, features, buckets, dims or seed change: old vectors are re-embedded
+EMBEDDING_VERSION = f"hash-rp-v1-{EMBEDDING_BUCKETS}-{EMBEDDING_DIMS}-{EMBEDDING_SEED}"
+
+# ==============================================================================
+# SECTION 1: LOCAL CPU EMBEDDINGS (FEATURE HASHING + RANDOM PROJECTION)
+# ==============================================================================
+
+_projection = None
+_projection_lock = threading.Lock()
+
+def _get_projection() -> np.ndarray:
+    """(EMBEDDING_BUCKETS x EMBEDDING_DIMS) Gaussian projection, identical in every process (fixed seed)."""
+    global _projection
+    with _projection_lock:
+        if _projection is None:
+            rng = np.random.default_rng(EMBEDDING_SEED)
+            _projection = (rng.standard_normal((EMBEDDING_BUCKETS, EMBEDDING_DIMS), dtype=np.float32)
+                           / np.float32(np.sqrt(EMBEDDING_DIMS)))
+        return _projection
+
+def text_features(text: str) -> Counter:
+    """Unigrams and word bigrams of the pre-ranker's tokenization (stop words removed)."""
+    tokens = tokenize(text)
+    return Counter(tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])])
+
+def embed_text(text: str) -> np.ndarray:
+    """
+    Unit-length EMBEDDING_DIMS vector of a text. Each feature is hashed to a bucket and a sign,
+    weighted by 1 + log(tf), and the rows of the projection matrix are summed accordingly,
+    so cosine similarity approximates that of the (huge, sparse) hashed term vectors.
+    """
+    features = text_features(text)
+    vector = np.zeros(EMBEDDING_DIMS, dtype=np.float32)
+    if not features:
+        return vector
+
+    hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint32, count=len(features))
+    counts = np.fromiter(features.values(), dtype=np.float32, count=len(features))
+    signs = np.where((hashes >> 31) & 1, -1.0, 1.0).astype(np.float32)
+    weights = (1.0 + np.log(counts)) * signs
+
+    vector = weights @ _get_projection()[hashes % EMBEDDING_BUCKETS]
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+def job_text(title: str, description: str) -> str:
+    # Title repeated so it weighs more than a single mention deep in the description
+    return f"{title} {title} {(description or '')[:EMBEDDING_MAX_CHARS]}"
+
+# ==============================================================================
+# SECTION 2: PERSISTED INDEX (job_vectors TABLE + IN-MEMORY MATRIX)
+# ==============================================================================
+
+class VectorIndex:
+    """
+    Embeddings of every posting of the `jobs` table, persisted in `job_vectors` (same database)
+    and mirrored in an in-process float32 matrix for retrieval.
+    - Scraped postings are embedded as they are recorded (only new or edited ones).
+    - A CV is embedded the same way and its nearest postings come from one matrix-vector
+      product: an exact scan that stays in the milliseconds for corpora of ~10^5 postings.
+    - Vectors written by other processes are synced every VECTOR_INDEX_SYNC_SECONDS.
+    Without a usable database the index is disabled and retrieval returns nothing.
+    """
+    def __init__(self, enabled: bool = VECTOR_INDEX_ENABLED):
+        self.enabled = enabled
+        self._engine = None
+        self._lock = threading.Lock()
+        self._links = []
+        self._rows = {}
+        self._matrix = np.zeros((0, EMBEDDING_DIMS), dtype=np.float32)
+        self._synced_at = None
+        self._last_sync = 0.0
+
+    def _get_engine(self):
+        """Lazily binds to database.py, creating the vector table on first use."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if self._engine is None:
+                try:
+                    from database import engine, Job, JobVector
+                    Job.__table__.create(engine, checkfirst=True)
+                    JobVector.__table__.create(engine, checkfirst=True)
+                    self._engine = engine
+                except (Exception, SystemExit) as e:
+                    # database.py exits when USE_DB=True without a DATABASE_URL
+                    print(f"⚠️ Vector index disabled: {e}")
+                    self.enabled = False
+            return self._engine
+
+    def _put(self, link: str, vector: np.ndarray):
+        """Adds or replaces one vector in the in-memory matrix. Caller holds the lock."""
+        row = self._rows.get(link)
+        if row is not None:
+            self._matrix[row] = vector
+            return
+        if len(self._links) == len(self._matrix):
+            # Amortized growth instead of one vstack per posting
+            grown = np.zeros((max(1024, 2 * len(self._matrix)), EMBEDDING_DIMS), dtype=np.float32)
+            grown[:len(self._matrix)] = self._matrix
+            self._matrix = grown
+        self._rows[link] = len(self._links)
+        self._matrix[len(self._links)] = vector
+        self._links.append(link)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._links)
+
+    # --------------------------------------------------------------------------
+    # WRITES
+    # --------------------------------------------------------------------------
+
+    def add_jobs(self, jobs: list) -> int:
+        """
+        Embeds postings already recorded in `jobs` and upserts their vectors. Postings whose
+        vector was computed from the same content (and embedding version) are skipped.
+        """
+        engine = self._get_engine()
+        if engine is None or not jobs:
+            return 0
+
+        from sqlalchemy import select
+        from sqlalchemy.orm import Session
+        from database import JobVector
+        from services.crawl_store import crawl_store
+
+        hashes = {job.link: job_content_hash(job) for job in jobs if job.link}
+        try:
+            with Session(engine) as db:
+                embedded = set()
+                for links in _chunks(list(hashes)):
+                    embedded.update(db.execute(
+                        select(JobVector.link, JobVector.content_hash)
+                        .where(JobVector.link.in_(links), JobVector.embedding_version == EMBEDDING_VERSION)
+                    ).all())
+        except Exception as e:
+            print(f"⚠️ Vector index read failed: {e}")
+            return 0
+        jobs = [job for job in jobs if job.link in hashes and (job.link, hashes[job.link]) not in embedded]
+        if not jobs:
+            return 0
+
+        with span("vector.embed", jobs=len(jobs)):
+            vectors = {job.link: embed_text(job_text(job.title, job.description)) for job in jobs}
+        # Stamped after embedding, as close to the commit as possible (see VECTOR_INDEX_SYNC_OVERLAP)
+        now = datetime.datetime.utcnow()
+        rows = {
+            link: {
+                "link": link,
+                "content_hash": hashes[link],
+                "embedding_version": EMBEDDING_VERSION,
+                "vector": vector,
+                "embedded_at": now,
+            }
+            for link, vector in vectors.items()
+        }
+
+        try:
+            with Session(engine) as db:
+                upsert = crawl_store._upsert_statement(
+                    engine, JobVector.__table__, ["link"], ["content_hash", "embedding_version", "vector", "embedded_at"]
+                )
+                records = [{**row, "vector": row["vector"].astype("<f2").tobytes()} for row in rows.values()]
+                if upsert is not None:
+                    for chunk in _chunks(records):
+                        db.execute(upsert, chunk)
+                else:
+                    for record in records:
+                        db.merge(JobVector(**record))
+                db.commit()
+        except Exception as e:
+            print(f"⚠️ Vector index write failed: {e}")
+            return 0
+
+        with self._lock:
+            for link, row in rows.items():
+                self._put(link, row["vector"])
+        return len(rows)
+
+    def backfill(self, batch_size: int = 500, limit: int = None) -> int:
+        """
+        Embeds `jobs` rows that have no vector of the current EMBEDDING_VERSION yet (tables filled
+        before the index existed, or after a version bump). Meant for background processes.
+        """
+        engine = self._get_engine()
+        if engine is None:
+            return 0
+        from sqlalchemy import select, or_
+        from sqlalchemy.orm import Session
+        from database import Job, JobVector
+
+        query = (
+            select(Job.title, Job.company, Job.location, Job.link, Job.description)
+            .outerjoin(JobVector, JobVector.link == Job.link)
+            .where(or_(JobVector.link.is_(None), JobVector.embedding_version != EMBEDDING_VERSION))
+            .limit(batch_size)
+        )
+        total = 0
+        while limit is None or total < limit:
+            try:
+                with Session(engine) as db:
+                    rows = db.execute(query).all()
+            except Exception as e:
+                print(f"⚠️ Vector backfill read failed: {e}")
+                break
+            if not rows:
+                break
+            jobs = [JobInMemory(r.title, r.company, r.location, r.link, r.description, None, None) for r in rows]
+            added = self.add_jobs(jobs)
+            total += added
+            if added < len(jobs):
+                break
+        if total:
+            print(f"🧭 Vector index backfilled {total} stored jobs.")
+        return total
+
+    # --------------------------------------------------------------------------
+    # READS
+    # --------------------------------------------------------------------------
+
+    def sync(self, force: bool = False):
+        """
+        Loads the vectors written since the last sync (all of them the first time). The watermark
+        is the newest embedded_at loaded, and every sync re-reads VECTOR_INDEX_SYNC_OVERLAP seconds
+        before it, so rows committed late by other processes are not missed.
+        """
+        engine = self._get_engine()
+        if engine is None:
+            return
+        if not force and self._last_sync and time.monotonic() - self._last_sync < VECTOR_INDEX_SYNC_SECONDS:
+            return
+
+        from sqlalchemy import select
+        from sqlalchemy.orm import Session
+        from database import JobVector
+
+        query = select(JobVector.link, JobVector.vector, JobVector.embedded_at).where(
+            JobVector.embedding_version == EMBEDDING_VERSION
+        )
+        if self._synced_at is not None:
+            since = self._synced_at - datetime.timedelta(seconds=VECTOR_INDEX_SYNC_OVERLAP)
+            query = query.where(JobVector.embedded_at >= since)
+        try:
+            with span("vector.sync"), Session(engine) as db:
+                rows = db.execute(query).all()
+        except Exception as e:
+            print(f"⚠️ Vector index sync failed: {e}")
+            return
+
+        with self._lock:
+            for link, blob, embedded_at in rows:
+                self._put(link, np.frombuffer(blob, dtype="<f2").astype(np.float32))
+                if self._synced_at is None or embedded_at > self._synced_at:
+                    self._synced_at = embedded_at
+            # An empty table keeps no watermark: the next sync reads it whole again
+            self._last_sync = time.monotonic()
+
+    def nearest(self, text: str, top_n: int = 20) -> list:
+        """[(link, cosine similarity)] of the `top_n` postings closest to `text`, best first."""
+        self.sync()
+        query = embed_text(text)
+        with self._lock:
+            count = len(self._links)
+            if not count or not query.any():
+                return []
+            scores = self._matrix[:count] @ query
+            links = self._links
+            top_n = min(top_n, count)
+            top = np.argpartition(-scores, top_n - 1)[:top_n]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(links[i], float(scores[i])) for i in top]
+
+    def retrieve_jobs(self, cv_text: str, top_n: int = 20, hours_old: int = None) -> list:
+        """
+        Stored postings closest to a CV, as JobInMemory objects carrying a `similarity` (0-100),
+        optionally limited to postings seen in the last `hours_old` hours. No scraping involved.
+        """
+        engine = self._get_engine()
+        if engine is None:
+            return []
+
+        with span("vector.search", top_n=top_n) as search_span:
+            # Over-fetch candidates so the age filter still leaves `top_n` postings
+            candidates = self.nearest(cv_text, top_n * 5 if hours_old else top_n)
+            search_span.set(candidates=len(candidates), indexed=len(self))
+        if not candidates:
+            return []
+
+        from sqlalchemy import select
+        from sqlalchemy.orm import Session
+        from database import Job
+
+        similarity = dict(candidates)
+        query = select(Job).where(Job.link.in_(list(similarity)))
+        if hours_old:
+            query = query.where(Job.last_seen_at >= datetime.datetime.utcnow() - datetime.timedelta(hours=hours_old))
+        try:
+            with Session(engine) as db:
+                rows = db.execute(query).scalars().all()
+        except Exception as e:
+            print(f"⚠️ Vector index job lookup failed: {e}")
+            return []
+
+        jobs = []
+        for row in sorted(rows, key=lambda r: similarity[r.link], reverse=True)[:top_n]:
+            job = JobInMemory(row.title, row.company, row.location, row.link, row.description, row.source, row.published_at)
+            job.similarity = round(similarity[row.link] * 100, 1)
+            jobs.append(job)
+        return jobs
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"enabled": self.enabled, "vectors": len(self._links)}
+
+
+vector_index = VectorIndex()
+metrics.add_collector("vector_index", vector_index.stats, "Local job embedding index")